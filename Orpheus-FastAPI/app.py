@@ -44,14 +44,34 @@ ensure_env_file_exists()
 # Load environment variables from .env file
 load_dotenv(override=True)
 
-from fastapi import FastAPI, Request, Form, HTTPException, Depends
-from fastapi.responses import HTMLResponse, FileResponse, JSONResponse
+from fastapi import FastAPI, Request, Form, HTTPException, Depends, Header, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, StreamingResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 import json
 
 from tts_engine import generate_speech_from_api, AVAILABLE_VOICES, DEFAULT_VOICE, VOICE_TO_LANGUAGE, AVAILABLE_LANGUAGES
+from tts_engine import generation_executor, QueueFullError, QueueTimeoutError
+from tts_engine import stream_speech_from_api, StreamingSentenceSplitter, SAMPLE_RATE, GenerationError
+from tts_engine import STREAMING_FORMATS, is_format_available, encode_stream, encoder_stats
+from tts_engine import SUPPORTED_SAMPLE_RATES, supports_sample_rate
+from tts_engine import decode_client
+from tts_engine import output_store, pcm_to_wav
+from tts_engine import get_runtime_config, reload_runtime_config, LIVE_CONFIG_KEYS
+from tts_engine import normalize_priority, llm_gate, decode_gate
+from tts_engine import coalescer
+from tts_engine import job_queue
+from tts_engine import inprocess_engine
+from tts_engine import runaway_stats
+from tts_engine import pause_stats, has_speech
+from tts_engine import trim_stats
+from tts_engine import checkpoint_store
+from tts_engine import profiler, PROFILING
+from tts_engine import memory_monitor, MEMORY_DIAGNOSTICS
+from tts_engine import archive_store, render_archive, decode_archive, ArchiveError, TOKEN_ARCHIVE
+from tts_engine import readiness, realtime_monitor, estimate_capacity
 
 # Create FastAPI app
 app = FastAPI(
@@ -60,16 +80,19 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# We'll use FastAPI's built-in startup complete mechanism
-# The log message "INFO:     Application startup complete." indicates
-# that the application is ready
+# The log message "INFO:     Application startup complete." indicates that the server
+# accepts connections; /readyz reports when it can actually generate speech
+@app.on_event("startup")
+async def start_background_work():
+    """Start the job workers and warm up the decoder in the background so /healthz answers while it runs"""
+    job_queue.start()
+    asyncio.get_running_loop().run_in_executor(None, readiness.warm_up)
 
 # Ensure directories exist
 os.makedirs("outputs", exist_ok=True)
 os.makedirs("static", exist_ok=True)
 
-# Mount directories for serving files
-app.mount("/outputs", StaticFiles(directory="outputs"), name="outputs")
+# Mount directories for serving files (generated audio is served by the /outputs route)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 # Setup templates
@@ -82,6 +105,21 @@ class SpeechRequest(BaseModel):
     voice: str = DEFAULT_VOICE
     response_format: str = "wav"
     speed: float = 1.0
+    priority: Optional[str] = None  # "interactive" or "bulk"; falls back to the X-Priority header
+    fast_start: Optional[bool] = None  # generate the first sentence on its own; falls back to ORPHEUS_FAST_START
+    archive: Optional[bool] = None  # also write a token archive; falls back to ORPHEUS_TOKEN_ARCHIVE
+    sample_rate: Optional[int] = None  # output sample rate; falls back to ORPHEUS_SAMPLE_RATE
+    trim_silence: Optional[bool] = None  # trim leading/trailing silence; falls back to ORPHEUS_TRIM_SILENCE
+    checkpoint: Optional[bool] = None  # store each completed segment so a re-run resumes; falls back to ORPHEUS_CHECKPOINTS
+
+class JobItem(BaseModel):
+    text: str
+    voice: Optional[str] = None  # falls back to the job's voice
+
+class JobRequest(BaseModel):
+    items: List[JobItem]
+    voice: str = DEFAULT_VOICE
+    priority: Optional[str] = "bulk"
 
 class APIResponse(BaseModel):
     status: str
@@ -89,22 +127,181 @@ class APIResponse(BaseModel):
     output_file: str
     generation_time: float
 
+def admission_error(e: Exception) -> HTTPException:
+    """Map an admission control error to a 429/503 response with a Retry-After header"""
+    if isinstance(e, QueueFullError):
+        print(f"Rejecting generation request: {e}")
+        return HTTPException(
+            status_code=429,
+            detail="Server busy: generation queue is full",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    print(f"Shedding generation request: {e}")
+    return HTTPException(
+        status_code=503,
+        detail="Server overloaded: request expired in generation queue",
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+def generation_error(e: Exception) -> HTTPException:
+    """Map a backend failure to a 502 response"""
+    print(f"Generation failed: {e}")
+    return HTTPException(status_code=502, detail=f"Speech generation failed: {e}")
+
+def resolve_sample_rate(sample_rate: Optional[int], response_format: str = "pcm") -> int:
+    """Return the requested output sample rate (default ORPHEUS_SAMPLE_RATE), as a 400 if unsupported"""
+    sample_rate = sample_rate or SAMPLE_RATE
+    if sample_rate not in SUPPORTED_SAMPLE_RATES:
+        supported = ", ".join(map(str, SUPPORTED_SAMPLE_RATES))
+        raise HTTPException(status_code=400, detail=f"Unsupported sample_rate {sample_rate}. Supported sample rates: {supported}")
+    if not supports_sample_rate(response_format, sample_rate):
+        raise HTTPException(status_code=400, detail=f"response_format '{response_format}' does not support sample_rate {sample_rate}")
+    return sample_rate
+
+def resolve_priority(*values: Optional[str]) -> str:
+    """Return the first priority given (request field, then header), or the default, as a 400 if unknown"""
+    try:
+        return normalize_priority(next((value for value in values if value), None))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def resolve_profile(x_profile: Optional[str], x_request_id: Optional[str]) -> Optional[str]:
+    """Return the request ID to profile a request under (X-Profile header or an armed slot), or None"""
+    requested = x_profile is not None and x_profile.lower() in ("1", "true", "yes", "on")
+    if not profiler.should_profile(requested):
+        return None
+    return profiler.request_id(x_request_id)
+
+def generation_stream(priority: Optional[str] = None, **kwargs):
+    """
+    Async stream of PCM chunks from stream_speech_from_api run on the generation executor.
+    
+    Identical concurrent requests (same text up to whitespace that is not a pause,
+    same parameters, priority and configuration) share one generation; each still
+    receives the full audio.
+    """
+    priority = normalize_priority(priority)
+    config = get_runtime_config()
+    key = coalescer.make_key(priority=priority, config=tuple(config.to_dict().items()), **kwargs)
+    return coalescer.stream(
+        key,
+        lambda: generation_executor.stream(stream_speech_from_api, priority=priority, config=config, **kwargs)
+    )
+
+async def open_generation_stream(priority: Optional[str] = None, **kwargs):
+    """
+    Start a generation stream and wait for its first chunk.
+    
+    Generation blocks for seconds, so it runs on the bounded generation executor,
+    never on the event loop. Waiting for the first chunk before the response starts
+    means admission errors still become proper status codes (429 when the queue is
+    full, 503 when the request expired in the queue, both with a Retry-After header);
+    the client receives nothing earlier anyway.
+    """
+    return await open_stream(generation_stream(priority=priority, **kwargs))
+
+async def open_stream(stream):
+    """Wait for the first chunk of an executor stream (see open_generation_stream)."""
+    try:
+        first_chunk = await stream.__anext__()
+    except StopAsyncIteration:
+        first_chunk = None
+    except (QueueFullError, QueueTimeoutError) as e:
+        raise admission_error(e)
+    except GenerationError as e:
+        raise generation_error(e)
+    
+    async def chunks():
+        try:
+            if first_chunk is not None:
+                yield first_chunk
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+    
+    return chunks()
+
+async def run_generation(output_name: str, priority: Optional[str] = None, sample_rate: int = SAMPLE_RATE, **kwargs) -> bytes:
+    """Generate speech at sample_rate, store it under output_name and return the WAV bytes"""
+    chunks = await open_generation_stream(priority=priority, sample_rate=sample_rate, **kwargs)
+    try:
+        audio_segments = [chunk async for chunk in chunks]
+    except (QueueFullError, QueueTimeoutError) as e:
+        raise admission_error(e)
+    except GenerationError as e:
+        raise generation_error(e)
+    # Saving may write to disk, so keep it off the event loop
+    return await asyncio.get_running_loop().run_in_executor(
+        None, output_store.save, output_name, audio_segments, sample_rate
+    )
+
 # OpenAI-compatible API endpoint
 @app.post("/v1/audio/speech")
-async def create_speech_api(request: SpeechRequest):
+async def create_speech_api(request: SpeechRequest, x_priority: Optional[str] = Header(None),
+                            x_profile: Optional[str] = Header(None), x_request_id: Optional[str] = Header(None)):
     """
     Generate speech from text using the Orpheus TTS model.
     Compatible with OpenAI's /v1/audio/speech endpoint.
     
     For longer texts (>1000 characters), batched generation is used
     to improve reliability and avoid truncation issues.
+    
+    WAV responses are returned as a complete file. The opus, flac, mp3 and pcm
+    formats are streamed, encoded incrementally as audio is generated.
+    
+    The priority field (or X-Priority header) selects the scheduling class:
+    "interactive" for real-time utterances, "bulk" for long-form work. The
+    sample_rate field resamples the 24 kHz model output as it streams.
+    
+    With ORPHEUS_PROFILING enabled, an X-Profile: 1 header profiles the request
+    under its X-Request-ID (or a new ID), returned in the X-Profile-Id header.
     """
     if not request.input:
         raise HTTPException(status_code=400, detail="Missing input text")
+    if not has_speech(request.input):
+        raise HTTPException(status_code=400, detail="Input text has nothing to speak")
+    priority = resolve_priority(request.priority, x_priority)
+    profile = resolve_profile(x_profile, x_request_id)
+    archive_requested = TOKEN_ARCHIVE if request.archive is None else request.archive
+    
+    response_format = request.response_format.lower()
+    sample_rate = resolve_sample_rate(request.sample_rate, response_format)
+    if response_format != "wav":
+        if response_format not in STREAMING_FORMATS:
+            supported = ", ".join(["wav"] + list(STREAMING_FORMATS))
+            raise HTTPException(status_code=400, detail=f"Unsupported response_format '{request.response_format}'. Supported formats: {supported}")
+        if not is_format_available(response_format):
+            raise HTTPException(status_code=400, detail=f"response_format '{response_format}' requires PyAV (pip install av)")
+        
+        archive = archive_store.new_name(request.voice) if archive_requested else None
+        chunks = await open_generation_stream(
+            priority=priority,
+            prompt=request.input,
+            voice=request.voice,
+            use_batching=len(request.input) > 1000,
+            max_batch_chars=1000,
+            fast_start=request.fast_start,
+            archive=archive,
+            sample_rate=sample_rate,
+            trim_silence=request.trim_silence,
+            checkpoint=request.checkpoint,
+            profile=profile
+        )
+        headers = {}
+        if archive:
+            headers["X-Token-Archive"] = archive
+        if profile:
+            headers["X-Profile-Id"] = profile
+        return StreamingResponse(
+            encode_stream(chunks, response_format, sample_rate),
+            media_type=STREAMING_FORMATS[response_format][2],
+            headers=headers or None
+        )
     
-    # Generate unique filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_path = f"outputs/{request.voice}_{timestamp}.wav"
+    # Generate unique filename (the token archive, if any, is named after it)
+    output_name = output_store.new_name(request.voice)
+    archive = output_name[:-len(".wav")] + ".otk" if archive_requested else None
     
     # Check if we should use batched generation
     use_batching = len(request.input) > 1000
@@ -113,23 +310,249 @@ async def create_speech_api(request: SpeechRequest):
     
     # Generate speech with automatic batching for long texts
     start = time.time()
-    generate_speech_from_api(
+    wav_data = await run_generation(
+        output_name,
+        priority=priority,
         prompt=request.input,
         voice=request.voice,
-        output_file=output_path,
         use_batching=use_batching,
-        max_batch_chars=1000  # Process in ~1000 character chunks (roughly 1 paragraph)
+        max_batch_chars=1000,  # Process in ~1000 character chunks (roughly 1 paragraph)
+        fast_start=request.fast_start,
+        archive=archive,
+        sample_rate=sample_rate,
+        trim_silence=request.trim_silence,
+        checkpoint=request.checkpoint,
+        profile=profile
     )
     end = time.time()
     generation_time = round(end - start, 2)
     
-    # Return audio file
-    return FileResponse(
-        path=output_path,
+    # Return the audio straight from memory rather than re-reading it from disk
+    return Response(
+        content=wav_data,
         media_type="audio/wav",
-        filename=f"{request.voice}_{timestamp}.wav"
+        headers={"Content-Disposition": f'attachment; filename="{output_name}"',
+                 **({"X-Token-Archive": archive} if archive else {}),
+                 **({"X-Profile-Id": profile} if profile else {})}
     )
 
+@app.post("/v1/audio/render")
+async def render_speech_archive(request: Request, response_format: str = "wav", archive: Optional[str] = None,
+                                sample_rate: Optional[int] = None, x_priority: Optional[str] = Header(None)):
+    """
+    Re-render audio from a token archive without calling the LLM.
+    
+    The archive is the request body, or the name of a stored archive in the archive
+    query parameter. Decoding runs on the generation executor like a generation.
+    The audio is resampled to sample_rate (default ORPHEUS_SAMPLE_RATE).
+    """
+    priority = resolve_priority(x_priority)
+    response_format = response_format.lower()
+    if response_format != "wav" and not is_format_available(response_format):
+        supported = ", ".join(["wav"] + list(STREAMING_FORMATS))
+        raise HTTPException(status_code=400, detail=f"Unsupported response_format '{response_format}'. Supported formats: {supported} (compressed formats need PyAV)")
+    sample_rate = resolve_sample_rate(sample_rate, response_format)
+    
+    if archive:
+        path = archive_store.path(archive)
+        if path is None:
+            raise HTTPException(status_code=404, detail="Archive not found")
+        with open(path, "rb") as f:
+            data = f.read()
+    else:
+        data = await request.body()
+    try:
+        decode_archive(data)
+    except ArchiveError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid token archive: {e}")
+    archive_store.record_render()
+    
+    chunks = await open_stream(generation_executor.stream(render_archive, data, sample_rate, priority=priority))
+    if response_format != "wav":
+        return StreamingResponse(
+            encode_stream(chunks, response_format, sample_rate),
+            media_type=STREAMING_FORMATS[response_format][2]
+        )
+    try:
+        audio_segments = [chunk async for chunk in chunks]
+    except GenerationError as e:
+        raise generation_error(e)
+    return Response(content=pcm_to_wav(audio_segments, sample_rate), media_type="audio/wav")
+
+@app.get("/v1/archives/{name}")
+async def get_archive(name: str):
+    """Download a stored token archive"""
+    path = archive_store.path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Archive not found")
+    return FileResponse(path=path, media_type="application/octet-stream", filename=name)
+
+class _SpeechSegment:
+    """One speakable unit of a WebSocket session and the audio generated for it"""
+    def __init__(self, index: int, text: str):
+        self.index = index
+        self.text = text
+        self.chunks = asyncio.Queue()
+        self.error = None
+        self.task = None
+
+class SpeechSession:
+    """
+    Incremental text-in / audio-out synthesis for one WebSocket connection.
+    
+    Each speakable unit starts generating as soon as the splitter emits it (at most
+    max_inflight units per session at a time), while a single sender task streams
+    the audio back strictly in segment order.
+    """
+    def __init__(self, websocket: WebSocket, voice: str, priority: str, sample_rate: int = SAMPLE_RATE,
+                 trim_silence: Optional[bool] = None, max_inflight: int = 2):
+        self.websocket = websocket
+        self.voice = voice
+        self.priority = priority
+        self.sample_rate = sample_rate
+        self.trim_silence = trim_silence
+        self.max_inflight = max_inflight
+        self.next_index = 0
+        self._start()
+    
+    def _start(self):
+        self.inflight = asyncio.Semaphore(self.max_inflight)
+        self.segments = asyncio.Queue()
+        self.active = []
+        self.sender = asyncio.create_task(self._send_loop())
+    
+    def add_unit(self, text: str):
+        """Queue a speakable unit and start generating it"""
+        segment = _SpeechSegment(self.next_index, text)
+        self.next_index += 1
+        segment.task = asyncio.create_task(self._generate(segment))
+        self.active.append(segment)
+        self.segments.put_nowait(segment)
+    
+    async def _generate(self, segment: _SpeechSegment):
+        try:
+            async with self.inflight:
+                async for chunk in generation_stream(
+                    priority=self.priority, prompt=segment.text, voice=self.voice, use_batching=False,
+                    sample_rate=self.sample_rate, trim_silence=self.trim_silence
+                ):
+                    segment.chunks.put_nowait(chunk)
+        except (QueueFullError, QueueTimeoutError) as e:
+            segment.error = admission_error(e).detail
+        except Exception as e:
+            print(f"Error generating WebSocket segment {segment.index}: {e}")
+            segment.error = str(e)
+        finally:
+            segment.chunks.put_nowait(None)
+    
+    async def _send_loop(self):
+        while True:
+            segment = await self.segments.get()
+            if segment is None:
+                await self.websocket.send_json({"type": "done"})
+                return
+            await self.websocket.send_json({"type": "segment_start", "segment": segment.index, "text": segment.text})
+            audio_bytes = 0
+            while True:
+                chunk = await segment.chunks.get()
+                if chunk is None:
+                    break
+                audio_bytes += len(chunk)
+                await self.websocket.send_bytes(chunk)
+            if segment.error:
+                await self.websocket.send_json({"type": "error", "segment": segment.index, "message": segment.error})
+            await self.websocket.send_json({
+                "type": "segment_end",
+                "segment": segment.index,
+                "audio_ms": round(audio_bytes / 2 / self.sample_rate * 1000)
+            })
+            self.active.remove(segment)
+    
+    async def finish(self):
+        """Wait until every queued segment has been sent, then send the done marker"""
+        self.segments.put_nowait(None)
+        await self.sender
+    
+    async def cancel(self):
+        """Stop all in-flight generation, drop queued audio and start a fresh sender"""
+        await self.close()
+        self._start()
+    
+    async def close(self):
+        tasks = [self.sender] + [segment.task for segment in self.active]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+@app.websocket("/v1/audio/speech/ws")
+async def speech_websocket(websocket: WebSocket):
+    """
+    Incremental synthesis over a WebSocket.
+    
+    The client sends JSON messages: {"type": "text", "text": ...} fragments,
+    {"type": "flush"} to synthesize buffered text now, {"type": "end"} to finish,
+    {"type": "cancel"} to stop and discard pending audio, and optionally
+    {"type": "config", "voice": ...}. The server replies with segment_start /
+    segment_end JSON markers around binary 16-bit mono PCM frames, in order.
+    
+    Sessions are interactive unless the priority query parameter (or X-Priority
+    header) says otherwise. The sample_rate query parameter selects the PCM rate, and
+    trim_silence=true trims the leading and trailing silence of every unit.
+    """
+    await websocket.accept()
+    voice = websocket.query_params.get("voice", DEFAULT_VOICE)
+    try:
+        priority = normalize_priority(
+            websocket.query_params.get("priority") or websocket.headers.get("x-priority")
+        )
+        sample_rate = int(websocket.query_params.get("sample_rate") or SAMPLE_RATE)
+        if sample_rate not in SUPPORTED_SAMPLE_RATES:
+            raise ValueError(f"Unsupported sample_rate {sample_rate}")
+        trim_silence = websocket.query_params.get("trim_silence")
+        if trim_silence is not None:
+            trim_silence = trim_silence.lower() in ("1", "true", "yes", "on")
+    except ValueError as e:
+        await websocket.send_json({"type": "error", "message": str(e)})
+        await websocket.close(code=1008)
+        return
+    splitter = StreamingSentenceSplitter()
+    session = SpeechSession(websocket, voice, priority, sample_rate, trim_silence)
+    await websocket.send_json({"type": "ready", "voice": voice, "sample_rate": sample_rate})
+    
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except json.JSONDecodeError:
+                await websocket.send_json({"type": "error", "message": "Messages must be JSON objects"})
+                continue
+            
+            message_type = message.get("type")
+            if message_type == "text":
+                for unit in splitter.push(message.get("text", "")):
+                    session.add_unit(unit)
+            elif message_type == "flush":
+                for unit in splitter.flush():
+                    session.add_unit(unit)
+            elif message_type == "end":
+                for unit in splitter.flush():
+                    session.add_unit(unit)
+                await session.finish()
+                await websocket.close()
+                break
+            elif message_type == "cancel":
+                splitter.clear()
+                await session.cancel()
+                await websocket.send_json({"type": "cancelled"})
+            elif message_type == "config":
+                session.voice = message.get("voice", session.voice)
+            else:
+                await websocket.send_json({"type": "error", "message": f"Unknown message type '{message_type}'"})
+    except WebSocketDisconnect:
+        print("WebSocket client disconnected")
+    finally:
+        await session.close()
+
 @app.get("/v1/audio/voices")
 async def list_voices():
     """Return list of available voices"""
@@ -155,9 +578,16 @@ async def speak(request: Request):
             status_code=400, 
             content={"error": "Missing 'text'"}
         )
+    if not has_speech(text):
+        return JSONResponse(
+            status_code=400,
+            content={"error": "'text' has nothing to speak"}
+        )
+    priority = resolve_priority(data.get("priority"), request.headers.get("x-priority"))
+    profile = resolve_profile(request.headers.get("x-profile"), request.headers.get("x-request-id"))
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_path = f"outputs/{voice}_{timestamp}.wav"
+    output_name = output_store.new_name(voice)
+    output_path = output_store.url_path(output_name)
     
     # Check if we should use batched generation for longer texts
     use_batching = len(text) > 1000
@@ -166,12 +596,14 @@ async def speak(request: Request):
     
     # Generate speech with batching for longer texts
     start = time.time()
-    generate_speech_from_api(
+    await run_generation(
+        output_name,
+        priority=priority,
         prompt=text, 
         voice=voice, 
-        output_file=output_path,
         use_batching=use_batching,
-        max_batch_chars=1000
+        max_batch_chars=1000,
+        profile=profile
     )
     end = time.time()
     generation_time = round(end - start, 2)
@@ -181,8 +613,224 @@ async def speak(request: Request):
         "voice": voice,
         "output_file": output_path,
         "generation_time": generation_time
+    }, headers={"X-Profile-Id": profile} if profile else None)
+
+@app.get("/stats")
+async def stats():
+    """Return live server statistics (admission queue depth, wait times, rejections)"""
+    return JSONResponse(content={
+        "worker_pid": os.getpid(),
+        "admission": generation_executor.stats(),
+        "gates": {"llm": llm_gate.stats(), "decode": decode_gate.stats()},
+        "coalescing": coalescer.stats(),
+        "encoding": encoder_stats.stats(),
+        "decode_service": decode_client.stats() if decode_client is not None else None,
+        "outputs": output_store.stats(),
+        "jobs": await asyncio.get_running_loop().run_in_executor(None, job_queue.stats),
+        "inprocess_engine": inprocess_engine.stats(),
+        "runaway": runaway_stats.stats(),
+        "pauses": pause_stats.stats(),
+        "trim": trim_stats.stats(),
+        "checkpoints": checkpoint_store.stats(),
+        "profiling": profiler.stats(),
+        "memory": memory_monitor.stats(),
+        "archives": archive_store.stats(),
+        "config": get_runtime_config().to_dict()
     })
 
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and its event loop responds"""
+    return JSONResponse(content={"status": "ok"})
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: the decoder is warmed up and the LLM backend is reachable (503 otherwise)"""
+    report = await asyncio.get_running_loop().run_in_executor(None, readiness.check)
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
+@app.get("/capacity")
+async def capacity():
+    """
+    Current load and estimated headroom, computed from live counters.
+    
+    in_flight counts generation streams (identical requests sharing one generation
+    count once), listeners counts the clients attached to them. The realtime
+    factor and headroom estimates come from recently completed streams.
+    """
+    admission = generation_executor.stats()
+    realtime = realtime_monitor.summary()
+    return JSONResponse(content={
+        "worker_pid": os.getpid(),
+        "ready": readiness.warmed,
+        "in_flight": realtime["in_flight"],
+        "listeners": coalescer.stats()["subscribers"],
+        "active": admission["active"],
+        "queue_depth": admission["queue_depth"],
+        "max_concurrency": admission["max_concurrency"],
+        "realtime_factor": realtime["realtime_factor"],
+        "aggregate_realtime_factor": realtime["aggregate_realtime_factor"],
+        "realtime_samples": realtime["samples"],
+        **estimate_capacity(realtime, admission),
+        "retry_after": generation_executor.retry_after()
+    })
+
+# Request profiling (only with ORPHEUS_PROFILING enabled)
+def require_profiling():
+    if not PROFILING:
+        raise HTTPException(status_code=403, detail="Profiling is disabled (set ORPHEUS_PROFILING=true)")
+
+@app.post("/admin/profile")
+async def arm_profiling(count: int = 1):
+    """Profile the next count speech requests (0 disarms); their IDs are returned in X-Profile-Id"""
+    require_profiling()
+    return JSONResponse(content={"armed": profiler.arm(count)})
+
+@app.get("/admin/profiles")
+async def list_profiles():
+    """List the written profiles (collapsed stacks and Chrome traces), newest first"""
+    require_profiling()
+    return JSONResponse(content={"profiles": profiler.files()})
+
+@app.get("/admin/profiles/{name}")
+async def get_profile(name: str):
+    """Download a profile file"""
+    require_profiling()
+    path = profiler.path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    media_type = "application/json" if name.endswith(".json") else "text/plain"
+    return FileResponse(path=path, media_type=media_type, filename=name)
+
+# Memory diagnostics (snapshots and diffs only with ORPHEUS_MEMORY_DIAGNOSTICS enabled)
+def require_memory_diagnostics():
+    if not MEMORY_DIAGNOSTICS:
+        raise HTTPException(status_code=403, detail="Memory diagnostics are disabled (set ORPHEUS_MEMORY_DIAGNOSTICS=true)")
+
+@app.get("/admin/memory")
+async def memory_report():
+    """RSS, token processor threads and queues, cache sizes and recent per-request memory peaks"""
+    return JSONResponse(content=memory_monitor.stats())
+
+@app.post("/admin/memory/snapshot")
+async def memory_snapshot():
+    """Take a tracemalloc snapshot (tracing starts with the first one) and return its ID"""
+    require_memory_diagnostics()
+    # Snapshots walk every traced allocation, so keep them off the event loop
+    return JSONResponse(content=await asyncio.get_running_loop().run_in_executor(None, memory_monitor.snapshot))
+
+@app.get("/admin/memory/diff")
+async def memory_diff(base: Optional[int] = None, against: Optional[int] = None, top: int = 20, key_type: str = "lineno"):
+    """
+    The top allocation sites by growth between two snapshots. against defaults to
+    a new snapshot and base to the snapshot before against.
+    """
+    require_memory_diagnostics()
+    try:
+        report = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: memory_monitor.diff(base, against, top, key_type)
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Snapshot {e.args[0]} not found; take one with POST /admin/memory/snapshot")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return JSONResponse(content=report)
+
+@app.delete("/admin/memory/snapshots")
+async def stop_memory_tracing():
+    """Stop tracemalloc, which slows every allocation while it runs, and drop the snapshots"""
+    require_memory_diagnostics()
+    memory_monitor.stop_tracing()
+    return JSONResponse(content={"tracing": False})
+
+@app.get("/outputs/{name}")
+async def get_output(name: str):
+    """Serve a generated audio file from memory or disk"""
+    data = output_store.get(name)
+    if data is not None:
+        return Response(content=data, media_type="audio/wav")
+    path = output_store.path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Output not found or expired")
+    return FileResponse(path=path, media_type="audio/wav")
+
+# Bulk synthesis job API
+@app.post("/v1/jobs")
+async def create_job(request: JobRequest):
+    """
+    Submit a list of texts for asynchronous synthesis and return the job ID.
+    
+    Jobs are stored in SQLite and processed by the job workers through the
+    generation executor (bulk priority unless the job asks otherwise). Poll
+    GET /v1/jobs/{job_id} for progress; finished jobs survive server restarts.
+    """
+    if not request.items:
+        raise HTTPException(status_code=400, detail="Job has no items")
+    for index, item in enumerate(request.items):
+        if not has_speech(item.text):
+            raise HTTPException(status_code=400, detail=f"Item {index} has no text")
+    priority = resolve_priority(request.priority)
+    items = [{"text": item.text, "voice": item.voice} for item in request.items]
+    # SQLite writes may wait for other processes' locks, so keep them off the event loop
+    job = await asyncio.get_running_loop().run_in_executor(
+        None, lambda: job_queue.create_job(items, voice=request.voice, priority=priority)
+    )
+    return JSONResponse(status_code=202, content=job)
+
+@app.get("/v1/jobs")
+async def list_jobs(limit: int = 50):
+    """List the most recent jobs with their status and progress"""
+    jobs = await asyncio.get_running_loop().run_in_executor(None, job_queue.list_jobs, limit)
+    return JSONResponse(content={"jobs": jobs})
+
+@app.get("/v1/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Return a job's status, progress, throughput and per-item results"""
+    job = await asyncio.get_running_loop().run_in_executor(
+        None, lambda: job_queue.get_job(job_id, include_items=True)
+    )
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JSONResponse(content=job)
+
+@app.get("/v1/jobs/{job_id}/items/{index}")
+async def get_job_item(job_id: str, index: int):
+    """Download the audio of one finished job item"""
+    if await asyncio.get_running_loop().run_in_executor(None, job_queue.get_job, job_id) is None:
+        raise HTTPException(status_code=404, detail="Item not found or not finished")
+    path = job_queue.item_path(job_id, index)
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Item not found or not finished")
+    return FileResponse(path=path, media_type="audio/wav", filename=f"{job_id}_{index:04d}.wav")
+
+@app.get("/v1/jobs/{job_id}/download")
+async def download_job(job_id: str):
+    """Download the finished items of a job and a manifest as a zip file"""
+    path = await asyncio.get_running_loop().run_in_executor(None, job_queue.build_archive, job_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return FileResponse(
+        path=path,
+        media_type="application/zip",
+        filename=f"{job_id}.zip",
+        background=BackgroundTask(os.remove, path)
+    )
+
+@app.post("/v1/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Stop a job's pending items; items already generating still finish"""
+    loop = asyncio.get_running_loop()
+    if not await loop.run_in_executor(None, job_queue.cancel_job, job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JSONResponse(content=await loop.run_in_executor(None, job_queue.get_job, job_id))
+
+@app.delete("/v1/jobs/{job_id}")
+async def delete_job(job_id: str):
+    """Delete a job and its audio files"""
+    if not await asyncio.get_running_loop().run_in_executor(None, job_queue.delete_job, job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JSONResponse(content={"status": "deleted", "id": job_id})
+
 # Web UI routes
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request):
@@ -221,7 +869,13 @@ async def get_config():
 
 @app.post("/save_config")
 async def save_config(request: Request):
-    """Save configuration to .env file"""
+    """
+    Save configuration to .env file and apply it.
+    
+    Generation settings (LIVE_CONFIG_KEYS) take effect immediately for new requests,
+    without reloading models; requests already running keep their settings. Other
+    settings such as the port still need a restart.
+    """
     data = await request.json()
     
     # Convert values to proper types
@@ -237,12 +891,31 @@ async def save_config(request: Request):
             except (ValueError, TypeError):
                 pass
     
+    # Settings that cannot be applied live and differ from what this process runs with
+    restart_required = [
+        key for key, value in data.items()
+        if key not in LIVE_CONFIG_KEYS and str(value) != os.environ.get(key)
+    ]
+    
     # Write configuration to .env file
     with open(".env", "w") as f:
         for key, value in data.items():
             f.write(f"{key}={value}\n")
     
-    return JSONResponse(content={"status": "ok", "message": "Configuration saved successfully. Restart server to apply changes."})
+    applied = reload_runtime_config(data)
+    
+    if restart_required:
+        message = f"Configuration saved. Restart server to apply changes to: {', '.join(restart_required)}"
+    elif applied:
+        message = "Configuration saved and applied."
+    else:
+        message = "Configuration saved successfully."
+    return JSONResponse(content={
+        "status": "ok",
+        "message": message,
+        "applied": applied,
+        "restart_required": restart_required
+    })
 
 @app.post("/restart_server")
 async def restart_server():
@@ -318,8 +991,8 @@ async def generate_from_web(
             }
         )
     
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_path = f"outputs/{voice}_{timestamp}.wav"
+    output_name = output_store.new_name(voice)
+    output_path = output_store.url_path(output_name)
     
     # Check if we should use batched generation for longer texts
     use_batching = len(text) > 1000
@@ -328,13 +1001,29 @@ async def generate_from_web(
     
     # Generate speech with batching for longer texts
     start = time.time()
-    generate_speech_from_api(
-        prompt=text, 
-        voice=voice, 
-        output_file=output_path,
-        use_batching=use_batching,
-        max_batch_chars=1000
-    )
+    try:
+        await run_generation(
+            output_name,
+            prompt=text, 
+            voice=voice, 
+            use_batching=use_batching,
+            max_batch_chars=1000
+        )
+    except HTTPException as e:
+        return templates.TemplateResponse(
+            "tts.html",
+            {
+                "request": request,
+                "error": e.detail,
+                "text": text,
+                "voice": voice,
+                "voices": AVAILABLE_VOICES,
+                "VOICE_TO_LANGUAGE": VOICE_TO_LANGUAGE,
+                "AVAILABLE_LANGUAGES": AVAILABLE_LANGUAGES
+            },
+            status_code=e.status_code,
+            headers=e.headers
+        )
     end = time.time()
     generation_time = round(end - start, 2)
     
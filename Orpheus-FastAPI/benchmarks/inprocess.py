@@ -0,0 +1,183 @@
+"""
+In-process engine benchmark for Orpheus-FASTAPI.
+
+Generates from the same GGUF model two ways, through generate_tokens_from_api():
+
+1. http: an OpenAI-compatible server on localhost (llama.cpp's llama-server if it
+   is on PATH, otherwise llama-cpp-python's server, or --api-url)
+2. inprocess: llama-cpp-python inside this process (ORPHEUS_BACKEND=inprocess)
+
+and reports time to first token, tokens per second and the CPU time the consuming
+thread spends per token. Decoding is greedy so both paths generate the same tokens.
+Any small GGUF works; the model does not have to produce audio tokens, so a tiny
+test model keeps the comparison about transport overhead rather than compute.
+
+Prefer llama-server for the HTTP path: llama-cpp-python's server re-detokenizes
+the whole completion for every streamed token, so it slows down as a stream grows
+and overstates the gap on long runs.
+
+Usage:
+    python benchmarks/inprocess.py --model models/tiny.gguf
+    python benchmarks/inprocess.py --model models/Orpheus-3b-FT-Q8_0.gguf --tokens 512 --json
+    python benchmarks/inprocess.py --model models/tiny.gguf --api-url http://127.0.0.1:8080/v1/completions
+
+Needs llama-cpp-python (and its [server] extra when no server is given or on PATH).
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import argparse
+import subprocess
+import statistics
+import urllib.request
+import urllib.error
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(model: str, context: int, timeout: float = 120):
+    """Start a completion server for model and return (process, /v1/completions URL, backend name)."""
+    port = _free_port()
+    if shutil.which("llama-server"):
+        command = ["llama-server", "-m", model, "--port", str(port), "-c", str(context), "-np", "1"]
+        backend = "llamacpp"
+    else:
+        command = [sys.executable, "-m", "llama_cpp.server", "--model", model, "--port", str(port), "--n_ctx", str(context)]
+        backend = "generic"
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    start = time.time()
+    while time.time() - start < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"{command[0]} exited with status {process.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/v1/models", timeout=2):
+                return process, f"http://127.0.0.1:{port}/v1/completions", backend
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{command[0]} did not start within {timeout:.0f}s")
+
+def counting_backend(name: str):
+    """Register a copy of backend name that counts streamed events (one per generated token)."""
+    from tts_engine.backends import BACKENDS, get_backend
+
+    class CountingBackend(type(get_backend(name))):
+        events = 0
+
+        def chunk_text(self, data):
+            if data.get("choices") or "content" in data:
+                self.events += 1
+            return super().chunk_text(data)
+
+    backend = CountingBackend()
+    backend.name = f"counting-{name}"
+    BACKENDS[backend.name] = backend
+    return backend
+
+def measure(config, runs: int, prompt: str, count_tokens):
+    """Median (time to first token, tokens per second, consumer CPU µs per token) over runs."""
+    from tts_engine.inference import generate_tokens_from_api
+    first, rates, cpu = [], [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        cpu_start = time.thread_time()
+        first_token = None
+        for _ in generate_tokens_from_api(prompt, voice="tara", config=config):
+            if first_token is None:
+                first_token = time.perf_counter() - start
+        elapsed = time.perf_counter() - start
+        tokens = count_tokens()
+        if not tokens:
+            raise RuntimeError("no tokens were generated")
+        first.append(first_token)
+        rates.append(tokens / elapsed)
+        cpu.append((time.thread_time() - cpu_start) / tokens * 1e6)
+    return {
+        "tokens": tokens,
+        "first_token_ms": round(statistics.median(first) * 1000, 1),
+        "tokens_per_second": round(statistics.median(rates), 1),
+        "consumer_cpu_us_per_token": round(statistics.median(cpu), 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare HTTP and in-process token generation for one GGUF model")
+    parser.add_argument("--model", required=True, help="GGUF model file")
+    parser.add_argument("--api-url", help="Existing completions URL serving the same model (default: start a server)")
+    parser.add_argument("--backend", help="Backend adapter for --api-url (default: generic)")
+    parser.add_argument("--tokens", type=int, default=128, help="Tokens generated per run")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per path (after one warm-up run)")
+    parser.add_argument("--context", type=int, default=2048, help="Context size for both paths")
+    parser.add_argument("--prompt", default="The quick brown fox jumps over the lazy dog.", help="Text to generate from")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    # The engine reads its settings at import
+    os.environ["ORPHEUS_LLM_CONTEXT"] = str(args.context)
+    from tts_engine.inference import RuntimeConfig
+    from tts_engine.inprocess import inprocess_engine
+
+    process = None
+    if args.api_url:
+        api_url, backend_name = args.api_url, args.backend or "generic"
+    else:
+        process, api_url, backend_name = start_server(args.model, args.context)
+    http_backend = counting_backend(backend_name)
+
+    def config(backend):
+        return RuntimeConfig.from_env({
+            "ORPHEUS_API_URL": api_url,
+            "ORPHEUS_BACKEND": backend,
+            "ORPHEUS_MODEL_NAME": os.path.abspath(args.model),
+            "ORPHEUS_MAX_TOKENS": str(args.tokens),
+            "ORPHEUS_TEMPERATURE": "0",
+        })
+
+    results = {"model": args.model, "runs": args.runs, "http_server": api_url}
+    try:
+        http_config = config(http_backend.name)
+        measure(http_config, 1, args.prompt, lambda: 1)
+
+        def http_tokens():
+            tokens, http_backend.events = http_backend.events, 0
+            return tokens
+        http_backend.events = 0
+        results["http"] = measure(http_config, args.runs, args.prompt, http_tokens)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    inprocess_config = config("inprocess")
+    measure(inprocess_config, 1, args.prompt, lambda: 1)
+    counted = [inprocess_engine.tokens]
+
+    def inprocess_tokens():
+        tokens = inprocess_engine.tokens - counted[0]
+        counted[0] = inprocess_engine.tokens
+        return tokens
+    results["inprocess"] = measure(inprocess_config, args.runs, args.prompt, inprocess_tokens)
+    results["load_seconds"] = inprocess_engine.load_seconds
+
+    http, inprocess = results["http"], results["inprocess"]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{args.model}: {args.runs} runs per path, medians")
+        print(f"{'':10} {'tokens':>7} {'first token':>12} {'tokens/s':>10} {'consumer CPU/token':>19}")
+        for name, row in (("http", http), ("inprocess", inprocess)):
+            print(f"{name:10} {row['tokens']:7d} {row['first_token_ms']:10.1f}ms {row['tokens_per_second']:10.1f} "
+                  f"{row['consumer_cpu_us_per_token']:17.2f}µs")
+        print(f"In-process: {inprocess['tokens_per_second'] / http['tokens_per_second']:.2f}x tokens/s, "
+              f"first token {http['first_token_ms'] - inprocess['first_token_ms']:.1f}ms sooner")
+
+if __name__ == "__main__":
+    main()
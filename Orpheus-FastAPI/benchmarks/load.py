@@ -0,0 +1,539 @@
+"""
+Load generator for Orpheus-FASTAPI.
+
+Sends a mix of speech requests to a running server and reports, per load step
+and per endpoint:
+
+- ttfb: time until the first response byte (for /speak and WAV responses this is
+  close to the total, since the audio is only sent once it is complete)
+- total: time until the whole response has arrived
+- realtime factor: seconds of audio per second of total time. Its p95 and p99 are
+  the low tail, the factor that 95% and 99% of requests reached or beat
+- error rate, by kind (429, 503, other status codes, timeouts, connection errors)
+
+Two ways to apply load:
+
+- closed loop (--users): N virtual users, each sending its next request as soon
+  as the previous one finished
+- open loop (--rps): requests arrive at random (Poisson) times at a target rate,
+  whether or not earlier ones finished. Latencies count from the scheduled arrival,
+  so a client that falls behind does not hide the server's queueing
+
+Comma-separated --users or --rps values run one step each. The first step whose
+p95 realtime factor drops below 1 (streams slower than realtime) or whose error
+rate exceeds --max-error-rate is reported as the saturation point.
+
+Endpoints: speech (/v1/audio/speech as WAV), speech-stream (/v1/audio/speech as
+streamed PCM), speak (/speak, then the file it names), ws (/v1/audio/speech/ws,
+needs the websockets package).
+
+With --stub-llm, no LLM is needed: a stub completion server streams random audio
+tokens at --stub-rate tokens per second (about as many as the text would produce
+as speech), and a server is started against it. SNAC still decodes for real.
+
+Usage:
+    python benchmarks/load.py --users 1,2,4 --duration 60
+    python benchmarks/load.py --rps 0.5,1,2 --duration 120 --endpoints speech-stream=3,speak=1
+    python benchmarks/load.py --voices tara=2,leo=1 --lengths short=6,medium=3,long=1 --report load.json
+    python benchmarks/load.py --stub-llm --stub-rate 400 --users 1,2,4,8 --duration 30 --json
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import wave
+import random
+import shutil
+import socket
+import tempfile
+import argparse
+import threading
+import subprocess
+import urllib.parse
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = ("speech", "speech-stream", "speak", "ws")
+
+# Sentences that texts of the requested lengths are built from
+SENTENCES = [
+    "Sure, I can help with that.",
+    "Your order shipped on Monday and should arrive by Thursday.",
+    "I'll send the tracking link to your email.",
+    "The meeting has been moved to three o'clock, in the large conference room on the second floor.",
+    "That's a great question, and the short answer is yes.",
+    "If you run it once a day, the free plan covers it; anything more and you'd want the standard plan.",
+    "There are three restaurants within walking distance that are still open.",
+    "Would you like me to book a table at the closest one?",
+    "The weather tomorrow will be mostly sunny, with a high of twenty-two degrees and a light breeze from the west.",
+    "Chapter one. It was late in the evening when the train finally pulled into the station.",
+    "She looked out over the harbour, where the fishing boats were coming in one by one.",
+    "Please hold while I transfer you to the billing department.",
+]
+
+# Text lengths in characters (inclusive ranges)
+LENGTHS = {"short": (40, 120), "medium": (200, 500), "long": (800, 1500)}
+
+# Speech rate the stub LLM sizes its answers by, and SNAC's audio tokens per second of speech
+_CHARS_PER_SECOND = 15
+_TOKENS_PER_SECOND = 7 * 24000 / 2048
+
+def parse_mix(value: str, choices=None):
+    """Parse "a=3,b=1" (weights default to 1) into (names, weights)."""
+    names, weights = [], []
+    for item in value.split(","):
+        name, _, weight = item.strip().partition("=")
+        if choices is not None and name not in choices:
+            raise argparse.ArgumentTypeError(f"unknown value '{name}' (choose from {', '.join(choices)})")
+        try:
+            weights.append(float(weight) if weight else 1.0)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid weight '{weight}' for '{name}'")
+        names.append(name)
+    return names, weights
+
+def parse_steps(value: str):
+    try:
+        steps = [float(step) for step in value.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid steps '{value}' (expected numbers like 1,2,4)")
+    if any(step <= 0 for step in steps):
+        raise argparse.ArgumentTypeError("steps must be positive")
+    return steps
+
+def make_text(rng: random.Random, length: str, texts=None) -> str:
+    """A text of the given length class, from the built-in sentences or from texts."""
+    low, high = LENGTHS[length]
+    if texts:
+        fitting = [text for text in texts if low <= len(text) <= high]
+        return rng.choice(fitting or texts)
+    target = rng.randint(low, high)
+    parts = []
+    while sum(len(part) + 1 for part in parts) < target:
+        parts.append(rng.choice(SENTENCES))
+    return " ".join(parts)[:high]
+
+# Stub LLM
+
+def _stub_handler(rate: float):
+    """Completion server streaming random audio tokens, as many as the prompt would take to speak."""
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            # The server's readiness check asks for the model list
+            body = json.dumps({"data": [{"id": "stub"}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            prompt = request.get("prompt", "")
+            seconds = max(1.0, len(prompt) / _CHARS_PER_SECOND)
+            count = min(int(seconds * _TOKENS_PER_SECOND), request.get("max_tokens") or 8192)
+            count -= count % 7
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            rng = random.Random()
+            start = time.perf_counter()
+            try:
+                for index in range(count):
+                    number = rng.randint(1, 4095) + 10 + (index % 7) * 4096
+                    event = {"choices": [{"text": f"<custom_token_{number}>", "index": 0, "finish_reason": None}]}
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+                    # Pace by the clock rather than per-token sleeps, which overshoot
+                    delay = start + (index + 1) / rate - time.perf_counter()
+                    if delay > 0:
+                        self.wfile.flush()
+                        time.sleep(delay)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    return StubHandler
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+# Starts the server with .env looked up in its working directory; python-dotenv
+# otherwise finds the project's .env next to app.py, which overrides the environment
+_SERVER_BOOTSTRAP = (
+    "import os, sys, dotenv.main, uvicorn; "
+    "dotenv.main.find_dotenv = lambda *args, **kwargs: os.path.abspath('.env'); "
+    "uvicorn.run('app:app', host='127.0.0.1', port=int(sys.argv[1]), log_level='warning')"
+)
+
+def _server_dir(settings) -> str:
+    """
+    Working directory for a server using the stub, with a copy of the project's
+    .env with settings applied. Its outputs and jobs stay in there too.
+    """
+    directory = tempfile.mkdtemp(prefix="orpheus-load-")
+    for name in ("static", "templates"):
+        os.symlink(os.path.join(PROJECT_DIR, name), os.path.join(directory, name))
+    lines = []
+    for name in (".env", ".env.example"):
+        path = os.path.join(PROJECT_DIR, name)
+        if os.path.exists(path):
+            with open(path) as f:
+                lines = [line.rstrip("\n") for line in f if line.split("=", 1)[0].strip() not in settings]
+            break
+    with open(os.path.join(directory, ".env"), "w") as f:
+        f.write("\n".join(lines + [f"{key}={value}" for key, value in settings.items()]) + "\n")
+    return directory
+
+def start_stub_server(rate: float, server_env, timeout: float = 180):
+    """Start the stub LLM and a server using it; returns (base URL, stop function)."""
+    stub = ThreadingHTTPServer(("127.0.0.1", 0), _stub_handler(rate))
+    stub.daemon_threads = True
+    threading.Thread(target=stub.serve_forever, name="StubLLM", daemon=True).start()
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    settings = dict(server_env, ORPHEUS_API_URL=f"http://127.0.0.1:{stub.server_address[1]}/v1/completions")
+    directory = _server_dir(settings)
+    env = dict(os.environ, PYTHONUNBUFFERED="1", **settings)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [PROJECT_DIR, os.environ.get("PYTHONPATH")]))
+    process = subprocess.Popen(
+        [sys.executable, "-c", _SERVER_BOOTSTRAP, str(port)],
+        cwd=directory,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    def stop():
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        stub.shutdown()
+        shutil.rmtree(directory, ignore_errors=True)
+
+    # Wait until the decoder is warmed up and the stub answers the readiness check
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline and process.poll() is None:
+        try:
+            with urllib.request.urlopen(f"{base}/readyz", timeout=2) as response:
+                if response.status == 200:
+                    return base, stop
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            pass
+        time.sleep(0.2)
+    stop()
+    raise RuntimeError(f"the server did not become ready within {timeout:.0f}s")
+
+# Requests
+
+def _wav_seconds(data: bytes) -> float:
+    with wave.open(io.BytesIO(data), "rb") as wav_file:
+        return wav_file.getnframes() / wav_file.getframerate()
+
+def _post(url: str, body, timeout: float, start: float):
+    """POST JSON and read the response; returns (first byte seconds, body) measured from start."""
+    request = urllib.request.Request(url, data=json.dumps(body).encode(), headers={"Content-Type": "application/json"})
+    first_byte = None
+    parts = []
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        while True:
+            chunk = response.read1(65536)
+            if not chunk:
+                break
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+            parts.append(chunk)
+    return first_byte, b"".join(parts)
+
+def _websocket(base: str, text: str, voice: str, sample_rate: int, timeout: float, start: float):
+    """Speak text over the WebSocket endpoint; returns (first audio seconds, audio seconds)."""
+    # Imported here: only the ws endpoint needs the package
+    from websockets.sync.client import connect
+    query = urllib.parse.urlencode({"voice": voice, "sample_rate": sample_rate})
+    url = base.replace("http", "ws", 1) + f"/v1/audio/speech/ws?{query}"
+    first_byte = None
+    audio_bytes = 0
+    with connect(url, open_timeout=timeout, close_timeout=5) as ws:
+        ws.send(json.dumps({"type": "text", "text": text}))
+        ws.send(json.dumps({"type": "end"}))
+        while True:
+            message = ws.recv(timeout=timeout)
+            if isinstance(message, bytes):
+                if first_byte is None:
+                    first_byte = time.perf_counter() - start
+                audio_bytes += len(message)
+                continue
+            event = json.loads(message)
+            if event["type"] == "error":
+                raise RuntimeError(event.get("message", "error"))
+            if event["type"] == "done":
+                break
+    return first_byte, audio_bytes / 2 / sample_rate
+
+def send(base: str, endpoint: str, text: str, voice: str, sample_rate: int, timeout: float, start: float):
+    """Send one request; returns its measurements (error is None on success)."""
+    result = {"endpoint": endpoint, "voice": voice, "chars": len(text), "error": None,
+              "ttfb": None, "total": None, "audio_seconds": None}
+    try:
+        if endpoint == "speech":
+            ttfb, data = _post(f"{base}/v1/audio/speech", {"input": text, "voice": voice}, timeout, start)
+            audio_seconds = _wav_seconds(data)
+        elif endpoint == "speech-stream":
+            body = {"input": text, "voice": voice, "response_format": "pcm", "sample_rate": sample_rate}
+            ttfb, data = _post(f"{base}/v1/audio/speech", body, timeout, start)
+            audio_seconds = len(data) / 2 / sample_rate
+        elif endpoint == "speak":
+            ttfb, data = _post(f"{base}/speak", {"text": text, "voice": voice}, timeout, start)
+            with urllib.request.urlopen(f"{base}/{json.loads(data)['output_file']}", timeout=timeout) as response:
+                audio_seconds = _wav_seconds(response.read())
+        else:
+            ttfb, audio_seconds = _websocket(base, text, voice, sample_rate, timeout, start)
+        result["total"] = time.perf_counter() - start
+        result["ttfb"] = ttfb if ttfb is not None else result["total"]
+        result["audio_seconds"] = audio_seconds
+        if not audio_seconds:
+            result["error"] = "no_audio"
+    except urllib.error.HTTPError as e:
+        result["error"] = str(e.code)
+    except (socket.timeout, TimeoutError):
+        result["error"] = "timeout"
+    except (urllib.error.URLError, ConnectionError, OSError) as e:
+        result["error"] = "timeout" if "timed out" in str(e) else "connection"
+    except Exception as e:
+        result["error"] = type(e).__name__
+    return result
+
+# Load patterns
+
+class Workload:
+    """Draws the endpoint, voice and text of each request from the configured mixes."""
+    def __init__(self, endpoints, voices, lengths, texts, seed: int):
+        self.endpoints, self.voices, self.lengths = endpoints, voices, lengths
+        self.texts = texts
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def next(self):
+        with self._lock:
+            endpoint = self._rng.choices(*self.endpoints)[0]
+            voice = self._rng.choices(*self.voices)[0]
+            text = make_text(self._rng, self._rng.choices(*self.lengths)[0], self.texts)
+        return endpoint, voice, text
+
+def run_closed(users: int, duration: float, request):
+    """users virtual users send requests back to back for duration seconds."""
+    results = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def user():
+        while time.perf_counter() < deadline:
+            result = request(time.perf_counter())
+            with lock:
+                results.append(result)
+
+    threads = [threading.Thread(target=user, name=f"User-{i}") for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, 0
+
+def run_open(rps: float, duration: float, request, max_in_flight: int, seed: int):
+    """Requests arrive at Poisson times averaging rps for duration seconds; returns (results, dropped)."""
+    rng = random.Random(seed)
+    results = []
+    lock = threading.Lock()
+    slots = threading.Semaphore(max_in_flight)
+    dropped = 0
+
+    def run(scheduled):
+        try:
+            result = request(scheduled)
+            with lock:
+                results.append(result)
+        finally:
+            slots.release()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="Arrival") as pool:
+        scheduled = start
+        while True:
+            scheduled += rng.expovariate(rps)
+            if scheduled - start >= duration:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            # Arrivals beyond the client's own limit are counted, not sent
+            if not slots.acquire(blocking=False):
+                dropped += 1
+                continue
+            pool.submit(run, scheduled)
+    return results, dropped
+
+# Report
+
+def percentiles(values, low_tail: bool = False):
+    """p50/p95/p99 of values (for low_tail, the values 95%/99% of samples reached or beat)."""
+    if not values:
+        return None
+    points = (50, 5, 1) if low_tail else (50, 95, 99)
+    return {f"p{p}": round(float(np.percentile(values, q)), 3) for p, q in zip((50, 95, 99), points)}
+
+def summarize(results, wall: float):
+    ok = [r for r in results if r["error"] is None]
+    errors = {}
+    for r in results:
+        if r["error"] is not None:
+            errors[r["error"]] = errors.get(r["error"], 0) + 1
+    summary = {
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "error_rate": round((len(results) - len(ok)) / len(results), 4) if results else None,
+        "errors_by_kind": errors,
+        "throughput_rps": round(len(ok) / wall, 3) if wall else None,
+        "audio_seconds_per_second": round(sum(r["audio_seconds"] for r in ok) / wall, 3) if wall else None,
+        "ttfb_ms": percentiles([r["ttfb"] * 1000 for r in ok]),
+        "total_ms": percentiles([r["total"] * 1000 for r in ok]),
+        "realtime_factor": percentiles([r["audio_seconds"] / r["total"] for r in ok if r["total"]], low_tail=True),
+    }
+    for key in ("ttfb_ms", "total_ms"):
+        if summary[key]:
+            summary[key] = {p: round(v, 1) for p, v in summary[key].items()}
+    return summary
+
+def capacity(base: str):
+    """The server's own view of its load (see /capacity), or None if it is unavailable."""
+    try:
+        with urllib.request.urlopen(f"{base}/capacity", timeout=5) as response:
+            report = json.loads(response.read())
+    except (urllib.error.URLError, ConnectionError, socket.timeout, ValueError):
+        return None
+    keys = ("in_flight", "queue_depth", "max_concurrency", "realtime_factor", "aggregate_realtime_factor", "max_streams")
+    return {key: report.get(key) for key in keys}
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply closed- or open-loop load to an Orpheus-FASTAPI server")
+    parser.add_argument("--url", default="http://127.0.0.1:5005", help="Server base URL (ignored with --stub-llm)")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--users", type=parse_steps, help="Closed loop: virtual users per step, e.g. 1,2,4 (default: 1)")
+    load.add_argument("--rps", type=parse_steps, help="Open loop: Poisson arrival rate per step, e.g. 0.5,1,2")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds of load per step")
+    parser.add_argument("--endpoints", type=lambda v: parse_mix(v, ENDPOINTS), default="speech-stream",
+                        help=f"Endpoint mix, NAME[=WEIGHT],... from {', '.join(ENDPOINTS)} (default: speech-stream)")
+    parser.add_argument("--voices", type=parse_mix, default="tara", help="Voice mix, NAME[=WEIGHT],... (default: tara)")
+    parser.add_argument("--lengths", type=lambda v: parse_mix(v, LENGTHS), default="short=6,medium=3,long=1",
+                        help="Text length mix over short (40-120 chars), medium (200-500) and long (800-1500) "
+                             "(default: short=6,medium=3,long=1)")
+    parser.add_argument("--texts", help="File with one text per line to draw from instead of the built-in sentences")
+    parser.add_argument("--sample-rate", type=int, default=24000, help="PCM rate for speech-stream and ws")
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds to wait for one response")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Open loop: most requests outstanding at once")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="Error rate that counts as saturated")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the workload and arrival times")
+    parser.add_argument("--no-warmup", action="store_true", help="Skip the warm-up request before the first step")
+    parser.add_argument("--stub-llm", action="store_true", help="Start a stub LLM and a server using it")
+    parser.add_argument("--stub-rate", type=float, default=400, help="Tokens per second per stub stream (speech is ~82)")
+    parser.add_argument("--server-env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Environment for the server started with --stub-llm (repeatable)")
+    parser.add_argument("--report", help="Write the JSON report to this file")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    texts = None
+    if args.texts:
+        with open(args.texts, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+    mode = "open" if args.rps else "closed"
+    steps = args.rps or args.users or [1]
+    workload = Workload(args.endpoints, args.voices, args.lengths, texts, args.seed)
+
+    stop = None
+    base = args.url.rstrip("/")
+    if args.stub_llm:
+        server_env = dict(item.split("=", 1) for item in args.server_env)
+        try:
+            base, stop = start_stub_server(args.stub_rate, server_env)
+        except RuntimeError as e:
+            print(f"❌ Could not start the server: {e}")
+            sys.exit(1)
+
+    def request(start):
+        endpoint, voice, text = workload.next()
+        return send(base, endpoint, text, voice, args.sample_rate, args.timeout, start)
+
+    report = {
+        "url": base, "mode": mode, "duration": args.duration, "stub_llm": args.stub_llm,
+        "endpoints": dict(zip(*args.endpoints)), "voices": dict(zip(*args.voices)),
+        "lengths": dict(zip(*args.lengths)), "steps": [], "saturation": None,
+    }
+    try:
+        if not args.no_warmup:
+            # Warm the decoder, the LLM and its prompt cache before measuring
+            warmup = send(base, "speech-stream", SENTENCES[0], args.voices[0][0], args.sample_rate,
+                          args.timeout, time.perf_counter())
+            if warmup["error"] == "connection":
+                print(f"❌ Could not reach {base}")
+                sys.exit(1)
+        for step in steps:
+            start = time.perf_counter()
+            if mode == "open":
+                results, dropped = run_open(step, args.duration, request, args.max_in_flight, args.seed)
+            else:
+                results, dropped = run_closed(int(step), args.duration, request)
+            wall = time.perf_counter() - start
+            row = {"rps" if mode == "open" else "users": step, "wall_seconds": round(wall, 1),
+                   **summarize(results, wall), "dropped": dropped, "server": capacity(base), "by_endpoint": {}}
+            for endpoint in sorted({r["endpoint"] for r in results}):
+                by_endpoint = summarize([r for r in results if r["endpoint"] == endpoint], wall)
+                row["by_endpoint"][endpoint] = by_endpoint
+            report["steps"].append(row)
+            rtf = row["realtime_factor"]
+            saturated = (row["error_rate"] is not None and row["error_rate"] > args.max_error_rate) or \
+                (rtf is not None and rtf["p95"] < 1.0)
+            if saturated and report["saturation"] is None:
+                report["saturation"] = step
+            if not args.json:
+                label = f"{step:g} rps" if mode == "open" else f"{int(step)} users"
+                ttfb, total = row["ttfb_ms"] or {}, row["total_ms"] or {}
+                print(f"{label:>10}: {row['requests']} requests, {row['error_rate'] or 0:.1%} errors, "
+                      f"{row['throughput_rps']:.2f} rps, ttfb p50/p95/p99 "
+                      f"{ttfb.get('p50', 0):.0f}/{ttfb.get('p95', 0):.0f}/{ttfb.get('p99', 0):.0f}ms, total "
+                      f"{total.get('p50', 0):.0f}/{total.get('p95', 0):.0f}/{total.get('p99', 0):.0f}ms, realtime "
+                      f"p50 {rtf['p50'] if rtf else 0:.2f}x p95 {rtf['p95'] if rtf else 0:.2f}x"
+                      f"{'  SATURATED' if saturated else ''}")
+    finally:
+        if stop:
+            stop()
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    elif report["saturation"] is not None:
+        print(f"Saturated at {report['saturation']:g} {'rps' if mode == 'open' else 'users'}")
+    else:
+        print("No step saturated the server")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Resampler benchmark for Orpheus-FASTAPI.
+
+Feeds 24 kHz speech-like PCM (a gliding tone with noise and a syllable envelope)
+through the streaming resampler in chunks the size the SNAC decoder emits, for
+every supported output rate, and reports:
+
+- throughput: input samples resampled per second of CPU time
+- realtime: seconds of audio resampled per second of CPU time
+- seams: whether the chunked output is identical to resampling the whole
+  stream at once (it must be; chunk boundaries may not be audible)
+
+Usage:
+    python benchmarks/resample.py
+    python benchmarks/resample.py --seconds 60 --chunk 2048 --runs 5 --json
+    python benchmarks/resample.py --rate 8000 --rate 16000
+
+Exits with status 1 if any rate's chunked output differs from its one-shot output.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from tts_engine.resample import StreamingResampler, SUPPORTED_SAMPLE_RATES
+
+# Rate SNAC decodes at
+IN_RATE = 24000
+
+def speech_like(seconds: float, seed: int = 0) -> bytes:
+    """int16 PCM at IN_RATE with speech-like pitch, syllable rate and level."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * IN_RATE)) / IN_RATE
+    pitch = 140 + 40 * np.sin(2 * np.pi * 0.7 * t)
+    voice = sum(np.sin(2 * np.pi * k * np.cumsum(pitch) / IN_RATE) / k for k in range(1, 8))
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None)
+    signal = 4000 * voice * envelope + 300 * rng.standard_normal(len(t))
+    return np.clip(signal, -32768, 32767).astype(np.int16).tobytes()
+
+def resample(pcm: bytes, out_rate: int, chunk_samples: int) -> bytes:
+    """Resample pcm in chunks of chunk_samples (0 for one chunk), including the flush."""
+    resampler = StreamingResampler(IN_RATE, out_rate)
+    step = 2 * chunk_samples if chunk_samples else len(pcm)
+    output = [resampler.process(pcm[i:i + step]) for i in range(0, len(pcm), step)]
+    output.append(resampler.flush())
+    return b"".join(output)
+
+def measure(pcm: bytes, out_rate: int, chunk_samples: int, runs: int):
+    """Median CPU seconds to resample pcm in chunks, and the chunked output."""
+    times = []
+    for _ in range(runs):
+        start = time.process_time()
+        output = resample(pcm, out_rate, chunk_samples)
+        times.append(time.process_time() - start)
+    return statistics.median(times), output
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure streaming resampler throughput and seam-freedom")
+    parser.add_argument("--seconds", type=float, default=30, help="Seconds of 24 kHz audio to resample")
+    parser.add_argument("--chunk", type=int, default=2048, help="Input samples per chunk (the decoder emits 2048)")
+    parser.add_argument("--rate", type=int, action="append", help="Output rate (repeatable; default: all supported)")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per rate (after one warm-up)")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+    rates = [rate for rate in (args.rate or SUPPORTED_SAMPLE_RATES) if rate != IN_RATE]
+
+    pcm = speech_like(args.seconds)
+    input_samples = len(pcm) // 2
+    results = {"seconds": args.seconds, "chunk": args.chunk, "runs": args.runs, "rates": {}}
+    for rate in rates:
+        if rate not in SUPPORTED_SAMPLE_RATES:
+            parser.exit(1, f"Unsupported rate {rate} (supported: {', '.join(map(str, SUPPORTED_SAMPLE_RATES))})\n")
+        # Warm the filter cache before measuring
+        resample(pcm[:2 * args.chunk], rate, args.chunk)
+        seconds, chunked = measure(pcm, rate, args.chunk, args.runs)
+        whole = resample(pcm, rate, 0)
+        results["rates"][rate] = {
+            "msamples_per_s": round(input_samples / seconds / 1e6, 2),
+            "x_realtime": round(args.seconds / seconds, 1),
+            "output_samples": len(chunked) // 2,
+            "seam_free": chunked == whole,
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{args.seconds:g}s of 24 kHz audio in {args.chunk}-sample chunks, median of {args.runs} runs")
+        print(f"{'rate':>7} {'MSamples/s':>11} {'realtime':>10} {'samples':>9}  seams")
+        for rate, row in results["rates"].items():
+            seams = "identical" if row["seam_free"] else "MISMATCH"
+            print(f"{rate:>7} {row['msamples_per_s']:>11.2f} {row['x_realtime']:>9.1f}x "
+                  f"{row['output_samples']:>9}  {seams}")
+    if not all(row["seam_free"] for row in results["rates"].values()):
+        print("❌ Chunked output differs from one-shot output")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Startup benchmark for Orpheus-FASTAPI.
+
+Measures two things and checks them against a budget:
+
+1. Import time of the server module (`import app`), using `python -X importtime`.
+   Prints the slowest modules and flags heavy modules that the server path
+   should not import at startup (torch, snac, sounddevice, av).
+2. Wall-clock time from launching the server to:
+   - listening (/healthz answers)
+   - decoder ready (SNAC loaded and warmed, reported by /readyz)
+   - ready (/readyz returns 200, which also needs the LLM backend)
+
+Usage:
+    python benchmarks/startup.py
+    python benchmarks/startup.py --import-only --json
+    python benchmarks/startup.py --import-budget-ms 800 --ready-budget-s 20
+
+Exits with status 1 if a measurement exceeds its budget.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import socket
+import argparse
+import subprocess
+import urllib.request
+import urllib.error
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Budgets tracked over time; lower them as startup gets faster
+IMPORT_BUDGET_MS = 1500
+READY_BUDGET_S = 60
+
+# Modules the server should only import on first use
+DEFERRED_MODULES = ("torch", "snac", "sounddevice", "av")
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+def measure_imports(module: str = "app"):
+    """Import module in a fresh interpreter and return (wall seconds, [(name, self_us, cumulative_us, depth)])."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    modules = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return wall, modules
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _get_json(url: str):
+    """Return (status, body) for url, or (None, None) if nothing is listening yet."""
+    try:
+        with urllib.request.urlopen(url, timeout=2) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"{}")
+    except (urllib.error.URLError, ConnectionError, socket.timeout):
+        return None, None
+
+def measure_ready(timeout: float):
+    """Start the server and return seconds until listening, decoder ready and fully ready (None if not reached)."""
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=PROJECT_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    times = {"listening": None, "decoder_ready": None, "ready": None}
+    try:
+        while time.perf_counter() - start < timeout and process.poll() is None:
+            elapsed = time.perf_counter() - start
+            if times["listening"] is None:
+                status, _ = _get_json(f"{base}/healthz")
+                if status == 200:
+                    times["listening"] = elapsed
+            else:
+                status, report = _get_json(f"{base}/readyz")
+                if report and report.get("checks", {}).get("decoder", {}).get("ready") and times["decoder_ready"] is None:
+                    times["decoder_ready"] = elapsed
+                if status == 200:
+                    times["ready"] = elapsed
+                    break
+            time.sleep(0.05)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return times
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Orpheus-FASTAPI import time and time to ready")
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS, help="Budget for `import app` in milliseconds")
+    parser.add_argument("--ready-budget-s", type=float, default=READY_BUDGET_S, help="Budget for launch to decoder ready in seconds")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest modules to list")
+    parser.add_argument("--import-only", action="store_true", help="Skip starting the server")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    wall, modules = measure_imports()
+    total_ms = next((cumulative for name, _, cumulative, depth in modules if name == "app" and depth == 0), 0) / 1000
+    deferred = sorted({name.split(".")[0] for name, _, _, _ in modules if name.split(".")[0] in DEFERRED_MODULES})
+    slowest = sorted(modules, key=lambda m: m[1], reverse=True)[:args.top]
+
+    results = {
+        "import_ms": round(total_ms, 1),
+        "import_wall_ms": round(wall * 1000, 1),
+        "import_budget_ms": args.import_budget_ms,
+        "deferred_modules_imported": deferred,
+        "slowest_modules": [{"module": name, "self_ms": round(self_us / 1000, 1), "cumulative_ms": round(cumulative_us / 1000, 1)}
+                            for name, self_us, cumulative_us, _ in slowest],
+    }
+    if not args.import_only:
+        times = measure_ready(timeout=max(args.ready_budget_s * 2, 30))
+        results.update({f"{name}_s": round(value, 2) if value is not None else None for name, value in times.items()})
+        results["ready_budget_s"] = args.ready_budget_s
+
+    failures = []
+    if total_ms > args.import_budget_ms:
+        failures.append(f"import app took {total_ms:.0f}ms (budget {args.import_budget_ms:.0f}ms)")
+    if deferred:
+        failures.append(f"deferred modules imported at startup: {', '.join(deferred)}")
+    if not args.import_only:
+        decoder_ready = results["decoder_ready_s"]
+        if decoder_ready is None or decoder_ready > args.ready_budget_s:
+            failures.append(f"decoder ready after {decoder_ready}s (budget {args.ready_budget_s:.0f}s)")
+    results["failures"] = failures
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"import app: {total_ms:.0f}ms (interpreter wall {wall * 1000:.0f}ms, budget {args.import_budget_ms:.0f}ms)")
+        print(f"Slowest modules (self time):")
+        for entry in results["slowest_modules"]:
+            print(f"  {entry['self_ms']:8.1f}ms  {entry['cumulative_ms']:8.1f}ms cumulative  {entry['module']}")
+        if not args.import_only:
+            for name in ("listening", "decoder_ready", "ready"):
+                value = results[f"{name}_s"]
+                print(f"{name.replace('_', ' ')}: {'not reached' if value is None else f'{value:.2f}s'}")
+        for failure in failures:
+            print(f"❌ {failure}")
+        if not failures:
+            print("✅ Within budget")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
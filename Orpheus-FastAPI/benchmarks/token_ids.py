@@ -0,0 +1,131 @@
+"""
+Token-ID streaming benchmark for Orpheus-FASTAPI.
+
+Streams the same audio tokens from a local stub of the llama.cpp server twice:
+
+1. text: /v1/completions events carrying "<custom_token_N>" text, which the client
+   splits and parses back into numbers (the default path)
+2. ids: native /completion events with return_tokens, whose vocabulary IDs map to
+   audio codes with integer arithmetic (ORPHEUS_TOKEN_IDS=true)
+
+Each stream runs through generate_tokens_from_api() and the decoder's token-to-code
+step, and the CPU time of the consuming thread is reported per token. The stub
+serves from other threads, so its time is not counted. SNAC decoding is the same
+for both paths and is left out.
+
+Usage:
+    python benchmarks/token_ids.py
+    python benchmarks/token_ids.py --tokens 28000 --runs 5 --json
+
+Exits with status 1 if the two paths produce different audio codes.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from tts_engine.inference import generate_tokens_from_api, RuntimeConfig
+from tts_engine.speechpipe import turn_token_into_id, CUSTOM_TOKEN_BASE
+
+def _stub_handler(codes):
+    """Request handler streaming codes as llama.cpp would, as text or as token IDs."""
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            native = self.path == "/completion"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            events = []
+            for index, code in enumerate(codes):
+                number = code + 10 + (index % 7) * 4096
+                text = f"<custom_token_{number}>"
+                if native:
+                    event = {"index": 0, "content": text, "tokens": [CUSTOM_TOKEN_BASE + number], "stop": False}
+                else:
+                    event = {"choices": [{"text": text, "index": 0, "finish_reason": None}], "object": "text_completion"}
+                events.append(f"data: {json.dumps(event)}\n\n")
+            if native:
+                events.append(f"data: {json.dumps({'index': 0, 'content': '', 'tokens': [], 'stop': True})}\n\n")
+            else:
+                events.append("data: [DONE]\n\n")
+            self.wfile.write("".join(events).encode())
+
+    return StubHandler
+
+def measure(config: RuntimeConfig, runs: int):
+    """Return (CPU seconds of the consuming thread, tokens, audio codes of the last run)."""
+    cpu = 0.0
+    tokens = 0
+    codes = []
+    for _ in range(runs):
+        codes = []
+        start = time.thread_time()
+        for token in generate_tokens_from_api("benchmark", voice="tara", config=config):
+            code = turn_token_into_id(token, len(codes))
+            if code is not None and code > 0:
+                codes.append(code)
+        cpu += time.thread_time() - start
+        tokens += len(codes)
+    return cpu, tokens, codes
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare client CPU per token for text and token-ID streaming")
+    parser.add_argument("--tokens", type=int, default=14000, help="Audio tokens per stream")
+    parser.add_argument("--runs", type=int, default=3, help="Streams measured per mode")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    codes = [rng.randint(1, 4095) for _ in range(args.tokens - args.tokens % 7)]
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _stub_handler(codes))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_url = f"http://127.0.0.1:{server.server_address[1]}/v1/completions"
+
+    results = {"tokens_per_stream": len(codes), "runs": args.runs}
+    decoded = {}
+    for mode, token_ids in (("text", "false"), ("ids", "true")):
+        config = RuntimeConfig.from_env({
+            "ORPHEUS_API_URL": api_url,
+            "ORPHEUS_BACKEND": "llamacpp",
+            "ORPHEUS_TOKEN_IDS": token_ids,
+            "ORPHEUS_MAX_TOKENS": str(len(codes)),
+        })
+        # The first stream pays for one-time setup (hardware probe, connection pool)
+        measure(config, 1)
+        cpu, tokens, decoded[mode] = measure(config, args.runs)
+        results[f"{mode}_us_per_token"] = round(cpu / tokens * 1e6, 2) if tokens else None
+    server.shutdown()
+
+    text_us, ids_us = results["text_us_per_token"], results["ids_us_per_token"]
+    results["saved_us_per_token"] = round(text_us - ids_us, 2)
+    results["saved_percent"] = round((text_us - ids_us) / text_us * 100, 1)
+    results["codes_match"] = decoded["text"] == decoded["ids"] == codes
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{len(codes)} tokens per stream, {args.runs} streams per mode")
+        print(f"text:      {text_us:.2f}µs CPU per token")
+        print(f"token IDs: {ids_us:.2f}µs CPU per token")
+        print(f"saved:     {results['saved_us_per_token']:.2f}µs per token ({results['saved_percent']:.1f}%)")
+        print("✅ Both paths produced the same audio codes" if results["codes_match"]
+              else "❌ The paths produced different audio codes")
+    sys.exit(0 if results["codes_match"] else 1)
+
+if __name__ == "__main__":
+    main()
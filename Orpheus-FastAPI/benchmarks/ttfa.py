@@ -0,0 +1,125 @@
+"""
+Time-to-first-audio benchmark for Orpheus-FASTAPI.
+
+Sends the same short multi-sentence replies (the kind a conversational agent
+speaks) to a running server's /v1/audio/speech as raw PCM, once with the
+first-sentence fast start off and once with it on, and reports:
+
+- first byte: time until the first audio bytes arrive
+- first audible: time until the first chunk whose level is above silence
+  (int16 RMS of 64, the runaway guard's silence threshold), which is when the
+  listener hears the first syllable
+- total: time until the whole reply has arrived
+
+Usage:
+    python benchmarks/ttfa.py
+    python benchmarks/ttfa.py --url http://127.0.0.1:5005 --runs 5 --json
+    python benchmarks/ttfa.py --text "Sure, I can help with that. Your order shipped on Monday."
+"""
+
+import sys
+import json
+import time
+import argparse
+import statistics
+import urllib.request
+import urllib.error
+
+import numpy as np
+
+# Replies under the 1000-character batching threshold, each with more than one sentence
+TEXTS = [
+    "Sure, I can help with that. Your order shipped on Monday and should arrive by Thursday. "
+    "I'll send the tracking link to your email.",
+    "That's a great question. The short answer is yes, but it depends on how often you run it. "
+    "If it's once a day, the free plan covers it. Anything more and you'd want the standard plan.",
+    "Okay, here's what I found. There are three restaurants within walking distance that are still open, "
+    "and two of them take reservations. Would you like me to book a table at the closest one?",
+]
+
+# Chunks below this int16 RMS level count as silence
+AUDIBLE_RMS = 64
+
+def speak(url: str, text: str, voice: str, fast_start: bool, timeout: float):
+    """Stream one reply and return (first byte, first audible, total) seconds."""
+    body = json.dumps({
+        "input": text,
+        "voice": voice,
+        "response_format": "pcm",
+        "fast_start": fast_start,
+    }).encode()
+    request = urllib.request.Request(f"{url}/v1/audio/speech", data=body,
+                                     headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    first_byte = first_audible = None
+    pending = b""
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        while True:
+            chunk = response.read1(65536)
+            if not chunk:
+                break
+            now = time.perf_counter() - start
+            if first_byte is None:
+                first_byte = now
+            if first_audible is None:
+                # Keep whole int16 samples; a read can end mid-sample
+                pending += chunk
+                usable = len(pending) - len(pending) % 2
+                samples = np.frombuffer(pending[:usable], dtype=np.int16).astype(np.float32)
+                pending = pending[usable:]
+                if samples.size and float(np.sqrt(np.mean(samples * samples))) >= AUDIBLE_RMS:
+                    first_audible = now
+    total = time.perf_counter() - start
+    if first_byte is None:
+        raise RuntimeError("the server returned no audio")
+    return first_byte, first_audible if first_audible is not None else total, total
+
+def measure(url: str, texts, voice: str, fast_start: bool, runs: int, timeout: float):
+    """Median first byte, first audible and total milliseconds over runs of every text."""
+    first_bytes, first_audibles, totals = [], [], []
+    for _ in range(runs):
+        for text in texts:
+            first_byte, first_audible, total = speak(url, text, voice, fast_start, timeout)
+            first_bytes.append(first_byte)
+            first_audibles.append(first_audible)
+            totals.append(total)
+    return {
+        "first_byte_ms": round(statistics.median(first_bytes) * 1000, 1),
+        "first_audible_ms": round(statistics.median(first_audibles) * 1000, 1),
+        "total_ms": round(statistics.median(totals) * 1000, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare time to first audio with and without the fast start")
+    parser.add_argument("--url", default="http://127.0.0.1:5005", help="Server base URL")
+    parser.add_argument("--voice", default="tara", help="Voice to use")
+    parser.add_argument("--text", action="append", help="Reply to speak (repeatable; default: built-in replies)")
+    parser.add_argument("--runs", type=int, default=3, help="Runs of every text per mode (after one warm-up)")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds to wait for one reply")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+    texts = args.text or TEXTS
+
+    try:
+        # Warm the decoder, the LLM and its prompt cache before measuring
+        speak(args.url, texts[0], args.voice, False, args.timeout)
+        results = {"url": args.url, "texts": len(texts), "runs": args.runs}
+        for mode, fast_start in (("standard", False), ("fast_start", True)):
+            results[mode] = measure(args.url, texts, args.voice, fast_start, args.runs, args.timeout)
+    except (urllib.error.URLError, ConnectionError) as e:
+        print(f"❌ Could not reach {args.url}: {e}")
+        sys.exit(1)
+
+    standard, fast = results["standard"], results["fast_start"]
+    results["first_audible_saved_ms"] = round(standard["first_audible_ms"] - fast["first_audible_ms"], 1)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{len(texts)} replies x {args.runs} runs per mode, medians")
+        print(f"{'':11} {'first byte':>11} {'first audible':>14} {'total':>10}")
+        for name, row in (("standard", standard), ("fast start", fast)):
+            print(f"{name:11} {row['first_byte_ms']:9.1f}ms {row['first_audible_ms']:12.1f}ms {row['total_ms']:8.1f}ms")
+        print(f"Fast start: first audible {results['first_audible_saved_ms']:.1f}ms sooner")
+
+if __name__ == "__main__":
+    main()
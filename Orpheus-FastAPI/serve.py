@@ -0,0 +1,187 @@
+"""
+Production launcher for Orpheus-FASTAPI.
+
+Runs N uvicorn worker processes for HTTP handling and streaming, sharing one or
+a few decode service processes that own the SNAC model. Decode services are
+health-checked and restarted if they die or stop answering.
+
+Usage:
+    python serve.py --workers 4 --decoders 1
+
+This module deliberately does not import tts_engine: importing the package loads
+SNAC, which only the decode services should do.
+"""
+
+import os
+import sys
+import time
+import atexit
+import secrets
+import argparse
+import tempfile
+import threading
+import subprocess
+from multiprocessing.connection import Client
+
+import uvicorn
+from dotenv import load_dotenv
+
+# Seconds between decode service health checks, failed pings before a restart,
+# and seconds a (re)started service is given to load SNAC before pings count
+HEALTH_CHECK_INTERVAL = 5.0
+MAX_FAILED_PINGS = 3
+STARTUP_GRACE = 120.0
+
+def env_int(name: str, default: int) -> int:
+    """Read an integer environment variable, falling back to default if invalid."""
+    try:
+        return int(os.environ.get(name, str(default)))
+    except (ValueError, TypeError):
+        print(f"⚠️ Invalid {name} value, using {default} as fallback")
+        return default
+
+def decode_address(index: int) -> str:
+    """IPC address for the index-th decode service of this launcher."""
+    name = f"orpheus-decode-{os.getpid()}-{index}"
+    if sys.platform == "win32":
+        return f"\\\\.\\pipe\\{name}"
+    return os.path.join(tempfile.gettempdir(), f"{name}.sock")
+
+def ping(address: str, authkey: bytes, timeout: float = 2.0) -> bool:
+    """Check that a decode service answers on address within timeout seconds."""
+    result = {}
+
+    def attempt():
+        try:
+            conn = Client(address, authkey=authkey)
+            try:
+                conn.send(("ping",))
+                result["reply"] = conn.recv()
+            finally:
+                conn.close()
+        except Exception:
+            pass
+
+    # Client() has no timeout of its own, so run it on a throwaway thread
+    thread = threading.Thread(target=attempt, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return result.get("reply", (None,))[0] == "pong"
+
+class DecodeService:
+    """One supervised decode service process."""
+    def __init__(self, index: int, authkey: bytes):
+        self.index = index
+        self.address = decode_address(index)
+        self.authkey = authkey
+        self.process = None
+        self.started_at = 0.0
+        self.failed_pings = 0
+        self.restarts = 0
+
+    def start(self) -> None:
+        env = dict(os.environ)
+        env["ORPHEUS_DECODE_AUTHKEY"] = self.authkey.hex()
+        # The service must load SNAC itself rather than forward to another service
+        env.pop("ORPHEUS_DECODE_SERVICE", None)
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "tts_engine.decode_service", "--address", self.address],
+            env=env,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        self.started_at = time.time()
+        self.failed_pings = 0
+
+    def wait_ready(self, timeout: float = 300.0) -> bool:
+        """Wait until the service answers a ping (model loading can take a while)."""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                return False
+            if ping(self.address, self.authkey):
+                return True
+            time.sleep(0.5)
+        return False
+
+    def check(self) -> None:
+        """Restart the service if its process exited or it stopped answering pings."""
+        if self.process.poll() is not None:
+            print(f"⚠️ Decode service {self.index} exited with code {self.process.returncode}, restarting")
+        elif ping(self.address, self.authkey):
+            self.failed_pings = 0
+            return
+        elif time.time() - self.started_at < STARTUP_GRACE:
+            return
+        else:
+            self.failed_pings += 1
+            print(f"⚠️ Decode service {self.index} missed health check ({self.failed_pings}/{MAX_FAILED_PINGS})")
+            if self.failed_pings < MAX_FAILED_PINGS:
+                return
+            print(f"⚠️ Decode service {self.index} is unresponsive, restarting")
+        self.stop()
+        self.restarts += 1
+        self.start()
+
+    def stop(self) -> None:
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if sys.platform != "win32" and os.path.exists(self.address):
+            os.remove(self.address)
+
+def supervise(services, stop_event: threading.Event) -> None:
+    """Health-check loop run on a background thread of the launcher."""
+    while not stop_event.wait(HEALTH_CHECK_INTERVAL):
+        for service in services:
+            service.check()
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Run Orpheus-FASTAPI with multiple workers and a shared decode service")
+    parser.add_argument("--workers", type=int, default=env_int("ORPHEUS_WORKERS", 2), help="Number of HTTP worker processes")
+    parser.add_argument("--decoders", type=int, default=env_int("ORPHEUS_DECODE_WORKERS", 1), help="Number of decode service processes (each loads one SNAC model)")
+    parser.add_argument("--host", type=str, default=os.environ.get("ORPHEUS_HOST") or "0.0.0.0")
+    parser.add_argument("--port", type=int, default=env_int("ORPHEUS_PORT", 5005))
+    args = parser.parse_args()
+
+    # Each worker keeps its own in-memory outputs, so /outputs/<name> would 404 on the other workers
+    if args.workers > 1 and os.environ.get("ORPHEUS_OUTPUT_MODE", "persist").lower() == "memory":
+        print("❌ ORPHEUS_OUTPUT_MODE=memory needs a single worker; use persist or write_behind, or --workers 1")
+        sys.exit(1)
+
+    authkey = secrets.token_bytes(32)
+    services = [DecodeService(i, authkey) for i in range(max(1, args.decoders))]
+    stop_event = threading.Event()
+
+    def shutdown():
+        stop_event.set()
+        for service in services:
+            service.stop()
+
+    atexit.register(shutdown)
+
+    print(f"🔊 Starting {len(services)} decode service(s)...")
+    for service in services:
+        service.start()
+    for service in services:
+        if not service.wait_ready():
+            print(f"❌ Decode service {service.index} failed to start")
+            sys.exit(1)
+        print(f"✅ Decode service {service.index} ready on {service.address}")
+
+    supervisor = threading.Thread(target=supervise, args=(services, stop_event), name="DecodeSupervisor", daemon=True)
+    supervisor.start()
+
+    # Worker processes inherit these and forward SNAC decoding to the services
+    os.environ["ORPHEUS_DECODE_SERVICE"] = ",".join(service.address for service in services)
+    os.environ["ORPHEUS_DECODE_AUTHKEY"] = authkey.hex()
+
+    print(f"🔥 Starting Orpheus-FASTAPI Server on {args.host}:{args.port} with {args.workers} workers")
+    uvicorn.run("app:app", host=args.host, port=args.port, workers=max(1, args.workers))
+
+if __name__ == "__main__":
+    main()
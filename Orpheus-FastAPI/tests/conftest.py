@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import tts_engine from the project directory, wherever pytest is run from
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,91 @@
+import json
+import zlib
+
+import numpy as np
+import pytest
+
+from tts_engine import archive
+from tts_engine.archive import encode_archive, decode_archive, ArchiveError, TokenRecorder
+
+PARTS = [[0, 1, 4095, 17, 28, 300, 7], 2400, [4095] * 14, 0, [5, 6, 7, 8, 9, 10, 11]]
+
+def encoded(parts=PARTS):
+    return encode_archive(parts, sample_rate=24000, crossfade_ms=50, voice="tara",
+                          text="Hallo… ¿qué tal? 你好", temperature=0.6, trim_silence=False)
+
+def rebuild(header, codes: bytes, version=archive.ARCHIVE_VERSION, magic=archive.ARCHIVE_MAGIC) -> bytes:
+    """Archive bytes with a valid checksum around an arbitrary header and code region."""
+    header_bytes = json.dumps(header).encode("utf-8")
+    body = archive._PREFIX.pack(magic, version, len(header_bytes)) + header_bytes + codes
+    return body + archive._CHECKSUM.pack(zlib.crc32(body))
+
+def test_round_trip():
+    header, parts = decode_archive(encoded())
+    assert header["voice"] == "tara"
+    assert header["text"] == "Hallo… ¿qué tal? 你好"
+    assert header["sample_rate"] == 24000
+    assert header["crossfade_ms"] == 50
+    assert header["temperature"] == 0.6
+    assert len(parts) == len(PARTS)
+    for part, expected in zip(parts, PARTS):
+        if isinstance(expected, int):
+            assert part == expected
+        else:
+            assert part.dtype == np.dtype("<u2")
+            assert part.tolist() == expected
+
+def test_round_trip_without_codes():
+    header, parts = decode_archive(encoded([4800]))
+    assert parts == [4800]
+
+def test_round_trip_empty():
+    header, parts = decode_archive(encoded([]))
+    assert parts == [] and header["parts"] == []
+
+@pytest.mark.parametrize("length", [0, 3, 8, 12, 40, -4, -1])
+def test_truncated_archive_is_rejected(length):
+    with pytest.raises(ArchiveError):
+        decode_archive(encoded()[:length])
+
+@pytest.mark.parametrize("offset", [4, 12, 30, -10, -3])
+def test_corrupt_archive_is_rejected(offset):
+    data = bytearray(encoded())
+    data[offset] ^= 0x40
+    with pytest.raises(ArchiveError):
+        decode_archive(bytes(data))
+
+def test_appended_bytes_are_rejected():
+    with pytest.raises(ArchiveError):
+        decode_archive(encoded() + b"\x00\x00")
+
+def test_wrong_magic_is_rejected():
+    with pytest.raises(ArchiveError, match="Not a token archive"):
+        decode_archive(rebuild({"parts": []}, b"", magic=b"RIFF"))
+
+def test_unknown_version_is_rejected():
+    with pytest.raises(ArchiveError, match="version"):
+        decode_archive(rebuild({"parts": []}, b"", version=archive.ARCHIVE_VERSION + 1))
+
+def test_codes_not_matching_header_are_rejected():
+    codes = np.arange(5, dtype="<u2").tobytes()
+    with pytest.raises(ArchiveError, match="do not match"):
+        decode_archive(rebuild({"parts": [{"codes": 3}]}, codes))
+    with pytest.raises(ArchiveError, match="do not match"):
+        decode_archive(rebuild({"parts": [{"codes": 8}]}, codes))
+
+def test_malformed_header_is_rejected():
+    with pytest.raises(ArchiveError, match="Malformed"):
+        decode_archive(rebuild({"no_parts": True}, b""))
+    with pytest.raises(ArchiveError, match="Malformed"):
+        decode_archive(rebuild({"parts": []}, b"\x01"))
+
+def test_recorder_orders_parts_by_key():
+    recorder = TokenRecorder()
+    later = recorder.codes((2, 0))
+    recorder.silence((1,), 1200)
+    first = recorder.codes((0, 1))
+    earliest = recorder.codes((0, 0))
+    earliest.extend([1, 2])
+    first.extend([3])
+    later.extend([4, 5, 6])
+    assert recorder.parts() == [[1, 2], [3], 1200, [4, 5, 6]]
@@ -0,0 +1,118 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from tts_engine import checkpoints
+from tts_engine.checkpoints import CheckpointStore
+
+CODES = [0, 1, 4095, 17, 28, 300, 7]
+
+@pytest.fixture
+def store(tmp_path):
+    return CheckpointStore(str(tmp_path), 0, 0)
+
+@pytest.fixture
+def pcm():
+    rng = np.random.default_rng(0)
+    return rng.integers(-32768, 32768, 10000, dtype=np.int16).tobytes()
+
+def segment_path(store, key):
+    return os.path.join(store.directory, key + checkpoints.CHECKPOINT_EXTENSION)
+
+def test_round_trip(store, pcm):
+    key = store.segment_key("Hello there.", "tara", temperature=0.6)
+    store.save(key, pcm, CODES)
+    assert store.load(key) == (pcm, CODES)
+    assert os.listdir(store.directory) == [key + checkpoints.CHECKPOINT_EXTENSION]
+    stats = store.stats()
+    assert (stats["saved"], stats["hits"], stats["misses"]) == (1, 1, 0)
+    assert stats["reused_audio_seconds"] == pytest.approx(len(pcm) / 2 / checkpoints.SEGMENT_SAMPLE_RATE, abs=0.01)
+
+def test_round_trip_without_codes(store, pcm):
+    store.save("key", pcm, [])
+    assert store.load("key") == (pcm, [])
+
+def test_missing_segment(store):
+    assert store.load("missing") is None
+    assert store.stats()["misses"] == 1
+
+@pytest.mark.parametrize("damage", [
+    lambda data: data[:-1],
+    lambda data: data[:6],
+    lambda data: b"",
+    lambda data: data[:20] + bytes([data[20] ^ 0x01]) + data[21:],
+    lambda data: data[:-2] + bytes([data[-2] ^ 0x80, data[-1]]),
+    lambda data: b"RIFF" + data[4:],
+])
+def test_corrupt_segment_is_discarded(store, pcm, damage):
+    store.save("key", pcm, CODES)
+    path = segment_path(store, "key")
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(damage(data))
+
+    assert store.load("key") is None
+    assert not os.path.exists(path)
+    assert store.stats()["corrupt"] == 1
+
+def test_segment_key_covers_every_parameter():
+    key = CheckpointStore.segment_key("Hi", "tara", temperature=0.6, top_p=0.9)
+    assert key == CheckpointStore.segment_key("Hi", "tara", top_p=0.9, temperature=0.6)
+    assert key != CheckpointStore.segment_key("Hi ", "tara", temperature=0.6, top_p=0.9)
+    assert key != CheckpointStore.segment_key("Hi", "leo", temperature=0.6, top_p=0.9)
+    assert key != CheckpointStore.segment_key("Hi", "tara", temperature=0.7, top_p=0.9)
+    assert key != CheckpointStore.segment_key("Hi", "tara", temperature=0.6)
+
+def test_checkpointed_saves_completed_generation(store, pcm):
+    chunks = [pcm[:4000], pcm[4000:]]
+    assert list(store.checkpointed("key", iter(chunks), CODES)) == chunks
+    assert store.load("key") == (pcm, CODES)
+
+def test_checkpointed_skips_closed_generation(store, pcm):
+    stream = store.checkpointed("key", iter([pcm[:4000], pcm[4000:]]), CODES)
+    assert next(stream) == pcm[:4000]
+    stream.close()
+    assert store.load("key") is None
+    assert store.stats()["saved"] == 0
+
+def test_checkpointed_skips_failed_generation(store, pcm):
+    def failing():
+        yield pcm[:4000]
+        raise RuntimeError("backend failed")
+
+    with pytest.raises(RuntimeError):
+        list(store.checkpointed("key", failing(), CODES))
+    assert store.load("key") is None
+
+def test_replay_restores_audio(pcm):
+    chunks = list(CheckpointStore.replay(pcm))
+    assert b"".join(chunks) == pcm
+    assert all(len(chunk) == checkpoints._REPLAY_CHUNK for chunk in chunks[:-1])
+    assert list(CheckpointStore.replay(b"")) == []
+
+def test_cleanup_evicts_least_recently_used(tmp_path, pcm):
+    store = CheckpointStore(str(tmp_path), 0, 0)
+    for key in ("old", "used", "new"):
+        store.save(key, pcm, CODES)
+    now = time.time()
+    os.utime(segment_path(store, "old"), (now - 300, now - 300))
+    os.utime(segment_path(store, "used"), (now - 200, now - 200))
+    os.utime(segment_path(store, "new"), (now - 100, now - 100))
+    # Loading marks a segment as used
+    assert store.load("used") is not None
+
+    store.max_bytes = 2 * os.path.getsize(segment_path(store, "new"))
+    store.cleanup()
+    assert sorted(os.listdir(tmp_path)) == ["new.seg", "used.seg"]
+    assert store.stats()["evicted"] == 1
+
+def test_cleanup_removes_expired(tmp_path, pcm):
+    store = CheckpointStore(str(tmp_path), 60, 0)
+    store.save("old", pcm, CODES)
+    stale = time.time() - 120
+    os.utime(segment_path(store, "old"), (stale, stale))
+    store.save("new", pcm, CODES)
+    assert os.listdir(tmp_path) == ["new.seg"]
@@ -0,0 +1,159 @@
+import asyncio
+
+import pytest
+
+from tts_engine import coalescing
+from tts_engine.coalescing import RequestCoalescer
+
+class FakeGeneration:
+    """A generation that yields the chunks put on its queue; None ends it, an exception fails it."""
+    def __init__(self):
+        self.queue = asyncio.Queue()
+        self.started = 0
+        self.cancelled = False
+        self.closed = False
+
+    async def source(self):
+        self.started += 1
+        try:
+            while True:
+                item = await self.queue.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        finally:
+            self.closed = True
+
+async def settle():
+    """Let the pump and the subscribers run until they wait again."""
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+def test_late_joiner_replays_prefix():
+    async def scenario():
+        coalescer = RequestCoalescer()
+        generation = FakeGeneration()
+        first = coalescer.stream("key", generation.source)
+        for chunk in (b"a", b"b"):
+            generation.queue.put_nowait(chunk)
+        assert [await first.__anext__(), await first.__anext__()] == [b"a", b"b"]
+
+        second = coalescer.stream("key", generation.source)
+        assert [await second.__anext__(), await second.__anext__()] == [b"a", b"b"]
+
+        generation.queue.put_nowait(b"c")
+        generation.queue.put_nowait(None)
+        assert [chunk async for chunk in first] == [b"c"]
+        assert [chunk async for chunk in second] == [b"c"]
+        return coalescer, generation
+
+    coalescer, generation = asyncio.run(scenario())
+    assert generation.started == 1
+    stats = coalescer.stats()
+    assert stats["generations_started"] == 1
+    assert stats["requests_joined"] == 1
+    assert stats["replayed_chunks"] == 2
+    assert stats["max_subscribers"] == 2
+    assert stats["in_flight"] == 0
+
+def test_generation_cancelled_only_when_last_subscriber_leaves():
+    async def scenario():
+        coalescer = RequestCoalescer()
+        generation = FakeGeneration()
+        first = coalescer.stream("key", generation.source)
+        second = coalescer.stream("key", generation.source)
+        generation.queue.put_nowait(b"a")
+        assert await first.__anext__() == b"a"
+        assert await second.__anext__() == b"a"
+
+        await first.aclose()
+        await settle()
+        assert not generation.closed
+        generation.queue.put_nowait(b"b")
+        assert await second.__anext__() == b"b"
+
+        await second.aclose()
+        await settle()
+        assert generation.cancelled and generation.closed
+        assert coalescer.stats()["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+def test_error_reaches_every_subscriber():
+    async def scenario():
+        coalescer = RequestCoalescer()
+        generation = FakeGeneration()
+        streams = [coalescer.stream("key", generation.source) for _ in range(3)]
+        generation.queue.put_nowait(b"a")
+        for stream in streams:
+            assert await stream.__anext__() == b"a"
+        generation.queue.put_nowait(ValueError("backend failed"))
+        for stream in streams:
+            with pytest.raises(ValueError, match="backend failed"):
+                await stream.__anext__()
+        assert coalescer.stats()["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+def test_finished_generation_is_not_reused():
+    async def scenario():
+        coalescer = RequestCoalescer()
+        generation = FakeGeneration()
+        for _ in range(2):
+            generation.queue.put_nowait(b"a")
+            generation.queue.put_nowait(None)
+            assert [chunk async for chunk in coalescer.stream("key", generation.source)] == [b"a"]
+        return generation
+
+    assert asyncio.run(scenario()).started == 2
+
+def test_different_keys_do_not_share():
+    async def scenario():
+        coalescer = RequestCoalescer()
+        one, two = FakeGeneration(), FakeGeneration()
+        first = coalescer.stream("one", one.source)
+        second = coalescer.stream("two", two.source)
+        one.queue.put_nowait(b"1")
+        two.queue.put_nowait(b"2")
+        assert await first.__anext__() == b"1"
+        assert await second.__anext__() == b"2"
+        await first.aclose()
+        await second.aclose()
+        return one, two
+
+    one, two = asyncio.run(scenario())
+    assert one.started == two.started == 1
+
+def test_disabled_coalescer_runs_every_request():
+    async def scenario():
+        coalescer = RequestCoalescer(enabled=False)
+        generation = FakeGeneration()
+        for chunk in (b"a", None, b"b", None):
+            generation.queue.put_nowait(chunk)
+        first = [chunk async for chunk in coalescer.stream("key", generation.source)]
+        second = [chunk async for chunk in coalescer.stream("key", generation.source)]
+        return first, second, generation
+
+    first, second, generation = asyncio.run(scenario())
+    assert (first, second) == ([b"a"], [b"b"])
+    assert generation.started == 2
+
+@pytest.mark.parametrize("one, two, shared", [
+    ("Hello there. How are you?", "Hello  there.\nHow are you?  ", True),
+    ("Hello there.\n\nHow are you?", "Hello there. How are you?", False),
+    ('Hello <break time="1s"/> there', "Hello there", False),
+    ('Hello <break time="1s"/> there', 'Hello <break time="1000ms"/>   there', True),
+])
+def test_make_key_follows_pauses(monkeypatch, one, two, shared):
+    monkeypatch.setattr(coalescing, "PAUSE_MARKUP", True)
+    assert (RequestCoalescer.make_key(one, voice="tara") == RequestCoalescer.make_key(two, voice="tara")) is shared
+
+def test_make_key_without_pause_markup(monkeypatch):
+    monkeypatch.setattr(coalescing, "PAUSE_MARKUP", False)
+    assert RequestCoalescer.make_key("Hello there.\n\nHow are you?") == RequestCoalescer.make_key("Hello there. How are you?")
+    assert RequestCoalescer.make_key("Hi", voice="tara") != RequestCoalescer.make_key("Hi", voice="leo")
@@ -0,0 +1,92 @@
+import pytest
+
+from tts_engine import markup
+from tts_engine.markup import split_pauses, has_speech
+
+@pytest.fixture(autouse=True)
+def default_pauses(monkeypatch):
+    """The documented default pause lengths, whatever the environment or .env sets."""
+    monkeypatch.setattr(markup, "PAUSE_MARKUP", True)
+    monkeypatch.setattr(markup, "BREAK_MS", 500.0)
+    monkeypatch.setattr(markup, "ELLIPSIS_PAUSE_MS", 400.0)
+    monkeypatch.setattr(markup, "PARAGRAPH_PAUSE_MS", 700.0)
+
+@pytest.mark.parametrize("text, expected", [
+    # No markup
+    ("Hello there.", ["Hello there."]),
+    ("Hello there.\nHow are you?", ["Hello there.\nHow are you?"]),
+    # Break tags
+    ('Hi <break time="250ms"/> there', ["Hi", 0.25, "there"]),
+    ('Hi <break time="1.5s"/> there', ["Hi", 1.5, "there"]),
+    ('Hi <break time="300"/> there', ["Hi", 0.3, "there"]),
+    ('Hi <BREAK TIME="2S"/> there', ["Hi", 2.0, "there"]),
+    ("Hi <break time='750ms'> there", ["Hi", 0.75, "there"]),
+    ('Hi <break strength="strong"/> there', ["Hi", 0.75, "there"]),
+    ('Hi <break strength="x-weak"/> there', ["Hi", 0.1, "there"]),
+    ('Hi <break strength="bogus"/> there', ["Hi", 0.5, "there"]),
+    ("Hi <break/> there", ["Hi", 0.5, "there"]),
+    ("Hi <break> there", ["Hi", 0.5, "there"]),
+    # time takes precedence over strength, in either order
+    ('Hi <break strength="x-strong" time="200ms"/> there', ["Hi", 0.2, "there"]),
+    ('Hi <break time="200ms" strength="x-strong"/> there', ["Hi", 0.2, "there"]),
+    # Ellipses end a phrase; inside a number or word they are text
+    ("Well... I think so", ["Well", 0.4, "I think so"]),
+    ("Well… I think so", ["Well", 0.4, "I think so"]),
+    ("Wait for it...", ["Wait for it", 0.4]),
+    ("Version 1...3 ships today", ["Version 1...3 ships today"]),
+    ("He said...really?", ["He said...really?"]),
+    # Paragraph gaps
+    ("Hello there.\n\nHow are you?", ["Hello there.", 0.7, "How are you?"]),
+    ("Hello there.\n  \n\n How are you?", ["Hello there.", 0.7, "How are you?"]),
+    # Adjacent pauses are merged
+    ('a <break time="1s"/><break time="500ms"/> b', ["a", 1.5, "b"]),
+    ('a <break time="1s"/> , <break time="1s"/> b', ["a", 2.0, "b"]),
+    ("Well...\n\nThen", ["Well", 1.1, "Then"]),
+    # Single and merged pauses are clamped to MAX_PAUSE_MS
+    ('a <break time="60s"/> b', ["a", 10.0, "b"]),
+    ('a <break time="8s"/> <break time="8s"/> b', ["a", 10.0, "b"]),
+    # Leading and trailing pauses
+    ('<break time="1s"/> Hi', [1.0, "Hi"]),
+    ('Hi <break time="1s"/>', ["Hi", 1.0]),
+    # A 0 ms tag is not a pause and never reaches the LLM
+    ('Hello <break time="0ms"/> world', ["Hello   world"]),
+    ('Hello <break strength="none"/> world', ["Hello   world"]),
+    ('Hi <break time="0s"/> there <break time="1s"/> you', ["Hi   there", 1.0, "you"]),
+    # Nothing to speak
+    ("", []),
+    ("   ", []),
+    ('<break time="0ms"/>', []),
+    ('<break time="0ms"/> <break strength="none"/>', []),
+    ("?!", []),
+    # Only a pause: silence, nothing spoken
+    ('<break time="1s"/>', [1.0]),
+])
+def test_split_pauses(text, expected):
+    assert split_pauses(text) == pytest.approx(expected)
+
+def test_zero_length_ellipsis_stays_in_text(monkeypatch):
+    monkeypatch.setattr(markup, "ELLIPSIS_PAUSE_MS", 0.0)
+    assert split_pauses("Well... I think so") == ["Well... I think so"]
+
+def test_zero_length_paragraph_becomes_space(monkeypatch):
+    monkeypatch.setattr(markup, "PARAGRAPH_PAUSE_MS", 0.0)
+    assert split_pauses("Hello there.\n\nHow are you?") == ["Hello there. How are you?"]
+
+def test_zero_length_bare_break(monkeypatch):
+    monkeypatch.setattr(markup, "BREAK_MS", 0.0)
+    assert split_pauses("Hi <break/> there") == ["Hi   there"]
+    assert split_pauses("<break/>") == []
+
+@pytest.mark.parametrize("text, expected", [
+    ("Hello", True),
+    ('<break time="1s"/>', True),
+    ('<break time="0ms"/>', False),
+    ("  \n\n ", False),
+])
+def test_has_speech(text, expected):
+    assert has_speech(text) is expected
+
+def test_has_speech_without_pause_markup(monkeypatch):
+    monkeypatch.setattr(markup, "PAUSE_MARKUP", False)
+    assert has_speech('<break time="0ms"/>')
+    assert not has_speech("   ")
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from tts_engine.resample import StreamingResampler, resample_chunks, SUPPORTED_SAMPLE_RATES
+
+IN_RATE = 24000
+OUT_RATES = [rate for rate in SUPPORTED_SAMPLE_RATES if rate != IN_RATE]
+
+def noise(samples, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(-20000, 20000, samples, dtype=np.int16)
+
+def tone(frequency, samples, rate=IN_RATE, amplitude=10000):
+    return (amplitude * np.sin(2 * np.pi * frequency * np.arange(samples) / rate)).astype(np.int16)
+
+def resample(chunks, out_rate, in_rate=IN_RATE):
+    resampler = StreamingResampler(in_rate, out_rate)
+    output = b"".join(resampler.process(chunk.tobytes()) for chunk in chunks) + resampler.flush()
+    return np.frombuffer(output, dtype=np.int16)
+
+def split(samples, sizes):
+    """Consecutive chunks of the given sizes, cycling through them, including empty ones."""
+    chunks, start, index = [], 0, 0
+    while start < len(samples):
+        size = sizes[index % len(sizes)]
+        chunks.append(samples[start:start + size])
+        start += size
+        index += 1
+    return chunks
+
+@pytest.mark.parametrize("out_rate", OUT_RATES)
+@pytest.mark.parametrize("sizes", [[1], [7, 0, 3], [2048], [4096, 1, 0, 333]])
+def test_output_does_not_depend_on_chunking(out_rate, sizes):
+    samples = noise(10007)
+    whole = resample([samples], out_rate)
+    assert np.array_equal(resample(split(samples, sizes), out_rate), whole)
+
+def test_output_does_not_depend_on_random_chunking():
+    samples = noise(24000, seed=1)
+    whole = resample([samples], 44100)
+    rng = np.random.default_rng(2)
+    for _ in range(5):
+        cuts = np.sort(rng.integers(0, len(samples), 20))
+        assert np.array_equal(resample(np.split(samples, cuts), 44100), whole)
+
+@pytest.mark.parametrize("out_rate", OUT_RATES)
+@pytest.mark.parametrize("samples", [0, 1, 2, 3, 2047, 24000, 24001])
+def test_output_length(out_rate, samples):
+    expected = -(-samples * out_rate // IN_RATE)
+    assert len(resample([noise(samples)], out_rate)) == expected
+
+@pytest.mark.parametrize("out_rate", [8000, 16000, 22050, 44100, 48000])
+def test_passband_tone_is_kept_in_time(out_rate):
+    samples = IN_RATE // 2
+    output = resample([tone(440, samples)], out_rate).astype(float)
+    expected = tone(440, len(output), rate=out_rate).astype(float)
+    # Away from the edges, where the stream starts and ends in silence
+    middle = slice(len(output) // 10, -len(output) // 10)
+    assert np.max(np.abs(output[middle] - expected[middle])) < 0.01 * 10000
+
+@pytest.mark.parametrize("out_rate, frequency", [(8000, 5000), (11025, 7000), (12000, 7500), (16000, 9000)])
+def test_stopband_tone_is_removed(out_rate, frequency):
+    output = resample([tone(frequency, IN_RATE // 2)], out_rate).astype(float)
+    middle = output[len(output) // 10:-len(output) // 10]
+    # Aliases stay far below the input's amplitude of 10000
+    assert np.sqrt(np.mean(middle ** 2)) < 10
+
+def test_matching_rates_pass_chunks_through():
+    chunks = [b"\x01\x00", b"", b"\x02\x00\x03\x00"]
+    assert list(resample_chunks(iter(chunks), IN_RATE, IN_RATE)) == chunks
+
+def test_resample_chunks_matches_resampler():
+    samples = noise(5000)
+    chunks = [chunk.tobytes() for chunk in split(samples, [1000, 17])]
+    output = b"".join(resample_chunks(iter(chunks), IN_RATE, 16000))
+    assert output == resample([samples], 16000).tobytes()
+
+def test_resample_chunks_closes_source_early():
+    closed = []
+
+    def source():
+        try:
+            while True:
+                yield noise(2048).tobytes()
+        finally:
+            closed.append(True)
+
+    stream = resample_chunks(source(), IN_RATE, 16000)
+    next(stream)
+    stream.close()
+    assert closed == [True]
@@ -3,15 +3,83 @@ TTS Engine package for Orpheus text-to-speech system.
 
 This package contains the core components for audio generation:
 - inference.py: Token generation and API handling
+- backends.py: Request adapters for llama.cpp, vLLM, LM Studio and generic servers
+- inprocess.py: Optional in-process llama-cpp-python engine (ORPHEUS_BACKEND=inprocess)
 - speechpipe.py: Audio conversion pipeline
+- executor.py: Bounded generation executor for admission control
+- encoders.py: Incremental Opus/FLAC/MP3 encoders for streamed responses
+- decode_service.py: Shared SNAC decode service for multi-worker deployments
+- output_store.py: Generated audio storage with TTL/size eviction
+- scheduler.py: Priority classes and weighted-fair gates for the LLM and decoder
+- coalescing.py: Single-flight sharing of identical in-flight generations
+- jobs.py: SQLite-backed queue of asynchronous bulk synthesis jobs
+- runaway.py: Token budgets and the end-token, loop and silence guard for runaway generations
+- markup.py: Pause markup (break tags, ellipses, paragraph gaps) rendered as silence
+- archive.py: Compact token archives of generations and their re-rendering without the LLM
+- resample.py: Streaming polyphase resampler for the output sample rate
+- trim.py: Streaming trimmer for leading and trailing silence
+- checkpoints.py: Content-addressed segment checkpoints for resumable long-form synthesis
+- batch.py: Command-line batch rendering of text, JSONL or CSV manifests
+- profiling.py: On-demand CPU sampling and torch.profiler capture of individual requests
+- memory.py: Producer thread/queue counts, per-request memory peaks and tracemalloc diffs
+- capacity.py: In-flight stream counts, realtime factors and capacity estimates
+- health.py: Readiness checks for the decoder and the LLM backend
 """
 
 # Make key components available at package level
 from .inference import (
     generate_speech_from_api,
+    stream_speech_from_api,
+    StreamingSentenceSplitter,
+    GenerationError,
+    SAMPLE_RATE,
+    SUPPORTED_SAMPLE_RATES,
     AVAILABLE_VOICES,
     DEFAULT_VOICE,
     VOICE_TO_LANGUAGE,
     AVAILABLE_LANGUAGES,
-    list_available_voices
+    list_available_voices,
+    RuntimeConfig,
+    get_runtime_config,
+    reload_runtime_config,
+    LIVE_CONFIG_KEYS,
+    realtime_monitor
 )
+from .executor import (
+    generation_executor,
+    QueueFullError,
+    QueueTimeoutError
+)
+from .scheduler import (
+    PRIORITY_CLASSES,
+    normalize_priority,
+    llm_gate,
+    decode_gate
+)
+from .encoders import (
+    STREAMING_FORMATS,
+    is_format_available,
+    supports_sample_rate,
+    encode_stream,
+    encoder_stats
+)
+from .speechpipe import decode_client
+from .output_store import output_store, pcm_to_wav
+from .coalescing import coalescer
+from .jobs import job_queue
+from .inprocess import inprocess_engine
+from .runaway import runaway_stats
+from .markup import pause_stats, has_speech
+from .trim import trim_stats
+from .checkpoints import checkpoint_store
+from .profiling import profiler, PROFILING
+from .memory import memory_monitor, MEMORY_DIAGNOSTICS
+from .archive import (
+    archive_store,
+    render_archive,
+    decode_archive,
+    ArchiveError,
+    TOKEN_ARCHIVE
+)
+from .capacity import estimate_capacity
+from .health import readiness
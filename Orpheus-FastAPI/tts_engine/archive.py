@@ -0,0 +1,286 @@
+"""
+Token archives: the audio codes of a generation, stored instead of (or next to) its audio.
+
+A WAV at 24 kHz is 48 KB per second; the codes behind it are about 82 per second,
+well under 1 KB as uint16. An archive is re-rendered by running the codes through
+the SNAC decoder again, so the LLM is not needed.
+
+File layout (little-endian):
+    4 bytes   magic b"OTKA"
+    1 byte    format version
+    4 bytes   header length
+    header    UTF-8 JSON: voice, text, generation parameters, sample rate,
+              crossfade and the parts of the audio in playback order
+    codes     uint16 audio codes of every code part, in order
+    4 bytes   CRC-32 of everything before it
+
+Parts are either a run of codes from one generation or a number of samples of
+silence (a pause). Consecutive code runs are joined with the crossfade, exactly
+as when the audio was first generated, and their silence is trimmed again if the
+header's trim_silence is set.
+
+Usage:
+    python -m tts_engine.archive info archives/tara_20250101_120000_1a2b3c4d.otk
+    python -m tts_engine.archive render archives/tara_20250101_120000_1a2b3c4d.otk out.wav
+    python -m tts_engine.archive render in.otk out.mp3 --format mp3
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import zlib
+import struct
+import threading
+from datetime import datetime
+from typing import Any, Dict, Generator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .resample import resample_chunks, SUPPORTED_SAMPLE_RATES
+from .trim import trim_chunks
+
+ARCHIVE_MAGIC = b"OTKA"
+ARCHIVE_VERSION = 1
+ARCHIVE_EXTENSION = ".otk"
+
+# Magic, version, header length
+_PREFIX = struct.Struct("<4sBI")
+_CHECKSUM = struct.Struct("<I")
+
+# Only names produced by new_name() may be served
+_SAFE_NAME = re.compile(r"^[A-Za-z0-9_\-]+\.otk$")
+
+# A run of audio codes, or a number of samples of silence
+Part = Union[List[int], int]
+
+class ArchiveError(ValueError):
+    """An archive that is truncated, of an unknown format or fails its checksum."""
+
+class TokenRecorder:
+    """
+    Collects the codes and pauses of one request's audio. Generations of the same
+    request may run concurrently, so each part is filed under a key that sorts in
+    playback order.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._parts = {}
+
+    def codes(self, key: Tuple[int, ...]) -> List[int]:
+        """List for the decoder to append one generation's codes to."""
+        codes = []
+        with self._lock:
+            self._parts[key] = codes
+        return codes
+
+    def silence(self, key: Tuple[int, ...], samples: int) -> None:
+        with self._lock:
+            self._parts[key] = samples
+
+    def parts(self) -> List[Part]:
+        with self._lock:
+            return [self._parts[key] for key in sorted(self._parts)]
+
+def encode_archive(parts: List[Part], sample_rate: int, crossfade_ms: int, **header: Any) -> bytes:
+    """Serialize parts and header fields (voice, text, parameters) to archive bytes."""
+    code_runs = [part for part in parts if not isinstance(part, int)]
+    header = dict(
+        header,
+        sample_rate=sample_rate,
+        crossfade_ms=crossfade_ms,
+        created=datetime.now().isoformat(timespec="seconds"),
+        parts=[{"silence": part} if isinstance(part, int) else {"codes": len(part)} for part in parts],
+    )
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    codes = np.concatenate([np.asarray(run, dtype="<u2") for run in code_runs]) if code_runs else np.array([], dtype="<u2")
+    body = _PREFIX.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, len(header_bytes)) + header_bytes + codes.tobytes()
+    return body + _CHECKSUM.pack(zlib.crc32(body))
+
+def decode_archive(data: bytes) -> Tuple[Dict[str, Any], List[Union[np.ndarray, int]]]:
+    """Return (header, parts) of archive bytes, with code runs as uint16 arrays."""
+    if len(data) < _PREFIX.size + _CHECKSUM.size:
+        raise ArchiveError("Archive is truncated")
+    magic, version, header_length = _PREFIX.unpack_from(data)
+    if magic != ARCHIVE_MAGIC:
+        raise ArchiveError("Not a token archive")
+    if version != ARCHIVE_VERSION:
+        raise ArchiveError(f"Unsupported token archive version {version}")
+    body, (checksum,) = data[:-_CHECKSUM.size], _CHECKSUM.unpack_from(data, len(data) - _CHECKSUM.size)
+    if zlib.crc32(body) != checksum:
+        raise ArchiveError("Archive checksum mismatch")
+    try:
+        header = json.loads(body[_PREFIX.size:_PREFIX.size + header_length].decode("utf-8"))
+        codes = np.frombuffer(body, dtype="<u2", offset=_PREFIX.size + header_length)
+        parts, position = [], 0
+        for part in header["parts"]:
+            if "silence" in part:
+                parts.append(int(part["silence"]))
+            else:
+                parts.append(codes[position:position + part["codes"]])
+                position += part["codes"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ArchiveError(f"Malformed archive header: {e}")
+    if position != len(codes):
+        raise ArchiveError("Archive codes do not match its header")
+    return header, parts
+
+def _code_tokens(codes) -> Generator[int, None, None]:
+    """Feed archived codes to the decoder as the vocabulary IDs the LLM streamed."""
+    from .speechpipe import code_to_token_id
+    for index, code in enumerate(codes.tolist()):
+        yield code_to_token_id(code, index)
+
+def render_archive(data: bytes, sample_rate: Optional[int] = None) -> Generator[bytes, None, None]:
+    """
+    Decode an archive back to 16-bit mono PCM chunks at sample_rate (default: the
+    archive's own rate), without the LLM. Decoding goes through the same decoder
+    windows, runaway guard and crossfades as the original generation, so the audio
+    matches it (up to the noise SNAC's decoder adds on every run).
+    """
+    header, parts = decode_archive(data)
+    yield from resample_chunks(_archive_chunks(header, parts), header["sample_rate"],
+                               sample_rate or header["sample_rate"])
+
+def _archive_chunks(header: Dict[str, Any], parts: List[Union[np.ndarray, int]]) -> Generator[bytes, None, None]:
+    """PCM chunks of decoded archive parts at the archive's sample rate."""
+    # Imported here to avoid circular imports
+    from .inference import tokens_decoder_stream, crossfade_chunks
+    crossfade_ms = header.get("crossfade_ms", 50)
+    trim_silence = header.get("trim_silence", False)
+
+    runs = []
+    for part in parts + [None]:
+        if isinstance(part, np.ndarray):
+            runs.append(part)
+            continue
+        if runs:
+            audio = crossfade_chunks((tokens_decoder_stream(_code_tokens(run)) for run in runs),
+                                     crossfade_ms=crossfade_ms)
+            yield from trim_chunks(audio, header["sample_rate"]) if trim_silence else audio
+            runs = []
+        if part:
+            yield bytes(2 * part)
+
+class ArchiveStore:
+    """Directory of token archives; archives are kept until they are deleted."""
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self.written = 0
+        self.write_errors = 0
+        self.bytes_written = 0
+        self.audio_seconds = 0.0
+        self.rendered = 0
+
+    @staticmethod
+    def new_name(voice: str) -> str:
+        """Unique archive name for one request."""
+        safe_voice = re.sub(r"[^A-Za-z0-9_\-]", "_", voice)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return f"{safe_voice}_{timestamp}_{uuid.uuid4().hex[:8]}{ARCHIVE_EXTENSION}"
+
+    def save(self, name: str, data: bytes, audio_seconds: float = 0.0) -> None:
+        path = os.path.join(self.directory, name)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            with self._lock:
+                self.write_errors += 1
+            print(f"Error writing token archive {path}: {e}")
+            return
+        with self._lock:
+            self.written += 1
+            self.bytes_written += len(data)
+            self.audio_seconds += audio_seconds
+
+    def path(self, name: str) -> Optional[str]:
+        """Return the disk path of name if it is a valid, existing archive."""
+        if not _SAFE_NAME.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+    def record_render(self) -> None:
+        with self._lock:
+            self.rendered += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            # Bytes per second of audio, against 2 bytes per sample of 24 kHz PCM
+            rate = self.bytes_written / self.audio_seconds if self.audio_seconds else None
+            return {
+                "enabled_by_default": TOKEN_ARCHIVE,
+                "directory": self.directory,
+                "written": self.written,
+                "write_errors": self.write_errors,
+                "bytes_written": self.bytes_written,
+                "audio_seconds": round(self.audio_seconds, 2),
+                "bytes_per_audio_second": round(rate, 1) if rate else None,
+                "rendered": self.rendered,
+            }
+
+# Archive every generation's codes unless a request says otherwise
+TOKEN_ARCHIVE = os.environ.get("ORPHEUS_TOKEN_ARCHIVE", "false").lower() in ("1", "true", "yes", "on")
+
+# Where archives are written
+ARCHIVE_DIR = os.environ.get("ORPHEUS_ARCHIVE_DIR", "archives")
+
+# Shared archive directory
+archive_store = ArchiveStore(ARCHIVE_DIR)
+
+def main():
+    import argparse
+    from .output_store import pcm_to_wav
+
+    parser = argparse.ArgumentParser(description="Inspect or re-render Orpheus token archives")
+    commands = parser.add_subparsers(dest="command", required=True)
+    info = commands.add_parser("info", help="Print an archive's header")
+    info.add_argument("archive", help="Token archive (.otk)")
+    render = commands.add_parser("render", help="Decode an archive to audio without the LLM")
+    render.add_argument("archive", help="Token archive (.otk)")
+    render.add_argument("output", help="Output audio file")
+    render.add_argument("--format", default=None, help="wav, pcm, opus, flac or mp3 (default: from the output extension)")
+    render.add_argument("--sample-rate", type=int, default=None, help="Output sample rate (default: the archive's, 24000)")
+    args = parser.parse_args()
+
+    with open(args.archive, "rb") as f:
+        data = f.read()
+    try:
+        header, parts = decode_archive(data)
+    except ArchiveError as e:
+        parser.exit(1, f"{args.archive}: {e}\n")
+
+    if args.command == "info":
+        codes = sum(len(part) for part in parts if not isinstance(part, int))
+        print(json.dumps(dict(header, codes=codes, archive_bytes=len(data)), indent=2))
+        return
+
+    response_format = (args.format or os.path.splitext(args.output)[1].lstrip(".") or "wav").lower()
+    sample_rate = args.sample_rate or header["sample_rate"]
+    if sample_rate not in SUPPORTED_SAMPLE_RATES:
+        parser.exit(1, f"Unsupported sample rate {sample_rate} (supported: {', '.join(map(str, SUPPORTED_SAMPLE_RATES))})\n")
+    start = time.time()
+    chunks = list(render_archive(data, sample_rate))
+    if response_format == "wav":
+        audio = pcm_to_wav(chunks, sample_rate)
+    else:
+        from .encoders import StreamingEncoder, is_format_available
+        if not is_format_available(response_format):
+            parser.exit(1, f"Format '{response_format}' is not available (supported: wav, pcm, opus, flac, mp3; "
+                           "the compressed formats need PyAV: pip install av)\n")
+        encoder = StreamingEncoder(response_format, sample_rate)
+        audio = b"".join(encoder.encode(chunk) for chunk in chunks) + encoder.flush()
+        encoder.close()
+    with open(args.output, "wb") as f:
+        f.write(audio)
+    seconds = sum(len(chunk) for chunk in chunks) / 2 / sample_rate
+    print(f"Rendered {seconds:.2f}s of audio to {args.output} in {time.time() - start:.2f}s "
+          f"({len(data)} archive bytes, {len(audio)} {response_format} bytes)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+class Backend:
+    """
+    Adapter for one kind of completion server.
+
+    Builds the streaming /v1/completions payload with the parameter names the
+    server understands and switches on its server-side performance features.
+    The generic adapter sends the payload this project has always sent.
+
+    Servers that can stream the generated vocabulary IDs also build a token-ID
+    request, which saves detokenizing and re-parsing every audio token as text.
+    """
+    name = "generic"
+    in_process = False
+
+    def payload(self, prompt: str, max_tokens: int, temperature: float, top_p: float,
+                repetition_penalty: float, model: str) -> Dict[str, Any]:
+        """Streaming completion request for prompt."""
+        return {
+            "prompt": prompt,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "top_p": top_p,
+            "repeat_penalty": repetition_penalty,
+            "stream": True,
+            # Ignored by many local inference servers but required by some
+            "model": model,
+        }
+
+    def warmup_payload(self, prefix: str, model: str) -> Optional[Dict[str, Any]]:
+        """Non-streaming request that prefills prefix into the server's cache, or None if it has none."""
+        return None
+
+    def token_id_request(self, api_url: str, prompt: str, max_tokens: int, temperature: float, top_p: float,
+                         repetition_penalty: float, model: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """(url, payload) of a streaming request that returns token IDs, or None if the server has none."""
+        return None
+
+    def chunk_text(self, data: Dict[str, Any]) -> str:
+        """Generated text in one streamed event."""
+        choices = data.get("choices")
+        return choices[0].get("text", "") if choices else ""
+
+    def chunk_token_ids(self, data: Dict[str, Any]) -> Optional[List[int]]:
+        """Generated vocabulary IDs in one streamed event, or None if the event only carries text."""
+        return None
+
+class LlamaCppBackend(Backend):
+    """
+    llama.cpp server. cache_prompt keeps each slot's KV cache between requests, and
+    the server assigns a request to the idle slot whose cached prompt shares the
+    longest prefix, so the "<|audio|>voice: " prefix is not prefilled again.
+    """
+    name = "llamacpp"
+
+    def payload(self, prompt, max_tokens, temperature, top_p, repetition_penalty, model):
+        payload = super().payload(prompt, max_tokens, temperature, top_p, repetition_penalty, model)
+        payload["cache_prompt"] = True
+        return payload
+
+    def warmup_payload(self, prefix, model):
+        return {"prompt": prefix, "max_tokens": 1, "temperature": 0.0, "cache_prompt": True, "model": model}
+
+    def token_id_request(self, api_url, prompt, max_tokens, temperature, top_p, repetition_penalty, model):
+        # The native /completion route streams the raw IDs of each step in "tokens"
+        if not api_url.endswith("/v1/completions"):
+            return None
+        return api_url[:-len("/v1/completions")] + "/completion", {
+            "prompt": prompt,
+            "n_predict": max_tokens,
+            "temperature": temperature,
+            "top_p": top_p,
+            "repeat_penalty": repetition_penalty,
+            "cache_prompt": True,
+            "return_tokens": True,
+            "stream": True,
+        }
+
+    def chunk_text(self, data):
+        if "content" in data:
+            return data["content"]
+        return super().chunk_text(data)
+
+    def chunk_token_ids(self, data):
+        # Servers that predate return_tokens send an empty list
+        return data.get("tokens") or None
+
+class VLLMBackend(Backend):
+    """
+    vLLM OpenAI-compatible server. Uses vLLM's repetition_penalty name and keeps the
+    <custom_token_N> audio tokens in the output, which vLLM would otherwise drop as
+    special tokens. Prefix caching is a server flag (--enable-prefix-caching) and only
+    caches full blocks, which the short voice prefix does not fill, so there is no warm-up.
+    """
+    name = "vllm"
+
+    def payload(self, prompt, max_tokens, temperature, top_p, repetition_penalty, model):
+        return {
+            "prompt": prompt,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "top_p": top_p,
+            "repetition_penalty": repetition_penalty,
+            "skip_special_tokens": False,
+            "stream": True,
+            "model": model,
+        }
+
+    def token_id_request(self, api_url, prompt, max_tokens, temperature, top_p, repetition_penalty, model):
+        # return_token_ids adds each chunk's IDs to the choice; older servers ignore it and send text only
+        payload = self.payload(prompt, max_tokens, temperature, top_p, repetition_penalty, model)
+        payload["return_token_ids"] = True
+        return api_url, payload
+
+    def chunk_token_ids(self, data):
+        choices = data.get("choices")
+        return (choices[0].get("token_ids") or None) if choices else None
+
+class LMStudioBackend(Backend):
+    """
+    LM Studio server. It routes by the model field, so the configured model name must
+    match a loaded model; its llama.cpp engine reuses the cached prompt prefix by itself.
+    """
+    name = "lmstudio"
+
+    def warmup_payload(self, prefix, model):
+        return {"prompt": prefix, "max_tokens": 1, "temperature": 0.0, "model": model}
+
+class InProcessBackend(Backend):
+    """
+    The GGUF model run inside this process by llama-cpp-python (see inprocess.py).
+    Tokens come from the engine thread as IDs, so there is no HTTP request and
+    ORPHEUS_API_URL is not used.
+    """
+    name = "inprocess"
+    in_process = True
+
+BACKENDS = {backend.name: backend() for backend in (Backend, LlamaCppBackend, VLLMBackend, LMStudioBackend, InProcessBackend)}
+
+def get_backend(name: str) -> Backend:
+    """Adapter for a backend name (falls back to the generic adapter)."""
+    return BACKENDS.get(name, BACKENDS["generic"])
@@ -0,0 +1,295 @@
+"""
+Batch rendering of many lines from one manifest, in one process.
+
+Loading torch and SNAC once and generating several rows at a time against the
+backend replaces a shell loop over the single-text CLI. A manifest is one of:
+
+- .jsonl: one object per line with "text" and optional "id" and "voice"
+- .csv:   a header row with a "text" column and optional "id" and "voice" columns,
+          or rows of id,text[,voice] without a header
+- other:  one text per line (ids are line numbers)
+
+Each row is written to {output_dir}/{id}.{extension}. The content hash of every
+rendered row (text, voice, generation parameters and output format) is kept in
+{output_dir}/.batch_index.json, so a re-run skips the rows whose file exists and
+whose hash is unchanged. A summary is written to {output_dir}/batch_report.json.
+
+Usage:
+    python -m tts_engine.batch prompts.jsonl ivr/ --parallel 4
+    python -m tts_engine.batch prompts.csv ivr/ --sample-rate 8000 --trim-silence --format flac
+"""
+
+import os
+import re
+import csv
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from .inference import (stream_speech_from_api, get_runtime_config, GenerationError, SAMPLE_RATE, DEFAULT_VOICE,
+                        REPETITION_PENALTY)
+from .output_store import pcm_to_wav
+
+INDEX_NAME = ".batch_index.json"
+REPORT_NAME = "batch_report.json"
+
+# Output file extension of each format
+EXTENSIONS = {"wav": "wav", "pcm": "pcm", "opus": "ogg", "flac": "flac", "mp3": "mp3"}
+
+class ManifestError(ValueError):
+    """A manifest that cannot be read into rows."""
+
+def _safe_id(row_id: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_\-.]", "_", row_id).strip(".") or "_"
+
+def read_manifest(path: str, default_voice: str) -> List[Dict[str, str]]:
+    """Rows of {"id", "text", "voice"} from a text, JSONL or CSV manifest."""
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if extension == ".jsonl":
+            raw = []
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ManifestError(f"line {number}: {e}")
+                if not isinstance(entry, dict) or not entry.get("text"):
+                    raise ManifestError(f"line {number}: expected an object with a \"text\" field")
+                if not isinstance(entry["text"], str):
+                    raise ManifestError(f"line {number}: \"text\" must be a string")
+                if not isinstance(entry.get("voice"), (str, type(None))):
+                    raise ManifestError(f"line {number}: \"voice\" must be a string")
+                raw.append((entry.get("id"), entry["text"], entry.get("voice"), number))
+        elif extension == ".csv":
+            lines = list(csv.reader(f))
+            header = [column.strip().lower() for column in lines[0]] if lines else []
+            raw = []
+            if "text" in header:
+                columns = {name: header.index(name) for name in ("id", "text", "voice") if name in header}
+                needed = max(columns.values()) + 1
+                for number, row in enumerate(lines[1:], 2):
+                    if not row:
+                        continue
+                    if len(row) < needed:
+                        raise ManifestError(f"line {number}: expected {needed} columns, got {len(row)}")
+                    raw.append((row[columns["id"]] if "id" in columns else None,
+                                row[columns["text"]],
+                                row[columns["voice"]] if "voice" in columns else None,
+                                number))
+            else:
+                for number, row in enumerate(lines, 1):
+                    if not row:
+                        continue
+                    if len(row) < 2:
+                        raise ManifestError(f"line {number}: expected id,text[,voice]")
+                    raw.append((row[0], row[1], row[2] if len(row) > 2 else None, number))
+        else:
+            raw = [(None, line.strip(), None, number) for number, line in enumerate(f, 1)]
+
+    rows, seen = [], set()
+    width = len(str(len(raw)))
+    for row_id, text, voice, number in raw:
+        if not text or not text.strip():
+            continue
+        row_id = _safe_id(str(row_id)) if row_id not in (None, "") else str(number).zfill(width)
+        if row_id in seen:
+            raise ManifestError(f"line {number}: duplicate id '{row_id}'")
+        seen.add(row_id)
+        rows.append({"id": row_id, "text": text.strip(), "voice": (voice or "").strip() or default_voice})
+    return rows
+
+def row_hash(row: Dict[str, str], **params: Any) -> str:
+    """Content hash of a row's text, voice and the parameters that shape its audio."""
+    content = json.dumps(dict(params, text=row["text"], voice=row["voice"]), sort_keys=True)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+class BatchRenderer:
+    """Renders manifest rows to files on a pool of threads, skipping rows already rendered."""
+    def __init__(self, output_dir: str, response_format: str = "wav", sample_rate: Optional[int] = None,
+                 parallel: int = 4, temperature: Optional[float] = None, top_p: Optional[float] = None,
+                 trim_silence: bool = False, force: bool = False):
+        self.output_dir = output_dir
+        self.response_format = response_format
+        self.sample_rate = sample_rate or SAMPLE_RATE
+        self.parallel = max(1, parallel)
+        self.config = get_runtime_config()
+        self.temperature = self.config.temperature if temperature is None else temperature
+        self.top_p = self.config.top_p if top_p is None else top_p
+        self.trim_silence = trim_silence
+        self.force = force
+        self._lock = threading.Lock()
+        self._index = self._load_index()
+
+    def _load_index(self) -> Dict[str, str]:
+        try:
+            with open(os.path.join(self.output_dir, INDEX_NAME), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self) -> None:
+        """Write the index; called with the lock held after every rendered row."""
+        path = os.path.join(self.output_dir, INDEX_NAME)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(path + ".tmp", path)
+
+    def path(self, row: Dict[str, str]) -> str:
+        return os.path.join(self.output_dir, f"{row['id']}.{EXTENSIONS[self.response_format]}")
+
+    def hash(self, row: Dict[str, str]) -> str:
+        # Every setting that changes the generated audio; connection settings (URL, timeout,
+        # token-ID streaming) do not
+        return row_hash(row, temperature=self.temperature, top_p=self.top_p, max_tokens=self.config.max_tokens,
+                        repetition_penalty=REPETITION_PENALTY, model=self.config.model_name,
+                        backend=self.config.backend, format=self.response_format, sample_rate=self.sample_rate,
+                        trim_silence=self.trim_silence)
+
+    def is_rendered(self, row: Dict[str, str]) -> bool:
+        return not self.force and self._index.get(row["id"]) == self.hash(row) and os.path.isfile(self.path(row))
+
+    def render(self, row: Dict[str, str]) -> float:
+        """Generate one row and write its file; returns audio seconds."""
+        chunks = list(stream_speech_from_api(
+            prompt=row["text"],
+            voice=row["voice"],
+            temperature=self.temperature,
+            top_p=self.top_p,
+            use_batching=len(row["text"]) > 1000,
+            max_batch_chars=1000,
+            config=self.config,
+            sample_rate=self.sample_rate,
+            trim_silence=self.trim_silence
+        ))
+        audio_bytes = sum(len(chunk) for chunk in chunks)
+        if not audio_bytes:
+            raise GenerationError("No audio was generated")
+        if self.response_format == "wav":
+            data = pcm_to_wav(chunks, self.sample_rate)
+        elif self.response_format == "pcm":
+            data = b"".join(chunks)
+        else:
+            from .encoders import StreamingEncoder
+            encoder = StreamingEncoder(self.response_format, self.sample_rate)
+            data = b"".join(encoder.encode(chunk) for chunk in chunks) + encoder.flush()
+            encoder.close()
+
+        path = self.path(row)
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+        with self._lock:
+            self._index[row["id"]] = self.hash(row)
+            self._save_index()
+        return audio_bytes / 2 / self.sample_rate
+
+    def run(self, rows: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Render every row that is not rendered yet, printing progress; returns the report."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        results = {row["id"]: {"id": row["id"], "voice": row["voice"], "file": os.path.basename(self.path(row)),
+                               "hash": self.hash(row)} for row in rows}
+        pending = []
+        for row in rows:
+            if self.is_rendered(row):
+                results[row["id"]]["status"] = "skipped"
+            else:
+                pending.append(row)
+        skipped = len(rows) - len(pending)
+        print(f"Batch: {len(rows)} rows, {skipped} already rendered, rendering {len(pending)} "
+              f"with {self.parallel} in parallel to {self.output_dir}/")
+
+        start = time.time()
+        audio_seconds = 0.0
+        done = failed = 0
+        with ThreadPoolExecutor(max_workers=self.parallel, thread_name_prefix="BatchRow") as pool:
+            futures = {pool.submit(self._timed_render, row): row for row in pending}
+            for future in as_completed(futures):
+                row = futures[future]
+                result = results[row["id"]]
+                try:
+                    seconds, elapsed = future.result()
+                    result.update(status="rendered", audio_seconds=round(seconds, 2), seconds=round(elapsed, 2))
+                    audio_seconds += seconds
+                    done += 1
+                except Exception as e:
+                    result.update(status="failed", error=str(e))
+                    failed += 1
+                wall = time.time() - start
+                finished = done + failed
+                remaining = (len(pending) - finished) * wall / finished
+                print(f"[{finished}/{len(pending)}] {row['id']}: {result['status']}"
+                      f"{' (' + result['error'] + ')' if result['status'] == 'failed' else ''} | "
+                      f"{finished / wall * 60:.1f} rows/min, {audio_seconds / wall:.2f}x realtime, "
+                      f"ETA {remaining:.0f}s")
+
+        wall = time.time() - start
+        report = {
+            "manifest_rows": len(rows),
+            "rendered": done,
+            "skipped": skipped,
+            "failed": failed,
+            "parallel": self.parallel,
+            "format": self.response_format,
+            "sample_rate": self.sample_rate,
+            "audio_seconds": round(audio_seconds, 2),
+            "wall_seconds": round(wall, 2),
+            "rows_per_minute": round(done / wall * 60, 1) if wall and done else 0.0,
+            "realtime_factor": round(audio_seconds / wall, 2) if wall else 0.0,
+            "rows": [results[row["id"]] for row in rows],
+        }
+        with open(os.path.join(self.output_dir, REPORT_NAME), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        return report
+
+    def _timed_render(self, row: Dict[str, str]):
+        start = time.time()
+        seconds = self.render(row)
+        return seconds, time.time() - start
+
+def main():
+    import sys
+    import argparse
+    from .resample import SUPPORTED_SAMPLE_RATES
+    from .encoders import is_format_available, supports_sample_rate
+
+    parser = argparse.ArgumentParser(description="Render every row of a text, JSONL or CSV manifest with Orpheus")
+    parser.add_argument("manifest", help="Manifest of (id, text, voice) rows (.jsonl, .csv, or one text per line)")
+    parser.add_argument("output_dir", help="Directory for the rendered files, the index and the report")
+    parser.add_argument("--parallel", type=int, default=4, help="Rows generated at the same time (default: 4)")
+    parser.add_argument("--voice", default=DEFAULT_VOICE, help=f"Voice for rows without one (default: {DEFAULT_VOICE})")
+    parser.add_argument("--format", default="wav", choices=sorted(EXTENSIONS), help="Output format (default: wav)")
+    parser.add_argument("--sample-rate", type=int, default=None, help=f"Output sample rate (default: {SAMPLE_RATE})")
+    parser.add_argument("--temperature", type=float, default=None, help="Temperature (default: ORPHEUS_TEMPERATURE)")
+    parser.add_argument("--top_p", type=float, default=None, help="Top-p (default: ORPHEUS_TOP_P)")
+    parser.add_argument("--trim-silence", action="store_true", help="Trim leading and trailing silence")
+    parser.add_argument("--force", action="store_true", help="Render every row, even if it is already rendered")
+    args = parser.parse_args()
+
+    sample_rate = args.sample_rate or SAMPLE_RATE
+    if sample_rate not in SUPPORTED_SAMPLE_RATES:
+        parser.exit(1, f"Unsupported sample rate {sample_rate} (supported: {', '.join(map(str, SUPPORTED_SAMPLE_RATES))})\n")
+    if args.format not in ("wav", "pcm") and not is_format_available(args.format):
+        parser.exit(1, f"Format '{args.format}' needs PyAV (pip install av)\n")
+    if not supports_sample_rate(args.format, sample_rate):
+        parser.exit(1, f"Format '{args.format}' does not support sample rate {sample_rate}\n")
+    try:
+        rows = read_manifest(args.manifest, args.voice)
+    except (OSError, ManifestError) as e:
+        parser.exit(1, f"{args.manifest}: {e}\n")
+
+    renderer = BatchRenderer(args.output_dir, args.format, sample_rate, args.parallel,
+                             args.temperature, args.top_p, args.trim_silence, args.force)
+    report = renderer.run(rows)
+    print(f"Rendered {report['rendered']}, skipped {report['skipped']}, failed {report['failed']} of "
+          f"{report['manifest_rows']} rows: {report['audio_seconds']:.1f}s of audio in {report['wall_seconds']:.1f}s "
+          f"({report['rows_per_minute']} rows/min, {report['realtime_factor']}x realtime)")
+    print(f"Report written to {os.path.join(args.output_dir, REPORT_NAME)}")
+    sys.exit(1 if report["failed"] else 0)
+
+if __name__ == "__main__":
+    main()
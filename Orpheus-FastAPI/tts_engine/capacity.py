@@ -0,0 +1,93 @@
+import math
+import time
+import threading
+import contextlib
+import collections
+from typing import Any, Dict, Iterator
+
+class _TrackedStream:
+    __slots__ = ("started_at", "audio_bytes")
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.audio_bytes = 0
+
+    def add(self, chunk: bytes) -> None:
+        self.audio_bytes += len(chunk)
+
+class RealtimeMonitor:
+    """
+    Live count of generation streams and their recent realtime factors.
+
+    Each completed stream records its realtime factor (seconds of audio per
+    second of wall time) together with the number of streams that were running
+    when it finished. Their product approximates how many seconds of audio the
+    whole server produced per second at that load, which is the number of
+    realtime streams it can sustain. Streams that fail or are abandoned by their
+    client are not recorded.
+    """
+    def __init__(self, sample_rate: int, history_size: int = 50):
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        # (realtime factor, streams running at completion)
+        self._samples = collections.deque(maxlen=history_size)
+
+    @contextlib.contextmanager
+    def track(self) -> Iterator[_TrackedStream]:
+        """Count the enclosed generation as in flight and record its realtime factor if it completes."""
+        stream = _TrackedStream()
+        with self._lock:
+            self.in_flight += 1
+        try:
+            yield stream
+        except BaseException:
+            with self._lock:
+                self.in_flight -= 1
+            raise
+        wall_seconds = time.time() - stream.started_at
+        with self._lock:
+            concurrency = self.in_flight
+            self.in_flight -= 1
+            if stream.audio_bytes and wall_seconds > 0:
+                audio_seconds = stream.audio_bytes / 2 / self.sample_rate
+                self._samples.append((audio_seconds / wall_seconds, concurrency))
+                self.completed += 1
+
+    def summary(self) -> Dict[str, Any]:
+        """Recent per-stream and aggregate realtime factors (None until a stream has completed)."""
+        with self._lock:
+            samples = list(self._samples)
+            in_flight = self.in_flight
+        if not samples:
+            return {"in_flight": in_flight, "samples": 0, "realtime_factor": None, "aggregate_realtime_factor": None}
+        factors = sorted(rtf for rtf, _ in samples)
+        aggregates = sorted(rtf * concurrency for rtf, concurrency in samples)
+        return {
+            "in_flight": in_flight,
+            "samples": len(samples),
+            "realtime_factor": round(factors[len(factors) // 2], 2),
+            "aggregate_realtime_factor": round(aggregates[len(aggregates) // 2], 2),
+        }
+
+def estimate_capacity(realtime: Dict[str, Any], admission: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Estimate how many realtime streams the server can take, from a realtime summary
+    and the generation executor's stats.
+
+    Capacity is the measured aggregate realtime factor, capped by the number of
+    generation threads; until a stream has completed it is the thread count.
+    Headroom is what is left after the running and queued generations.
+    """
+    max_streams = admission["max_concurrency"]
+    aggregate = realtime["aggregate_realtime_factor"]
+    if aggregate is not None:
+        max_streams = min(max_streams, int(math.floor(aggregate)))
+    busy = admission["active"] + admission["queue_depth"]
+    return {
+        "estimated": aggregate is not None,
+        "max_streams": max_streams,
+        "headroom_streams": max(0, max_streams - busy),
+        "queue_free": max(0, admission["max_queue"] - admission["queue_depth"]),
+    }
@@ -0,0 +1,239 @@
+"""
+Segment checkpoints for resumable long-form synthesis.
+
+Every generation of a checkpointed request (a long-text batch, a fast-start piece or
+a segment between pauses) is saved once it completes: its 24 kHz PCM and its audio
+codes, under a hash of the text, voice and generation parameters. When the same
+request runs again after a failure, the segments it already generated are read
+back instead of generated, so it resumes at the first missing segment. Any other
+request with a segment of identical text and parameters reuses it too.
+
+File layout (little-endian), one file per segment:
+    4 bytes   magic b"OSEG"
+    4 bytes   number of audio codes
+    codes     uint16 audio codes
+    pcm       16-bit mono PCM at 24 kHz
+    4 bytes   CRC-32 of everything before it
+"""
+
+import os
+import json
+import time
+import uuid
+import zlib
+import struct
+import hashlib
+import threading
+from typing import Any, Dict, Generator, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+CHECKPOINT_MAGIC = b"OSEG"
+CHECKPOINT_EXTENSION = ".seg"
+
+# Bump when anything that changes a segment's audio for the same key changes
+_KEY_VERSION = 1
+
+_PREFIX = struct.Struct("<4sI")
+_CHECKSUM = struct.Struct("<I")
+
+# Stored audio is replayed in chunks of this many bytes (2048 samples, one decoder window)
+_REPLAY_CHUNK = 4096
+
+class CheckpointStore:
+    """
+    Directory of completed segments, keyed by content hash. Segments not used for
+    ttl seconds are removed, and the least recently used ones while the total size
+    exceeds max_bytes (either limit is disabled with 0).
+    """
+    def __init__(self, directory: str, ttl: float, max_bytes: int):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved = 0
+        self.write_errors = 0
+        self.corrupt = 0
+        self.evicted = 0
+        self.reused_seconds = 0.0
+
+    @staticmethod
+    def segment_key(text: str, voice: str, **params: Any) -> str:
+        """Content hash of one generation: its text, voice and generation parameters."""
+        content = json.dumps(dict(params, text=text, voice=voice, version=_KEY_VERSION), sort_keys=True)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + CHECKPOINT_EXTENSION)
+
+    def load(self, key: str) -> Optional[Tuple[bytes, List[int]]]:
+        """Return (pcm, codes) of a completed segment, or None if there is no valid checkpoint."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        except OSError as e:
+            print(f"Error reading checkpoint {path}: {e}")
+            with self._lock:
+                self.misses += 1
+            return None
+
+        valid = len(data) >= _PREFIX.size + _CHECKSUM.size
+        if valid:
+            magic, code_count = _PREFIX.unpack_from(data)
+            body, (checksum,) = data[:-_CHECKSUM.size], _CHECKSUM.unpack_from(data, len(data) - _CHECKSUM.size)
+            valid = magic == CHECKPOINT_MAGIC and zlib.crc32(body) == checksum and len(body) >= _PREFIX.size + 2 * code_count
+        if not valid:
+            print(f"Discarding corrupt checkpoint {path}")
+            self._remove(path)
+            with self._lock:
+                self.corrupt += 1
+                self.misses += 1
+            return None
+
+        codes_end = _PREFIX.size + 2 * code_count
+        codes = np.frombuffer(body, dtype="<u2", count=code_count, offset=_PREFIX.size).tolist()
+        pcm = body[codes_end:]
+        try:
+            # Reuse counts as use for eviction
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+            self.reused_seconds += len(pcm) / (2 * SEGMENT_SAMPLE_RATE)
+        return pcm, codes
+
+    def save(self, key: str, pcm: bytes, codes: List[int]) -> None:
+        """Write a completed segment; failures are logged, since the audio itself is fine."""
+        body = _PREFIX.pack(CHECKPOINT_MAGIC, len(codes)) + np.asarray(codes, dtype="<u2").tobytes() + pcm
+        path = self._path(key)
+        # Identical segments may complete concurrently, so every writer has its own temp file
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(body + _CHECKSUM.pack(zlib.crc32(body)))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self._remove(tmp_path)
+            with self._lock:
+                self.write_errors += 1
+            print(f"Error writing checkpoint {path}: {e}")
+            return
+        with self._lock:
+            self.saved += 1
+        self.cleanup()
+
+    def checkpointed(self, key: str, chunks: Iterable[bytes], codes: List[int]) -> Generator[bytes, None, None]:
+        """Pass a generation's chunks through and save them once it completes (not on errors or early close)."""
+        pcm = []
+        try:
+            for chunk in chunks:
+                pcm.append(chunk)
+                yield chunk
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+        if pcm:
+            self.save(key, b"".join(pcm), codes)
+
+    @staticmethod
+    def replay(pcm: bytes) -> Generator[bytes, None, None]:
+        """Chunks of a stored segment's audio, the size the decoder emits."""
+        for start in range(0, len(pcm), _REPLAY_CHUNK):
+            yield pcm[start:start + _REPLAY_CHUNK]
+
+    def _remove(self, path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            print(f"Error removing checkpoint {path}: {e}")
+            return False
+
+    def _files(self) -> List[Tuple[str, float, int]]:
+        """(path, mtime, size) of every segment, least recently used first."""
+        files = []
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.name.endswith(CHECKPOINT_EXTENSION):
+                        stat = entry.stat()
+                        files.append((entry.path, stat.st_mtime, stat.st_size))
+        except FileNotFoundError:
+            return []
+        return sorted(files, key=lambda item: item[1])
+
+    def cleanup(self) -> None:
+        """Remove expired segments, then the least recently used ones while over the size limit."""
+        if not (self.ttl or self.max_bytes):
+            return
+        try:
+            files = self._files()
+        except OSError as e:
+            print(f"Error scanning checkpoint directory {self.directory}: {e}")
+            return
+        now = time.time()
+        total = sum(size for _, _, size in files)
+        for path, mtime, size in files:
+            expired = self.ttl and now - mtime > self.ttl
+            oversize = self.max_bytes and total > self.max_bytes
+            if not (expired or oversize):
+                continue
+            if self._remove(path):
+                total -= size
+                with self._lock:
+                    self.evicted += 1
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            files = self._files()
+        except OSError:
+            files = []
+        with self._lock:
+            return {
+                "enabled_by_default": CHECKPOINTS,
+                "directory": self.directory,
+                "segments": len(files),
+                "bytes": sum(size for _, _, size in files),
+                "hits": self.hits,
+                "misses": self.misses,
+                "saved": self.saved,
+                "write_errors": self.write_errors,
+                "corrupt": self.corrupt,
+                "evicted": self.evicted,
+                "reused_audio_seconds": round(self.reused_seconds, 2),
+            }
+
+# Rate of the stored PCM (SNAC's output rate; resampling happens after the checkpoints)
+SEGMENT_SAMPLE_RATE = 24000
+
+# Checkpoint every generation unless a request says otherwise
+CHECKPOINTS = os.environ.get("ORPHEUS_CHECKPOINTS", "false").lower() in ("1", "true", "yes", "on")
+
+# Where segments are written
+CHECKPOINT_DIR = os.environ.get("ORPHEUS_CHECKPOINT_DIR", "checkpoints")
+
+try:
+    CHECKPOINT_TTL = float(os.environ.get("ORPHEUS_CHECKPOINT_TTL", "604800"))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_CHECKPOINT_TTL value, using 604800 seconds as fallback")
+    CHECKPOINT_TTL = 604800.0
+
+try:
+    CHECKPOINT_MAX_MB = int(os.environ.get("ORPHEUS_CHECKPOINT_MAX_MB", "2048"))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_CHECKPOINT_MAX_MB value, using 2048 as fallback")
+    CHECKPOINT_MAX_MB = 2048
+
+# Shared segment store
+checkpoint_store = CheckpointStore(CHECKPOINT_DIR, CHECKPOINT_TTL, CHECKPOINT_MAX_MB * 1024 * 1024)
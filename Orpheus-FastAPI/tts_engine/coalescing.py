@@ -0,0 +1,135 @@
+import os
+import asyncio
+from typing import Any, AsyncIterator, Callable, Dict, Hashable
+
+from .inference import IS_RELOADER
+from .markup import split_pauses, PAUSE_MARKUP
+
+def normalize_text(text: str) -> Hashable:
+    """
+    Collapse runs of whitespace so trivially different copies of a prompt share a key.
+
+    With pause markup, whitespace can be a pause (a blank line between paragraphs),
+    so the text is keyed by its pause segments, with whitespace collapsed in each.
+    """
+    if not PAUSE_MARKUP:
+        return " ".join(text.split())
+    return tuple(" ".join(segment.split()) if isinstance(segment, str) else segment
+                 for segment in split_pauses(text))
+
+class _Flight:
+    """One in-flight generation and the audio it has produced so far."""
+    def __init__(self, key: Hashable):
+        self.key = key
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.changed = asyncio.Condition()
+        self.subscribers = 0
+        self.task = None
+
+class RequestCoalescer:
+    """
+    Single-flight coalescing of identical in-flight generations.
+
+    The first request for a key starts the generation; concurrent requests with
+    the same key attach to it instead of starting their own. Every subscriber
+    receives the complete audio from the first chunk on: a late joiner replays
+    the chunks produced before it arrived, then follows live. The generation is
+    cancelled only when its last subscriber goes away. Finished generations are
+    not cached; the next identical request starts a new one.
+
+    Runs on the event loop; not thread-safe.
+    """
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._flights = {}
+        self.started = 0
+        self.joined = 0
+        self.replayed_chunks = 0
+        self.max_subscribers = 0
+
+    @staticmethod
+    def make_key(prompt: str, **params) -> Hashable:
+        """Key identifying generations that produce the same audio."""
+        return (normalize_text(prompt),) + tuple(sorted(params.items()))
+
+    async def stream(self, key: Hashable, source_fn: Callable[[], AsyncIterator[bytes]]) -> AsyncIterator[bytes]:
+        """Yield the audio of the generation for key, starting it with source_fn() if none is in flight."""
+        if not self.enabled:
+            async for chunk in source_fn():
+                yield chunk
+            return
+
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(key)
+            self._flights[key] = flight
+            flight.task = asyncio.create_task(self._pump(flight, source_fn))
+            self.started += 1
+        else:
+            self.joined += 1
+            self.replayed_chunks += len(flight.chunks)
+        flight.subscribers += 1
+        self.max_subscribers = max(self.max_subscribers, flight.subscribers)
+
+        try:
+            index = 0
+            while True:
+                if index < len(flight.chunks):
+                    yield flight.chunks[index]
+                    index += 1
+                    continue
+                if flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                async with flight.changed:
+                    await flight.changed.wait_for(lambda: index < len(flight.chunks) or flight.done)
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # Nobody is listening any more: stop the upstream generation
+                flight.task.cancel()
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+    async def _pump(self, flight: _Flight, source_fn: Callable[[], AsyncIterator[bytes]]) -> None:
+        """Run the shared generation, publishing each chunk to the subscribers."""
+        source = source_fn()
+        try:
+            async for chunk in source:
+                flight.chunks.append(chunk)
+                async with flight.changed:
+                    flight.changed.notify_all()
+        except asyncio.CancelledError:
+            flight.error = RuntimeError("Generation cancelled")
+        except Exception as e:
+            flight.error = e
+        finally:
+            await source.aclose()
+            flight.done = True
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+            async with flight.changed:
+                flight.changed.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """Generations started, requests that joined one, and current in-flight state."""
+        return {
+            "enabled": self.enabled,
+            "generations_started": self.started,
+            "requests_joined": self.joined,
+            "replayed_chunks": self.replayed_chunks,
+            "in_flight": len(self._flights),
+            "subscribers": sum(flight.subscribers for flight in self._flights.values()),
+            "max_subscribers": self.max_subscribers,
+        }
+
+COALESCE_REQUESTS = os.environ.get("ORPHEUS_COALESCE_REQUESTS", "true").lower() not in ("0", "false", "no", "off")
+
+if not IS_RELOADER:
+    print(f"Request coalescing: {'enabled' if COALESCE_REQUESTS else 'disabled'}")
+
+# Shared coalescer used by the FastAPI endpoints
+coalescer = RequestCoalescer(COALESCE_REQUESTS)
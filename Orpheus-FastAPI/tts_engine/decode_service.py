@@ -0,0 +1,194 @@
+"""
+Shared SNAC decode service for multi-worker deployments.
+
+A decode service process owns the SNAC model and decodes token windows sent by
+HTTP worker processes over a local IPC channel (a Unix socket, or a named pipe
+on Windows). Workers started with ORPHEUS_DECODE_SERVICE set never load SNAC
+themselves, so adding HTTP workers does not multiply model memory.
+
+Run one service with:
+    python -m tts_engine.decode_service --address /tmp/orpheus-decode-0.sock
+Normally serve.py starts, health-checks and restarts these processes.
+"""
+
+import os
+import time
+import argparse
+import threading
+from multiprocessing.connection import Listener, Client
+from multiprocessing import AuthenticationError
+from typing import Any, Dict, List, Optional
+
+def authkey_from_env() -> Optional[bytes]:
+    """Shared secret used to authenticate IPC connections (hex in ORPHEUS_DECODE_AUTHKEY)."""
+    authkey = os.environ.get("ORPHEUS_DECODE_AUTHKEY")
+    return bytes.fromhex(authkey) if authkey else None
+
+def parse_addresses(value: str) -> List[str]:
+    """Parse a comma-separated ORPHEUS_DECODE_SERVICE value into a list of addresses."""
+    return [address.strip() for address in (value or "").split(",") if address.strip()]
+
+class DecodeServiceError(Exception):
+    """Raised when no decode service could handle a request."""
+    pass
+
+class DecodeClient:
+    """
+    Pooled connections from a worker process to one or more decode services.
+
+    Connections are created round-robin across the services and reused by whichever
+    thread needs one next. If a service is down or restarting, the request is retried
+    on a fresh connection (to the next service) before giving up. A service that does
+    not answer within timeout seconds fails the request without a retry, since a hung
+    service would hang the retry as well.
+    """
+    def __init__(self, addresses: List[str], authkey: Optional[bytes] = None, timeout: float = 30.0):
+        if not addresses:
+            raise ValueError("At least one decode service address is required")
+        self.addresses = addresses
+        self.authkey = authkey
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._idle = []
+        self._next_address = 0
+        self.requests = 0
+        self.retries = 0
+        self.timeouts = 0
+
+    def _acquire(self):
+        """Return an idle (address, connection) pair, or the next address with no connection yet."""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+            address = self.addresses[self._next_address % len(self.addresses)]
+            self._next_address += 1
+        return address, None
+
+    def _release(self, address, conn) -> None:
+        with self._lock:
+            self._idle.append((address, conn))
+
+    def _request(self, message):
+        attempts = max(3, len(self.addresses) + 1)
+        last_error = None
+        for attempt in range(attempts):
+            address, conn = self._acquire()
+            try:
+                if conn is None:
+                    conn = Client(address, authkey=self.authkey)
+                conn.send(message)
+                if not conn.poll(self.timeout):
+                    # The late reply would arrive on this connection, so it cannot be reused
+                    conn.close()
+                    with self._lock:
+                        self.timeouts += 1
+                    raise DecodeServiceError(f"Decode service at {address} did not answer within {self.timeout:g}s")
+                reply = conn.recv()
+            except (EOFError, OSError, AuthenticationError) as e:
+                last_error = e
+                if conn is not None:
+                    conn.close()
+                # Other idle connections to a failed service are stale as well
+                with self._lock:
+                    self.retries += 1
+                    stale = [pair for pair in self._idle if pair[0] == address]
+                    self._idle = [pair for pair in self._idle if pair[0] != address]
+                for _, stale_conn in stale:
+                    stale_conn.close()
+                # Give a restarting service a moment before the next attempt
+                time.sleep(0.1 * attempt)
+                continue
+            self._release(address, conn)
+            with self._lock:
+                self.requests += 1
+            return reply
+        raise DecodeServiceError(f"Decode service unavailable after {attempts} attempts: {last_error}")
+
+    def convert_to_audio(self, multiframe, count) -> Optional[bytes]:
+        """Decode a token window on a decode service (same contract as speechpipe.convert_to_audio)."""
+        status, payload = self._request(("decode", list(multiframe), count))
+        if status != "ok":
+            raise DecodeServiceError(payload)
+        return payload
+
+    def stats(self) -> Dict[str, Any]:
+        """Request and retry counters for this worker's connections."""
+        with self._lock:
+            return {
+                "addresses": list(self.addresses),
+                "requests": self.requests,
+                "retries": self.retries,
+                "timeouts": self.timeouts,
+                "idle_connections": len(self._idle),
+            }
+
+    def ping(self) -> Dict[str, Any]:
+        """Round-trip a health check to one of the decode services."""
+        status, payload = self._request(("ping",))
+        return payload
+
+def _handle_connection(conn, stats: Dict[str, Any], stats_lock: threading.Lock) -> None:
+    """Serve decode and ping requests from one worker connection until it closes."""
+    from .speechpipe import convert_to_audio
+
+    try:
+        while True:
+            message = conn.recv()
+            if message[0] == "decode":
+                start = time.time()
+                try:
+                    reply = ("ok", convert_to_audio(message[1], message[2]))
+                except Exception as e:
+                    print(f"Decode error: {e}")
+                    reply = ("error", str(e))
+                with stats_lock:
+                    stats["decodes"] += 1
+                    stats["decode_seconds"] += time.time() - start
+                conn.send(reply)
+            elif message[0] == "ping":
+                with stats_lock:
+                    conn.send(("pong", dict(stats, uptime=round(time.time() - stats["started_at"], 1))))
+            else:
+                conn.send(("error", f"Unknown request type {message[0]!r}"))
+    except (EOFError, OSError):
+        pass
+    finally:
+        conn.close()
+
+def serve(address: str, authkey: Optional[bytes] = None) -> None:
+    """Load SNAC in this process and serve decode requests on address forever."""
+    # Imported here so that this process loads the model locally
+    from . import speechpipe
+    speechpipe.load_model()
+    snac_device = speechpipe.snac_device
+
+    # A crashed predecessor may have left its socket file behind
+    if not address.startswith("\\\\") and os.path.exists(address):
+        os.remove(address)
+
+    listener = Listener(address, authkey=authkey)
+    stats = {"pid": os.getpid(), "device": snac_device, "hardware": speechpipe.hardware_info(), "decodes": 0, "decode_seconds": 0.0, "started_at": time.time()}
+    stats_lock = threading.Lock()
+    print(f"🔊 Decode service listening on {address} (device: {snac_device}, pid: {os.getpid()})")
+
+    while True:
+        try:
+            conn = listener.accept()
+        except AuthenticationError as e:
+            print(f"Rejected decode service connection: {e}")
+            continue
+        except OSError as e:
+            print(f"Error accepting decode service connection: {e}")
+            continue
+        thread = threading.Thread(target=_handle_connection, args=(conn, stats, stats_lock), name="DecodeConnection")
+        thread.daemon = True
+        thread.start()
+
+def main():
+    parser = argparse.ArgumentParser(description="Orpheus shared SNAC decode service")
+    parser.add_argument("--address", type=str, required=True, help="Unix socket path (or \\\\.\\pipe\\name on Windows) to listen on")
+    args = parser.parse_args()
+    serve(args.address, authkey_from_env())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import os
+import time
+import asyncio
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict
+
+import numpy as np
+
+# PyAV provides the Opus, FLAC and MP3 encoders; raw PCM works without it.
+# It is imported by the first encoder rather than at startup.
+AV_AVAILABLE = importlib.util.find_spec("av") is not None
+
+# response_format -> (container format, codec, media type, bit rate)
+STREAMING_FORMATS = {
+    "opus": ("ogg", "libopus", "audio/ogg", 32000),
+    "flac": ("flac", "flac", "audio/flac", None),
+    "mp3": ("mp3", "libmp3lame", "audio/mpeg", 64000),
+    "pcm": (None, None, "audio/pcm", None),
+}
+
+# Opus only encodes these sample rates; the other formats take any supported output rate
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+# Flush Ogg pages every 40ms instead of the muxer default of one second,
+# so Opus packets reach the client as soon as they are encoded
+OGG_PAGE_DURATION_US = "40000"
+
+try:
+    ENCODER_WORKERS = int(os.environ.get("ORPHEUS_ENCODER_WORKERS", "2"))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_ENCODER_WORKERS value, using 2 as fallback")
+    ENCODER_WORKERS = 2
+
+# Encoding runs on its own small pool so it never blocks the event loop or generation threads
+encoder_pool = ThreadPoolExecutor(max_workers=max(1, ENCODER_WORKERS), thread_name_prefix="Encoder")
+
+def is_format_available(response_format: str) -> bool:
+    """Check whether a streaming response format can be encoded in this environment."""
+    if response_format not in STREAMING_FORMATS:
+        return False
+    return response_format == "pcm" or AV_AVAILABLE
+
+def supports_sample_rate(response_format: str, sample_rate: int) -> bool:
+    """Check whether a response format can be encoded at sample_rate."""
+    return response_format != "opus" or sample_rate in OPUS_SAMPLE_RATES
+
+class _ByteSink:
+    """Write-only file object that collects muxer output until it is drained."""
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def write(self, data) -> int:
+        self._buffer.extend(data)
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+class StreamingEncoder:
+    """
+    Incremental encoder from 16-bit mono PCM chunks to a compressed container.
+
+    Each call to encode() returns whatever container bytes the muxer produced for
+    that chunk (possibly empty); flush() drains the encoder and returns the trailer.
+    """
+    def __init__(self, response_format: str, sample_rate: int):
+        container_format, codec, media_type, bit_rate = STREAMING_FORMATS[response_format]
+        self.response_format = response_format
+        self.media_type = media_type
+        self.sample_rate = sample_rate
+        self.samples_in = 0
+        self.bytes_out = 0
+        self.encode_time = 0.0
+
+        self._lock = threading.Lock()
+        self._sink = None
+        self._container = None
+        self._stream = None
+        if codec is not None:
+            import av
+            start = time.perf_counter()
+            options = {"page_duration": OGG_PAGE_DURATION_US} if container_format == "ogg" else {}
+            self._sink = _ByteSink()
+            self._container = av.open(self._sink, mode="w", format=container_format, options=options)
+            self._stream = self._container.add_stream(codec, rate=sample_rate, layout="mono")
+            if bit_rate:
+                self._stream.bit_rate = bit_rate
+            self.encode_time += time.perf_counter() - start
+
+    def encode(self, pcm: bytes) -> bytes:
+        """Encode one PCM chunk and return the container bytes produced so far."""
+        with self._lock:
+            start = time.perf_counter()
+            self.samples_in += len(pcm) // 2
+            if self._stream is None:
+                data = pcm
+            else:
+                import av
+                frame = av.AudioFrame.from_ndarray(
+                    np.frombuffer(pcm, dtype=np.int16).reshape(1, -1), format="s16", layout="mono"
+                )
+                frame.sample_rate = self.sample_rate
+                for packet in self._stream.encode(frame):
+                    self._container.mux(packet)
+                data = self._sink.drain()
+            self.bytes_out += len(data)
+            self.encode_time += time.perf_counter() - start
+            return data
+
+    def flush(self) -> bytes:
+        """Flush buffered samples and finalize the container."""
+        with self._lock:
+            if self._container is None:
+                return b""
+            start = time.perf_counter()
+            for packet in self._stream.encode(None):
+                self._container.mux(packet)
+            self._container.close()
+            data = self._sink.drain()
+            self._container = None
+            self.bytes_out += len(data)
+            self.encode_time += time.perf_counter() - start
+            return data
+
+    def close(self) -> None:
+        """Release the container without returning its trailer (used when a stream is aborted)."""
+        with self._lock:
+            if self._container is not None:
+                self._container.close()
+                self._container = None
+
+    @property
+    def audio_seconds(self) -> float:
+        return self.samples_in / self.sample_rate
+
+class EncoderStats:
+    """Aggregate encode cost and compression per response format."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {}
+
+    def record(self, encoder: StreamingEncoder) -> None:
+        with self._lock:
+            totals = self._totals.setdefault(encoder.response_format, {
+                "streams": 0, "audio_seconds": 0.0, "encode_seconds": 0.0, "bytes_out": 0
+            })
+            totals["streams"] += 1
+            totals["audio_seconds"] += encoder.audio_seconds
+            totals["encode_seconds"] += encoder.encode_time
+            totals["bytes_out"] += encoder.bytes_out
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            result = {}
+            for fmt, totals in self._totals.items():
+                audio_seconds = totals["audio_seconds"]
+                result[fmt] = {
+                    "streams": totals["streams"],
+                    "audio_seconds": round(audio_seconds, 2),
+                    "encode_ms_per_audio_second": round(totals["encode_seconds"] / audio_seconds * 1000, 3) if audio_seconds else 0.0,
+                    "kbps": round(totals["bytes_out"] * 8 / audio_seconds / 1000, 1) if audio_seconds else 0.0,
+                }
+            return result
+
+encoder_stats = EncoderStats()
+
+async def encode_stream(chunks: AsyncIterator[bytes], response_format: str, sample_rate: int) -> AsyncIterator[bytes]:
+    """
+    Encode an async stream of PCM chunks on the encoder pool, yielding container
+    bytes as soon as the muxer produces them.
+    """
+    loop = asyncio.get_running_loop()
+    encoder = await loop.run_in_executor(
+        encoder_pool, StreamingEncoder, response_format, sample_rate
+    )
+    try:
+        async for pcm in chunks:
+            data = await loop.run_in_executor(encoder_pool, encoder.encode, pcm)
+            if data:
+                yield data
+        data = await loop.run_in_executor(encoder_pool, encoder.flush)
+        if data:
+            yield data
+    finally:
+        # A no-op after flush(); releases the container if the client went away mid-stream
+        encoder_pool.submit(encoder.close)
+        encoder_stats.record(encoder)
+        if encoder.audio_seconds > 0:
+            print(f"Encoded {encoder.audio_seconds:.2f}s of audio to {response_format} "
+                  f"({encoder.bytes_out} bytes) in {encoder.encode_time * 1000:.1f}ms "
+                  f"({encoder.encode_time / encoder.audio_seconds * 1000:.2f}ms per audio second)")
@@ -0,0 +1,320 @@
+import os
+import math
+import time
+import asyncio
+import threading
+import collections
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from .inference import default_num_workers, IS_RELOADER
+from .scheduler import (
+    _summarize_ms, StrideScheduler, priority_context, normalize_priority,
+    PRIORITY_WEIGHTS, INTERACTIVE, BULK, DEFAULT_PRIORITY
+)
+
+class QueueFullError(Exception):
+    """Raised when a generation request cannot be admitted because the queue is full."""
+    def __init__(self, retry_after: int):
+        super().__init__(f"Generation queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+class QueueTimeoutError(Exception):
+    """Raised when a queued generation request waited longer than the queue timeout."""
+    def __init__(self, waited: float, retry_after: int):
+        super().__init__(f"Generation request expired after waiting {waited:.1f}s in queue")
+        self.waited = waited
+        self.retry_after = retry_after
+
+class _WorkItem:
+    __slots__ = ("fn", "args", "kwargs", "priority", "future", "enqueued_at")
+
+    def __init__(self, fn, args, kwargs, priority):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.future = Future()
+        self.enqueued_at = time.time()
+
+class _ClassStats:
+    """Counters and recent timings for one priority class."""
+    def __init__(self, history_size: int):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.wait_times = collections.deque(maxlen=history_size)
+        self.service_times = collections.deque(maxlen=history_size)
+
+class GenerationExecutor:
+    """
+    Bounded pool of generation threads with a bounded, priority-aware wait queue.
+
+    Blocking speech generation runs on a fixed number of worker threads so the
+    event loop stays responsive. Requests beyond max_concurrency wait in per-class
+    queues of at most max_queue entries in total; further requests are rejected
+    with QueueFullError, and queued requests that waited longer than queue_timeout
+    are shed with QueueTimeoutError instead of being started late.
+
+    Free threads go to the priority classes by stride scheduling, so queued
+    interactive requests start ahead of queued bulk work, while bulk work keeps
+    a weighted share. Bulk work may never occupy the last interactive_reserve
+    threads, so a long bulk job cannot hold every thread.
+    """
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float,
+                 interactive_reserve: int = 1, weights: Dict[str, float] = PRIORITY_WEIGHTS,
+                 history_size: int = 200):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        # With a single thread nothing can be reserved without starving bulk work entirely
+        self.bulk_limit = max(1, self.max_concurrency - max(0, interactive_reserve))
+
+        self._cond = threading.Condition()
+        self._scheduler = StrideScheduler(weights)
+        self._pending = {name: collections.deque() for name in weights}
+        self._active = 0
+        self._active_by_class = {name: 0 for name in weights}
+
+        # Counters and recent timings exposed through stats()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._wait_times = collections.deque(maxlen=history_size)
+        self._service_times = collections.deque(maxlen=history_size)
+        self._class_stats = {name: _ClassStats(history_size) for name in weights}
+
+        self._threads = []
+        for i in range(self.max_concurrency):
+            thread = threading.Thread(target=self._worker, name=f"Generation-{i}")
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _queue_depth(self) -> int:
+        return sum(len(queue) for queue in self._pending.values())
+
+    def retry_after(self) -> int:
+        """Estimate how many seconds a rejected client should wait before retrying."""
+        with self._cond:
+            depth = self._queue_depth()
+            service_times = list(self._service_times)
+        if not service_times:
+            return 1
+        avg_service = sum(service_times) / len(service_times)
+        return max(1, math.ceil(avg_service * (depth + 1) / self.max_concurrency))
+
+    def submit(self, fn: Callable[..., Any], *args, priority: Optional[str] = None, **kwargs) -> Future:
+        """Queue fn(*args, **kwargs) for execution, raising QueueFullError if the queue is full."""
+        priority = normalize_priority(priority)
+        item = _WorkItem(fn, args, kwargs, priority)
+        with self._cond:
+            class_stats = self._class_stats[priority]
+            if self._active + self._queue_depth() >= self.max_concurrency + self.max_queue:
+                self.rejected += 1
+                class_stats.rejected += 1
+                full = True
+            else:
+                self.submitted += 1
+                class_stats.submitted += 1
+                if not self._pending[priority]:
+                    self._scheduler.activate(priority)
+                self._pending[priority].append(item)
+                self._cond.notify_all()
+                full = False
+        if full:
+            raise QueueFullError(self.retry_after())
+        return item.future
+
+    async def run(self, fn: Callable[..., Any], *args, priority: Optional[str] = None, **kwargs) -> Any:
+        """Run fn on the executor and await its result without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(fn, *args, priority=priority, **kwargs))
+
+    async def stream(self, gen_fn: Callable[..., Iterator[Any]], *args, max_buffered: int = 64,
+                     priority: Optional[str] = None, **kwargs) -> AsyncIterator[Any]:
+        """
+        Run a generator function on the executor and relay its items to the event loop.
+        
+        The generator is admitted like any other request when iteration starts. At most
+        max_buffered items are held in memory; if the consumer falls behind the worker
+        thread blocks, and if the consumer stops early the generator is closed so the
+        upstream generation is cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        items = asyncio.Queue()
+        slots = threading.Semaphore(max_buffered)
+        stopped = threading.Event()
+        done = object()
+
+        def produce():
+            gen = gen_fn(*args, **kwargs)
+            try:
+                for item in gen:
+                    # Wait for buffer space, giving up if the consumer went away
+                    while not slots.acquire(timeout=0.1):
+                        if stopped.is_set():
+                            return
+                    if stopped.is_set():
+                        return
+                    loop.call_soon_threadsafe(items.put_nowait, item)
+            finally:
+                gen.close()
+
+        def on_done(_future):
+            try:
+                loop.call_soon_threadsafe(items.put_nowait, done)
+            except RuntimeError:
+                pass  # Event loop already closed
+
+        future = self.submit(produce, priority=priority)
+        future.add_done_callback(on_done)
+        try:
+            while True:
+                item = await items.get()
+                if item is done:
+                    break
+                slots.release()
+                yield item
+            # Re-raise queue timeouts and generation errors
+            future.result()
+        finally:
+            stopped.set()
+            future.cancel()
+
+    def _next_item(self) -> Optional[_WorkItem]:
+        """Pick the next queued item by stride scheduling (caller holds the lock)."""
+        eligible = [
+            name for name, queue in self._pending.items()
+            if queue and (name != BULK or self._active_by_class[BULK] < self.bulk_limit)
+        ]
+        priority = self._scheduler.pick(eligible)
+        return self._pending[priority].popleft() if priority is not None else None
+
+    def _worker(self) -> None:
+        """Worker thread loop: take the next queued item and run it."""
+        while True:
+            with self._cond:
+                item = self._next_item()
+                while item is None:
+                    self._cond.wait()
+                    item = self._next_item()
+                self._active += 1
+                self._active_by_class[item.priority] += 1
+
+            class_stats = self._class_stats[item.priority]
+            waited = time.time() - item.enqueued_at
+            try:
+                # Skip requests whose client already went away
+                if not item.future.set_running_or_notify_cancel():
+                    continue
+
+                with self._cond:
+                    self._wait_times.append(waited)
+                    class_stats.wait_times.append(waited)
+
+                if self.queue_timeout and waited > self.queue_timeout:
+                    with self._cond:
+                        self.timed_out += 1
+                        class_stats.timed_out += 1
+                    item.future.set_exception(QueueTimeoutError(waited, self.retry_after()))
+                    continue
+
+                start = time.time()
+                try:
+                    # The LLM and decoder gates read the priority from the running thread
+                    with priority_context(item.priority):
+                        result = item.fn(*item.args, **item.kwargs)
+                except BaseException as e:
+                    with self._cond:
+                        self.failed += 1
+                        class_stats.failed += 1
+                    item.future.set_exception(e)
+                else:
+                    with self._cond:
+                        self.completed += 1
+                        class_stats.completed += 1
+                    item.future.set_result(result)
+                finally:
+                    with self._cond:
+                        self._service_times.append(time.time() - start)
+                        class_stats.service_times.append(time.time() - start)
+            finally:
+                with self._cond:
+                    self._active -= 1
+                    self._active_by_class[item.priority] -= 1
+                    # A finished bulk item may make queued bulk work eligible again
+                    self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of queue depth, counters and recent wait/service times, overall and per class."""
+        with self._cond:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "queue_timeout": self.queue_timeout,
+                "bulk_limit": self.bulk_limit,
+                "active": self._active,
+                "queue_depth": self._queue_depth(),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "wait_ms": _summarize_ms(list(self._wait_times)),
+                "service_ms": _summarize_ms(list(self._service_times)),
+                "classes": {
+                    name: {
+                        "active": self._active_by_class[name],
+                        "queue_depth": len(self._pending[name]),
+                        "submitted": class_stats.submitted,
+                        "completed": class_stats.completed,
+                        "failed": class_stats.failed,
+                        "rejected": class_stats.rejected,
+                        "timed_out": class_stats.timed_out,
+                        "wait_ms": _summarize_ms(list(class_stats.wait_times)),
+                        "service_ms": _summarize_ms(list(class_stats.service_times)),
+                    }
+                    for name, class_stats in self._class_stats.items()
+                },
+            }
+
+# Admission control settings from environment variables
+# The hardware-based default needs a hardware probe (which imports torch), so it is
+# only computed when ORPHEUS_MAX_CONCURRENCY is not set
+try:
+    MAX_CONCURRENCY = int(os.environ["ORPHEUS_MAX_CONCURRENCY"])
+except KeyError:
+    MAX_CONCURRENCY = default_num_workers()
+except (ValueError, TypeError):
+    MAX_CONCURRENCY = default_num_workers()
+    print(f"WARNING: Invalid ORPHEUS_MAX_CONCURRENCY value, using {MAX_CONCURRENCY} as fallback")
+
+try:
+    MAX_QUEUE = int(os.environ.get("ORPHEUS_MAX_QUEUE", "16"))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_MAX_QUEUE value, using 16 as fallback")
+    MAX_QUEUE = 16
+
+try:
+    QUEUE_TIMEOUT = float(os.environ.get("ORPHEUS_QUEUE_TIMEOUT", "60"))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_QUEUE_TIMEOUT value, using 60 seconds as fallback")
+    QUEUE_TIMEOUT = 60.0
+
+try:
+    INTERACTIVE_RESERVE = int(os.environ.get("ORPHEUS_INTERACTIVE_RESERVE", "1"))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_INTERACTIVE_RESERVE value, using 1 as fallback")
+    INTERACTIVE_RESERVE = 1
+
+if not IS_RELOADER:
+    print(f"Admission control: {MAX_CONCURRENCY} concurrent generations, queue of {MAX_QUEUE}, {QUEUE_TIMEOUT:.0f}s queue timeout")
+    print(f"Priority scheduling: weights {', '.join(f'{name}={weight:g}' for name, weight in PRIORITY_WEIGHTS.items())}, "
+          f"default {DEFAULT_PRIORITY}, {INTERACTIVE_RESERVE} generation slot(s) reserved for {INTERACTIVE}")
+
+# Shared executor used by the FastAPI endpoints
+generation_executor = GenerationExecutor(MAX_CONCURRENCY, MAX_QUEUE, QUEUE_TIMEOUT, INTERACTIVE_RESERVE)
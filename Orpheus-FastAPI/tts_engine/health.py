@@ -0,0 +1,110 @@
+import os
+import time
+import threading
+from typing import Any, Dict, Tuple
+
+import requests
+
+from .inference import get_runtime_config, prime_prompt_cache, RuntimeConfig, AVAILABLE_VOICES, DEFAULT_VOICE, IS_RELOADER
+from .speechpipe import warmup
+from .backends import get_backend
+from .inprocess import inprocess_engine, model_path
+
+class Readiness:
+    """
+    Readiness of this process to serve requests: the SNAC decoder has completed a
+    warm-up decode (or the shared decode service answers), and the LLM backend is
+    reachable (for the in-process backend: its model is loaded). Backend probes are
+    cached for probe_interval seconds so frequent load balancer checks do not turn
+    into backend traffic.
+    """
+    def __init__(self, probe_interval: float = 5.0, probe_timeout: float = 2.0):
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.warmed = False
+        self.warmup_error = None
+        self.warmup_seconds = None
+        self.primed_voices = 0
+        self._lock = threading.Lock()
+        self._probe = (0.0, False, "not checked")
+
+    def warm_up(self) -> None:
+        """Warm up the decoder, recording how long it took or why it failed."""
+        start = time.time()
+        try:
+            warmup()
+        except Exception as e:
+            self.warmup_error = str(e)
+            print(f"Decoder warm-up failed: {e}")
+            return
+        self.warmup_seconds = round(time.time() - start, 3)
+        self.warmup_error = None
+        self.warmed = True
+        if not IS_RELOADER:
+            print(f"Decoder warmed up in {self.warmup_seconds:.2f}s")
+
+        # Start loading the in-process model in the background rather than on the first request
+        config = get_runtime_config()
+        if get_backend(config.backend).in_process:
+            inprocess_engine.preload(model_path(config.model_name))
+        
+        # Priming the backend's prompt cache is an optimization; readiness does not wait for it
+        if WARMUP_VOICES:
+            self.primed_voices = prime_prompt_cache(WARMUP_VOICES)
+            if self.primed_voices and not IS_RELOADER:
+                print(f"Primed the prompt cache for {self.primed_voices} voice(s)")
+
+    def _probe_backend(self, config: RuntimeConfig) -> Tuple[bool, str]:
+        # The in-process engine is ready once its model is loaded (the probe starts loading it)
+        if get_backend(config.backend).in_process:
+            return inprocess_engine.status(model_path(config.model_name))
+        # OpenAI-compatible servers (llama.cpp, LM Studio, vLLM) list models next to the completions route
+        url = config.api_url.rsplit("/", 1)[0] + "/models"
+        try:
+            response = requests.get(url, timeout=self.probe_timeout)
+        except requests.exceptions.RequestException as e:
+            return False, f"{type(e).__name__} for {url}"
+        if response.status_code >= 500:
+            return False, f"HTTP {response.status_code} from {url}"
+        return True, f"HTTP {response.status_code} from {url}"
+
+    def backend(self) -> Tuple[bool, str]:
+        """Whether the LLM backend answered recently (probes at most every probe_interval seconds)."""
+        with self._lock:
+            checked_at, reachable, detail = self._probe
+            if time.time() - checked_at < self.probe_interval:
+                return reachable, detail
+            reachable, detail = self._probe_backend(get_runtime_config())
+            self._probe = (time.time(), reachable, detail)
+            return reachable, detail
+
+    def check(self) -> Dict[str, Any]:
+        """Readiness report; blocking when the backend probe is due, so call it off the event loop."""
+        reachable, detail = self.backend()
+        decoder = {"ready": self.warmed, "warmup_seconds": self.warmup_seconds}
+        if self.warmup_error:
+            decoder["error"] = self.warmup_error
+        return {
+            "ready": self.warmed and reachable,
+            "checks": {
+                "decoder": decoder,
+                "llm_backend": {"ready": reachable, "detail": detail, "backend": get_runtime_config().backend},
+            },
+            "primed_voices": self.primed_voices,
+        }
+
+# Voices whose prompt prefix is primed in the backend's prompt cache at startup:
+# a comma-separated list, "all" or "none"
+WARMUP_VOICES = os.environ.get("ORPHEUS_WARMUP_VOICES", DEFAULT_VOICE).strip()
+if WARMUP_VOICES.lower() == "all":
+    WARMUP_VOICES = list(AVAILABLE_VOICES)
+elif WARMUP_VOICES.lower() in ("", "none"):
+    WARMUP_VOICES = []
+else:
+    WARMUP_VOICES = [voice.strip() for voice in WARMUP_VOICES.split(",") if voice.strip()]
+    for voice in [voice for voice in WARMUP_VOICES if voice not in AVAILABLE_VOICES]:
+        print(f"WARNING: Unknown voice '{voice}' in ORPHEUS_WARMUP_VOICES, skipping it")
+        WARMUP_VOICES.remove(voice)
+
+# Shared readiness state used by /readyz
+readiness = Readiness()
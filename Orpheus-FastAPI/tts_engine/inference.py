@@ -5,14 +5,17 @@ import json
 import time
 import wave
 import numpy as np
-import sounddevice as sd
-import argparse
 import threading
 import queue
 import asyncio
+import contextlib
 from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional, Generator, Union, Tuple
-from dotenv import load_dotenv
+from dotenv import load_dotenv, dotenv_values
+
+from .backends import BACKENDS, get_backend
+from .inprocess import inprocess_engine, model_path
+from .resample import StreamingResampler, resample_chunks, SUPPORTED_SAMPLE_RATES
 
 # Helper to detect if running in Uvicorn's reloader
 def is_reloader_process():
@@ -28,50 +31,6 @@ if not IS_RELOADER:
 # Load environment variables from .env file
 load_dotenv()
 
-# Detect hardware capabilities and display information
-import torch
-import psutil
-
-# Detect if we're on a high-end system based on hardware capabilities
-HIGH_END_GPU = False
-if torch.cuda.is_available():
-    # Get GPU properties
-    props = torch.cuda.get_device_properties(0)
-    gpu_name = props.name
-    gpu_mem_gb = props.total_memory / (1024**3)
-    compute_capability = f"{props.major}.{props.minor}"
-    
-    # Consider high-end if: large VRAM (≥16GB) OR high compute capability (≥8.0) OR large VRAM (≥12GB) with good CC (≥7.0)
-    HIGH_END_GPU = (gpu_mem_gb >= 16.0 or 
-                    props.major >= 8 or 
-                    (gpu_mem_gb >= 12.0 and props.major >= 7))
-        
-    if HIGH_END_GPU:
-        if not IS_RELOADER:
-            print(f"🖥️ Hardware: High-end CUDA GPU detected")
-            print(f"📊 Device: {gpu_name}")
-            print(f"📊 VRAM: {gpu_mem_gb:.2f} GB")
-            print(f"📊 Compute Capability: {compute_capability}")
-            print("🚀 Using high-performance optimizations")
-    else:
-        if not IS_RELOADER:
-            print(f"🖥️ Hardware: CUDA GPU detected")
-            print(f"📊 Device: {gpu_name}")
-            print(f"📊 VRAM: {gpu_mem_gb:.2f} GB")
-            print(f"📊 Compute Capability: {compute_capability}")
-            print("🚀 Using GPU-optimized settings")
-else:
-    # Get CPU info
-    cpu_cores = psutil.cpu_count(logical=False)
-    cpu_threads = psutil.cpu_count(logical=True)
-    ram_gb = psutil.virtual_memory().total / (1024**3)
-    
-    if not IS_RELOADER:
-        print(f"🖥️ Hardware: CPU only (No CUDA GPU detected)")
-        print(f"📊 CPU: {cpu_cores} cores, {cpu_threads} threads")
-        print(f"📊 RAM: {ram_gb:.2f} GB")
-        print("⚙️ Using CPU-optimized settings")
-
 # Load configuration from environment variables without hardcoded defaults
 # Critical settings - will log errors if missing
 required_settings = ["ORPHEUS_API_URL"]
@@ -80,50 +39,173 @@ if missing_settings:
     print(f"ERROR: Missing required environment variable(s): {', '.join(missing_settings)}")
     print("Please set them in .env file or environment. See .env.example for defaults.")
 
-# API connection settings
-API_URL = os.environ.get("ORPHEUS_API_URL")
-if not API_URL:
-    print("WARNING: ORPHEUS_API_URL not set. API calls will fail until configured.")
-
 HEADERS = {
     "Content-Type": "application/json"
 }
 
-# Request timeout settings
-try:
-    REQUEST_TIMEOUT = int(os.environ.get("ORPHEUS_API_TIMEOUT", "120"))
-except (ValueError, TypeError):
-    print("WARNING: Invalid ORPHEUS_API_TIMEOUT value, using 120 seconds as fallback")
-    REQUEST_TIMEOUT = 120
+class RuntimeConfig:
+    """
+    Immutable snapshot of the settings that can change while the server runs.
+    
+    A generation reads the current snapshot once when it starts and passes it
+    down, so a configuration change never affects requests already in flight.
+    """
+    __slots__ = ("api_url", "api_timeout", "max_tokens", "temperature", "top_p", "model_name", "backend", "token_ids")
+    
+    def __init__(self, api_url, api_timeout, max_tokens, temperature, top_p, model_name, backend, token_ids):
+        object.__setattr__(self, "api_url", api_url)
+        object.__setattr__(self, "api_timeout", api_timeout)
+        object.__setattr__(self, "max_tokens", max_tokens)
+        object.__setattr__(self, "temperature", temperature)
+        object.__setattr__(self, "top_p", top_p)
+        object.__setattr__(self, "model_name", model_name)
+        object.__setattr__(self, "backend", backend)
+        object.__setattr__(self, "token_ids", token_ids)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("RuntimeConfig is immutable; build a new one with from_env()")
+    
+    @classmethod
+    def from_env(cls, env=None) -> "RuntimeConfig":
+        """Build a config from environment-style values, falling back to defaults for invalid ones."""
+        env = os.environ if env is None else env
+        
+        # API connection settings
+        api_url = env.get("ORPHEUS_API_URL")
+        if not api_url:
+            print("WARNING: ORPHEUS_API_URL not set. API calls will fail until configured.")
+        
+        # Request timeout settings
+        try:
+            api_timeout = int(env.get("ORPHEUS_API_TIMEOUT", "120"))
+        except (ValueError, TypeError):
+            print("WARNING: Invalid ORPHEUS_API_TIMEOUT value, using 120 seconds as fallback")
+            api_timeout = 120
+        
+        # Model generation parameters
+        try:
+            max_tokens = int(env.get("ORPHEUS_MAX_TOKENS", "8192"))
+        except (ValueError, TypeError):
+            print("WARNING: Invalid ORPHEUS_MAX_TOKENS value, using 8192 as fallback")
+            max_tokens = 8192
+        
+        try:
+            temperature = float(env.get("ORPHEUS_TEMPERATURE", "0.6"))
+        except (ValueError, TypeError):
+            print("WARNING: Invalid ORPHEUS_TEMPERATURE value, using 0.6 as fallback")
+            temperature = 0.6
+        
+        try:
+            top_p = float(env.get("ORPHEUS_TOP_P", "0.9"))
+        except (ValueError, TypeError):
+            print("WARNING: Invalid ORPHEUS_TOP_P value, using 0.9 as fallback")
+            top_p = 0.9
+        
+        model_name = env.get("ORPHEUS_MODEL_NAME", "Orpheus-3b-FT-Q8_0.gguf")
+        
+        # Kind of inference server, selecting parameter names and server-side features
+        backend = env.get("ORPHEUS_BACKEND", "generic").lower()
+        if backend not in BACKENDS:
+            print(f"WARNING: Invalid ORPHEUS_BACKEND value, using generic as fallback (supported: {', '.join(BACKENDS)})")
+            backend = "generic"
+        
+        # Stream vocabulary IDs instead of token text on backends that support it
+        token_ids = env.get("ORPHEUS_TOKEN_IDS", "false").lower() in ("1", "true", "yes", "on")
+        
+        return cls(api_url, api_timeout, max_tokens, temperature, top_p, model_name, backend, token_ids)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
 
-# Model generation parameters from environment variables
-try:
-    MAX_TOKENS = int(os.environ.get("ORPHEUS_MAX_TOKENS", "8192"))
-except (ValueError, TypeError):
-    print("WARNING: Invalid ORPHEUS_MAX_TOKENS value, using 8192 as fallback")
-    MAX_TOKENS = 8192
+# Environment variables that are applied live by reload_runtime_config()
+LIVE_CONFIG_KEYS = (
+    "ORPHEUS_API_URL",
+    "ORPHEUS_API_TIMEOUT",
+    "ORPHEUS_MAX_TOKENS",
+    "ORPHEUS_TEMPERATURE",
+    "ORPHEUS_TOP_P",
+    "ORPHEUS_MODEL_NAME",
+    "ORPHEUS_BACKEND",
+    "ORPHEUS_TOKEN_IDS",
+)
 
-try:
-    TEMPERATURE = float(os.environ.get("ORPHEUS_TEMPERATURE", "0.6"))
-except (ValueError, TypeError):
-    print("WARNING: Invalid ORPHEUS_TEMPERATURE value, using 0.6 as fallback")
-    TEMPERATURE = 0.6
+# How often get_runtime_config() checks .env for changes made by another worker process
+CONFIG_WATCH_INTERVAL = 1.0
+CONFIG_FILE = ".env"
 
-try:
-    TOP_P = float(os.environ.get("ORPHEUS_TOP_P", "0.9"))
-except (ValueError, TypeError):
-    print("WARNING: Invalid ORPHEUS_TOP_P value, using 0.9 as fallback")
-    TOP_P = 0.9
+_config_lock = threading.Lock()
+_runtime_config = RuntimeConfig.from_env()
+_config_checked_at = time.time()
+_config_mtime = os.path.getmtime(CONFIG_FILE) if os.path.exists(CONFIG_FILE) else None
+
+def get_runtime_config() -> RuntimeConfig:
+    """Return the current configuration snapshot."""
+    global _config_checked_at, _config_mtime
+    now = time.time()
+    if now - _config_checked_at >= CONFIG_WATCH_INTERVAL:
+        _config_checked_at = now
+        try:
+            mtime = os.path.getmtime(CONFIG_FILE)
+        except OSError:
+            mtime = None
+        if mtime is not None and mtime != _config_mtime:
+            _config_mtime = mtime
+            reload_runtime_config(dotenv_values(CONFIG_FILE))
+    return _runtime_config
+
+def reload_runtime_config(values: Dict[str, Any]) -> List[str]:
+    """
+    Apply new values for LIVE_CONFIG_KEYS and swap in a new configuration snapshot.
+    
+    Keys outside LIVE_CONFIG_KEYS are ignored. Returns the keys whose value changed.
+    """
+    global _runtime_config
+    with _config_lock:
+        changed = []
+        for key in LIVE_CONFIG_KEYS:
+            if key in values and values[key] is not None and str(values[key]) != os.environ.get(key):
+                os.environ[key] = str(values[key])
+                changed.append(key)
+        if changed:
+            _runtime_config = RuntimeConfig.from_env()
+            print(f"🔧 Configuration updated live: {', '.join(changed)}")
+        return changed
+
+# Startup values, kept for callers that read the module constants (the CLI defaults)
+API_URL = _runtime_config.api_url
+REQUEST_TIMEOUT = _runtime_config.api_timeout
+MAX_TOKENS = _runtime_config.max_tokens
+TEMPERATURE = _runtime_config.temperature
+TOP_P = _runtime_config.top_p
 
 # Repetition penalty is hardcoded to 1.1 which is the only stable value for quality output
 REPETITION_PENALTY = 1.1
 
+# SNAC always decodes 24 kHz audio; generation, crossfades and pauses work at this rate
+SNAC_SAMPLE_RATE = 24000
+
+# Default output sample rate; audio is resampled from SNAC_SAMPLE_RATE when it differs.
+# Changing it requires a restart
 try:
     SAMPLE_RATE = int(os.environ.get("ORPHEUS_SAMPLE_RATE", "24000"))
+    if SAMPLE_RATE not in SUPPORTED_SAMPLE_RATES:
+        raise ValueError(SAMPLE_RATE)
 except (ValueError, TypeError):
-    print("WARNING: Invalid ORPHEUS_SAMPLE_RATE value, using 24000 as fallback")
+    print(f"WARNING: Invalid ORPHEUS_SAMPLE_RATE value, using 24000 as fallback "
+          f"(supported: {', '.join(map(str, SUPPORTED_SAMPLE_RATES))})")
     SAMPLE_RATE = 24000
 
+# Generate the first sentence or clause of a multi-sentence text on its own, with the
+# rest generated concurrently, so audio starts after a short prefill
+FAST_START = os.environ.get("ORPHEUS_FAST_START", "false").lower() in ("1", "true", "yes", "on")
+
+# Longest first piece for the fast start; longer first sentences are cut at a clause
+try:
+    FAST_START_CHARS = int(os.environ.get("ORPHEUS_FAST_START_CHARS", "100"))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_FAST_START_CHARS value, using 100 as fallback")
+    FAST_START_CHARS = 100
+
 # Print loaded configuration only in the main process, not in the reloader
 if not IS_RELOADER:
     print(f"Configuration loaded:")
@@ -133,8 +215,9 @@ if not IS_RELOADER:
     print(f"  TOP_P: {TOP_P}")
     print(f"  REPETITION_PENALTY: {REPETITION_PENALTY}")
 
-# Parallel processing settings
-NUM_WORKERS = 4 if HIGH_END_GPU else 2
+def default_num_workers() -> int:
+    """Default number of parallel generations for this hardware (probes it on first call)."""
+    return 4 if hardware_info()["high_end_gpu"] else 2
 
 # Define voices by language
 ENGLISH_VOICES = ["tara", "leah", "jess", "leo", "dan", "mia", "zac", "zoe"]
@@ -174,35 +257,57 @@ VOICE_TO_LANGUAGE.update({voice: "italian" for voice in ITALIAN_VOICES})
 AVAILABLE_LANGUAGES = ["english", "french", "german", "korean", "hindi", "mandarin", "spanish", "italian"]
 
 # Import the unified token handling from speechpipe
-from .speechpipe import turn_token_into_id, CUSTOM_TOKEN_PREFIX
+from .speechpipe import turn_token_into_id, CUSTOM_TOKEN_PREFIX, hardware_info
+from .scheduler import llm_gate, decode_gate, current_priority, priority_context
+from .capacity import RealtimeMonitor
+from .runaway import RunawayGuard, runaway_stats, token_budget, RUNAWAY_GUARD
+from .markup import split_pauses, pause_stats, PAUSE_MARKUP, PAUSE_PREFETCH
+from .archive import TokenRecorder, encode_archive, archive_store
+from .trim import trim_chunks, TRIM_SILENCE
+from .checkpoints import checkpoint_store, CHECKPOINTS
+from .profiling import profiler, current_profile, profile_context
+from .memory import memory_monitor
 
 # Special token IDs for Orpheus model
 START_TOKEN_ID = 128259
-END_TOKEN_IDS = [128009, 128260, 128261, 128257]
+# Tokens that end the audio: end of speech, end of the AI turn and <|eot_id|>
+END_TOKEN_IDS = [128258, 128262, 128009]
+
+class GenerationError(Exception):
+    """Raised when the LLM backend could not produce tokens for a request."""
+    pass
+
+# In-flight streams and recent realtime factors, reported by /capacity
+realtime_monitor = RealtimeMonitor(SNAC_SAMPLE_RATE)
 
 # Performance monitoring
 class PerformanceMonitor:
-    """Track and report performance metrics"""
+    """Track and report the performance metrics of one request (shared by its threads)"""
     def __init__(self):
         self.start_time = time.time()
         self.token_count = 0
         self.audio_chunks = 0
         self.last_report_time = time.time()
         self.report_interval = 2.0  # seconds
+        self._lock = threading.Lock()
         
     def add_tokens(self, count: int = 1) -> None:
-        self.token_count += count
+        with self._lock:
+            self.token_count += count
         self._check_report()
         
     def add_audio_chunk(self) -> None:
-        self.audio_chunks += 1
+        with self._lock:
+            self.audio_chunks += 1
         self._check_report()
         
     def _check_report(self) -> None:
         current_time = time.time()
-        if current_time - self.last_report_time >= self.report_interval:
-            self.report()
+        with self._lock:
+            if current_time - self.last_report_time < self.report_interval:
+                return
             self.last_report_time = current_time
+        self.report()
             
     def report(self) -> None:
         elapsed = time.time() - self.start_time
@@ -217,8 +322,53 @@ class PerformanceMonitor:
         
         print(f"Progress: {tokens_per_sec:.1f} tokens/sec, est. {est_duration:.1f}s audio generated, {self.token_count} tokens, {self.audio_chunks} chunks in {elapsed:.1f}s")
 
-# Create global performance monitor
-perf_monitor = PerformanceMonitor()
+# The performance monitor of the request a thread is currently working on. Each
+# request gets its own, so concurrent generations do not mix up their counters.
+_perf_local = threading.local()
+
+def current_perf_monitor() -> Optional[PerformanceMonitor]:
+    return getattr(_perf_local, "monitor", None)
+
+@contextlib.contextmanager
+def perf_context(monitor: Optional[PerformanceMonitor]):
+    """Count the enclosed work towards monitor (no-op for None)."""
+    if monitor is None:
+        yield
+        return
+    previous = getattr(_perf_local, "monitor", None)
+    _perf_local.monitor = monitor
+    try:
+        yield
+    finally:
+        _perf_local.monitor = previous
+
+def voice_prefix(voice: str) -> str:
+    """The start of every prompt for voice, shared by all of its requests (cacheable by the backend)."""
+    return f"<|audio|>{voice}: "
+
+def prime_prompt_cache(voices: List[str], config: Optional[RuntimeConfig] = None) -> int:
+    """
+    Prefill each voice's prompt prefix on backends that keep a prompt cache,
+    so the first requests for those voices skip that prefill. Returns how many
+    prefixes were primed.
+    """
+    config = config or get_runtime_config()
+    backend = get_backend(config.backend)
+    primed = 0
+    for voice in voices:
+        payload = backend.warmup_payload(voice_prefix(voice), config.model_name)
+        if payload is None:
+            break
+        try:
+            response = requests.post(config.api_url, headers=HEADERS, json=payload, timeout=config.api_timeout)
+        except requests.exceptions.RequestException as e:
+            print(f"Prompt cache warm-up failed: {e}")
+            break
+        if response.status_code != 200:
+            print(f"Prompt cache warm-up for voice '{voice}' failed with status code {response.status_code}")
+            continue
+        primed += 1
+    return primed
 
 def format_prompt(prompt: str, voice: str = DEFAULT_VOICE) -> str:
     """Format prompt for Orpheus model with voice prefix and special tokens."""
@@ -227,44 +377,88 @@ def format_prompt(prompt: str, voice: str = DEFAULT_VOICE) -> str:
         print(f"Warning: Voice '{voice}' not recognized. Using '{DEFAULT_VOICE}' instead.")
         voice = DEFAULT_VOICE
         
-    # Format similar to how engine_class.py does it with special tokens
-    formatted_prompt = f"{voice}: {prompt}"
-    
-    # Add special token markers for the Orpheus-FASTAPI
-    special_start = "<|audio|>"  # Using the additional_special_token from config
+    # Format similar to how engine_class.py does it with special tokens: the
+    # "<|audio|>voice: " prefix (additional_special_token), then the text
     special_end = "<|eot_id|>"   # Using the eos_token from config
     
-    return f"{special_start}{formatted_prompt}{special_end}"
+    return f"{voice_prefix(voice)}{prompt}{special_end}"
 
-def generate_tokens_from_api(prompt: str, voice: str = DEFAULT_VOICE, temperature: float = TEMPERATURE, 
-                           top_p: float = TOP_P, max_tokens: int = MAX_TOKENS, 
-                           repetition_penalty: float = REPETITION_PENALTY) -> Generator[str, None, None]:
-    """Generate tokens from text using OpenAI-compatible API with optimized streaming and retry logic."""
+def generate_tokens_from_api(prompt: str, voice: str = DEFAULT_VOICE, temperature: Optional[float] = None, 
+                           top_p: Optional[float] = None, max_tokens: Optional[int] = None, 
+                           repetition_penalty: float = REPETITION_PENALTY,
+                           config: Optional[RuntimeConfig] = None) -> Generator[Union[str, int], None, None]:
+    """
+    Generate tokens from text using OpenAI-compatible API with optimized streaming and retry logic.
+    
+    Yields token text, or vocabulary IDs as ints when the server streams token IDs.
+    """
+    # Unset parameters come from the configuration snapshot taken when the request started
+    config = config or get_runtime_config()
+    temperature = config.temperature if temperature is None else temperature
+    top_p = config.top_p if top_p is None else top_p
+    max_tokens = config.max_tokens if max_tokens is None else max_tokens
+    
+    # Bound the generation by the length of the text, so a model that loops or pads
+    # with silence stops long before max_tokens
+    budget = token_budget(prompt) if RUNAWAY_GUARD else None
+    if budget is not None and budget < max_tokens:
+        max_tokens = budget
+    else:
+        budget = None
+    
     start_time = time.time()
+    monitor = current_perf_monitor()
     formatted_prompt = format_prompt(prompt, voice)
     print(f"Generating speech for: {formatted_prompt}")
     
     # Optimize the token generation for GPUs
-    if HIGH_END_GPU:
+    hardware = hardware_info()
+    if hardware["high_end_gpu"]:
         # Use more aggressive parameters for faster generation on high-end GPUs
         print("Using optimized parameters for high-end GPU")
-    elif torch.cuda.is_available():
+    elif hardware["device"] == "cuda":
         print("Using optimized parameters for GPU acceleration")
     
-    # Create the request payload (model field may not be required by some endpoints but included for compatibility)
-    payload = {
-        "prompt": formatted_prompt,
-        "max_tokens": max_tokens,
-        "temperature": temperature,
-        "top_p": top_p,
-        "repeat_penalty": repetition_penalty,
-        "stream": True  # Always stream for better performance
-    }
-    
-    # Add model field - this is ignored by many local inference servers for /v1/completions
-    # but included for compatibility with OpenAI API and some servers that may use it
-    model_name = os.environ.get("ORPHEUS_MODEL_NAME", "Orpheus-3b-FT-Q8_0.gguf")
-    payload["model"] = model_name
+    # The backend adapter picks the parameter names and server-side features for the configured server
+    backend = get_backend(config.backend)
+    request_args = dict(
+        max_tokens=max_tokens,
+        temperature=temperature,
+        top_p=top_p,
+        repetition_penalty=repetition_penalty,
+        model=config.model_name
+    )
+    
+    # The in-process engine hands over token IDs directly; there is no request to retry
+    if backend.in_process:
+        token_counter = 0
+        with llm_gate.slot():
+            try:
+                for token_id in inprocess_engine.generate(formatted_prompt, model_path(config.model_name), max_tokens,
+                                                          temperature, top_p, repetition_penalty):
+                    token_counter += 1
+                    if monitor:
+                        monitor.add_tokens()
+                    yield token_id
+            except Exception as e:
+                raise GenerationError(f"In-process generation failed: {e}")
+        generation_time = time.time() - start_time
+        tokens_per_second = token_counter / generation_time if generation_time > 0 else 0
+        print(f"Token generation complete: {token_counter} tokens in {generation_time:.2f}s ({tokens_per_second:.1f} tokens/sec)")
+        if budget is not None and token_counter >= budget:
+            print(f"Generation stopped at its token budget of {budget}")
+            runaway_stats.record("budget")
+        return
+    
+    url = config.api_url
+    payload = backend.payload(formatted_prompt, **request_args)
+    
+    # In token-ID mode the server streams vocabulary IDs, which the decoder maps straight
+    # to audio codes instead of parsing "<custom_token_N>" text back into numbers
+    if config.token_ids:
+        id_request = backend.token_id_request(config.api_url, formatted_prompt, **request_args)
+        if id_request is not None:
+            url, payload = id_request
     
     # Session for connection pooling and retry logic
     session = requests.Session()
@@ -272,85 +466,108 @@ def generate_tokens_from_api(prompt: str, voice: str = DEFAULT_VOICE, temperatur
     retry_count = 0
     max_retries = 3
     
-    while retry_count < max_retries:
-        try:
-            # Make the API request with streaming and timeout
-            response = session.post(
-                API_URL, 
-                headers=HEADERS, 
-                json=payload, 
-                stream=True,
-                timeout=REQUEST_TIMEOUT
-            )
+    # Hold an LLM slot for the whole stream; queued interactive requests get slots ahead of bulk ones
+    with llm_gate.slot():
+        while retry_count < max_retries:
+            try:
+                # Make the API request with streaming and timeout
+                response = session.post(
+                    url, 
+                    headers=HEADERS, 
+                    json=payload, 
+                    stream=True,
+                    timeout=config.api_timeout
+                )
             
-            if response.status_code != 200:
-                print(f"Error: API request failed with status code {response.status_code}")
-                print(f"Error details: {response.text}")
-                # Retry on server errors (5xx) but not on client errors (4xx)
-                if response.status_code >= 500:
-                    retry_count += 1
-                    wait_time = 2 ** retry_count  # Exponential backoff
-                    print(f"Retrying in {wait_time} seconds...")
-                    time.sleep(wait_time)
-                    continue
-                return
+                if response.status_code != 200:
+                    print(f"Error: API request failed with status code {response.status_code}")
+                    print(f"Error details: {response.text}")
+                    # Retry on server errors (5xx) but not on client errors (4xx)
+                    if response.status_code >= 500:
+                        retry_count += 1
+                        wait_time = 2 ** retry_count  # Exponential backoff
+                        print(f"Retrying in {wait_time} seconds...")
+                        time.sleep(wait_time)
+                        continue
+                    raise GenerationError(f"API request failed with status code {response.status_code}")
             
-            # Process the streamed response with better buffering
-            buffer = ""
-            token_counter = 0
+                # Process the streamed response with better buffering
+                buffer = ""
+                token_counter = 0
             
-            # Iterate through the response to get tokens
-            for line in response.iter_lines():
-                if line:
-                    line_str = line.decode('utf-8')
-                    if line_str.startswith('data: '):
-                        data_str = line_str[6:]  # Remove the 'data: ' prefix
-                        
-                        if data_str.strip() == '[DONE]':
-                            break
+                # Iterate through the response to get tokens. The response is closed
+                # in all cases so that a consumer that stops early (client disconnect,
+                # cancellation) also releases the upstream generation.
+                try:
+                    for line in response.iter_lines():
+                        if line:
+                            line_str = line.decode('utf-8')
+                            if line_str.startswith('data: '):
+                                data_str = line_str[6:]  # Remove the 'data: ' prefix
                             
-                        try:
-                            data = json.loads(data_str)
-                            if 'choices' in data and len(data['choices']) > 0:
-                                token_chunk = data['choices'][0].get('text', '')
-                                for token_text in token_chunk.split('>'):
-                                    token_text = f'{token_text}>'
-                                    token_counter += 1
-                                    perf_monitor.add_tokens()
-
-                                    if token_text:
-                                        yield token_text
-                        except json.JSONDecodeError as e:
-                            print(f"Error decoding JSON: {e}")
-                            continue
-            
-            # Generation completed successfully
-            generation_time = time.time() - start_time
-            tokens_per_second = token_counter / generation_time if generation_time > 0 else 0
-            print(f"Token generation complete: {token_counter} tokens in {generation_time:.2f}s ({tokens_per_second:.1f} tokens/sec)")
-            return
+                                if data_str.strip() == '[DONE]':
+                                    break
+                                
+                                try:
+                                    data = json.loads(data_str)
+                                    # Events without IDs (servers that ignore the request for them) fall back to text
+                                    token_ids = backend.chunk_token_ids(data)
+                                    if token_ids:
+                                        for token_id in token_ids:
+                                            token_counter += 1
+                                            if monitor:
+                                                monitor.add_tokens()
+                                            yield token_id
+                                        continue
+                                    token_chunk = backend.chunk_text(data)
+                                    if token_chunk:
+                                        for token_text in token_chunk.split('>'):
+                                            # The piece after the last '>' is empty
+                                            if not token_text:
+                                                continue
+                                            token_counter += 1
+                                            if monitor:
+                                                monitor.add_tokens()
+                                            yield f'{token_text}>'
+                                except json.JSONDecodeError as e:
+                                    print(f"Error decoding JSON: {e}")
+                                    continue
+                finally:
+                    response.close()
             
-        except requests.exceptions.Timeout:
-            print(f"Request timed out after {REQUEST_TIMEOUT} seconds")
-            retry_count += 1
-            if retry_count < max_retries:
-                wait_time = 2 ** retry_count
-                print(f"Retrying in {wait_time} seconds... (attempt {retry_count+1}/{max_retries})")
-                time.sleep(wait_time)
-            else:
-                print("Max retries reached. Token generation failed.")
+                # Generation completed successfully
+                generation_time = time.time() - start_time
+                tokens_per_second = token_counter / generation_time if generation_time > 0 else 0
+                print(f"Token generation complete: {token_counter} tokens in {generation_time:.2f}s ({tokens_per_second:.1f} tokens/sec)")
+                if budget is not None and token_counter >= budget:
+                    print(f"Generation stopped at its token budget of {budget}")
+                    runaway_stats.record("budget")
                 return
+            
+            except requests.exceptions.Timeout:
+                print(f"Request timed out after {config.api_timeout} seconds")
+                retry_count += 1
+                if retry_count < max_retries:
+                    wait_time = 2 ** retry_count
+                    print(f"Retrying in {wait_time} seconds... (attempt {retry_count+1}/{max_retries})")
+                    time.sleep(wait_time)
+                else:
+                    print("Max retries reached. Token generation failed.")
+                    raise GenerationError(f"API request timed out after {max_retries} attempts")
                 
-        except requests.exceptions.ConnectionError:
-            print(f"Connection error to API at {API_URL}")
-            retry_count += 1
-            if retry_count < max_retries:
-                wait_time = 2 ** retry_count
-                print(f"Retrying in {wait_time} seconds... (attempt {retry_count+1}/{max_retries})")
-                time.sleep(wait_time)
-            else:
-                print("Max retries reached. Token generation failed.")
-                return
+            except requests.exceptions.ConnectionError:
+                print(f"Connection error to API at {url}")
+                retry_count += 1
+                if retry_count < max_retries:
+                    wait_time = 2 ** retry_count
+                    print(f"Retrying in {wait_time} seconds... (attempt {retry_count+1}/{max_retries})")
+                    time.sleep(wait_time)
+                else:
+                    print("Max retries reached. Token generation failed.")
+                    raise GenerationError(f"Could not connect to API at {url}")
+        
+        # Only reached when every attempt got a server error
+        raise GenerationError(f"API request failed with server errors after {max_retries} attempts")
 
 # The turn_token_into_id function is now imported from speechpipe.py
 # This eliminates duplicate code and ensures consistent behavior
@@ -360,16 +577,25 @@ def convert_to_audio(multiframe: List[int], count: int) -> Optional[bytes]:
     # Import here to avoid circular imports
     from .speechpipe import convert_to_audio as orpheus_convert_to_audio
     start_time = time.time()
-    result = orpheus_convert_to_audio(multiframe, count)
+    # Decode windows from interactive requests are decoded ahead of bulk ones
+    with decode_gate.slot():
+        result = orpheus_convert_to_audio(multiframe, count)
     
-    if result is not None:
-        perf_monitor.add_audio_chunk()
+    monitor = current_perf_monitor()
+    if result is not None and monitor:
+        monitor.add_audio_chunk()
         
     return result
 
-async def tokens_decoder(token_gen) -> Generator[bytes, None, None]:
-    """Simplified token decoder with early first-chunk processing for lower latency."""
-    buffer = []
+async def tokens_decoder(token_gen, codes=None) -> Generator[bytes, None, None]:
+    """
+    Simplified token decoder with early first-chunk processing for lower latency.
+    
+    With the runaway guard enabled, decoding stops at an end token, a frame loop or a
+    long silence; the token generator is then closed, which cancels the generation.
+    Decoded audio codes are appended to codes, if given (for token archives).
+    """
+    buffer = [] if codes is None else codes
     count = 0
     
     # Use different thresholds for first chunk vs. subsequent chunks
@@ -381,8 +607,12 @@ async def tokens_decoder(token_gen) -> Generator[bytes, None, None]:
     start_time = time.time()
     last_log_time = start_time
     token_count = 0
+    guard = RunawayGuard(END_TOKEN_IDS, SNAC_SAMPLE_RATE) if RUNAWAY_GUARD else None
     
     async for token_text in token_gen:
+        if guard is not None and guard.is_end_token(token_text):
+            guard.stop("end_token")
+            break
         token = turn_token_into_id(token_text, count)
         if token is not None and token > 0:
             # Add to buffer using simple append (reliable method)
@@ -399,6 +629,7 @@ async def tokens_decoder(token_gen) -> Generator[bytes, None, None]:
                 last_log_time = current_time
             
             # Different processing paths based on whether first chunk has been processed
+            audio_samples = None
             if not first_chunk_processed:
                 # For first audio output, process as soon as we have enough tokens for one chunk
                 if count >= min_frames_first:
@@ -409,7 +640,6 @@ async def tokens_decoder(token_gen) -> Generator[bytes, None, None]:
                     audio_samples = convert_to_audio(buffer_to_proc, count)
                     if audio_samples is not None:
                         first_chunk_processed = True  # Mark first chunk as processed
-                        yield audio_samples
             else:
                 # For subsequent chunks, use standard processing with larger batch
                 if count % process_every == 0 and count >= min_frames_subsequent:
@@ -422,45 +652,83 @@ async def tokens_decoder(token_gen) -> Generator[bytes, None, None]:
                     
                     # Process the tokens
                     audio_samples = convert_to_audio(buffer_to_proc, count)
-                    if audio_samples is not None:
-                        yield audio_samples
+            
+            if audio_samples is not None:
+                if guard is None:
+                    yield audio_samples
+                    continue
+                # The newest frame's audio may be held back until the guard knows it is speech
+                for chunk in guard.feed(buffer[-7:], audio_samples):
+                    yield chunk
+                if guard.reason:
+                    break
+    
+    if guard is None:
+        return
+    if guard.reason in (None, "end_token"):
+        for chunk in guard.flush():
+            yield chunk
+    if guard.reason:
+        print(f"Runaway guard stopped the generation ({guard.reason}) after {count} tokens, "
+              f"trimmed {guard.trimmed_seconds:.2f}s of audio")
+        runaway_stats.record(guard.reason, guard.trimmed_seconds)
+        # Closing the token generator cancels the upstream generation
+        await token_gen.aclose()
 
-def tokens_decoder_sync(syn_token_gen, output_file=None):
-    """Optimized synchronous wrapper with parallel processing and efficient file I/O."""
+def tokens_decoder_stream(syn_token_gen, codes=None) -> Generator[bytes, None, None]:
+    """
+    Decode a synchronous token generator on a background thread and yield audio chunks
+    as soon as they are produced. Audio codes are collected in codes, if given.
+    
+    Closing the generator early stops the producer thread and closes the token generator,
+    which releases the upstream LLM request.
+    """
+    # The producer thread works on behalf of the same request as the calling thread
+    priority = current_priority()
+    profile = current_profile()
+    monitor = current_perf_monitor()
+    
     # Use a larger queue for high-end systems
-    queue_size = 100 if HIGH_END_GPU else 50
+    high_end_gpu = hardware_info()["high_end_gpu"]
+    queue_size = 100 if high_end_gpu else 50
     audio_queue = queue.Queue(maxsize=queue_size)
-    audio_segments = []
-    
-    # If output_file is provided, prepare WAV file with buffered I/O
-    wav_file = None
-    if output_file:
-        # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
-        wav_file = wave.open(output_file, "wb")
-        wav_file.setnchannels(1)
-        wav_file.setsampwidth(2)
-        wav_file.setframerate(SAMPLE_RATE)
     
     # Batch processing of tokens for improved throughput
-    batch_size = 32 if HIGH_END_GPU else 16
+    batch_size = 32 if high_end_gpu else 16
     
     # Thread synchronization for proper completion detection
     producer_done_event = threading.Event()
     producer_started_event = threading.Event()
+    stop_event = threading.Event()
+    producer_errors = []
     
     # Convert the synchronous token generator into an async generator with batching
     async def async_token_gen():
         batch = []
-        for token in syn_token_gen:
-            batch.append(token)
-            if len(batch) >= batch_size:
-                for t in batch:
-                    yield t
-                batch = []
-        # Process any remaining tokens in the final batch
-        for t in batch:
-            yield t
+        try:
+            for token in syn_token_gen:
+                if stop_event.is_set():
+                    return
+                batch.append(token)
+                if len(batch) >= batch_size:
+                    for t in batch:
+                        yield t
+                    batch = []
+            # Process any remaining tokens in the final batch
+            for t in batch:
+                yield t
+        finally:
+            syn_token_gen.close()
+
+    def put_chunk(item) -> bool:
+        """Put an item on the audio queue, giving up if the consumer has stopped."""
+        while not stop_event.is_set():
+            try:
+                audio_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
 
     async def async_producer():
         # Track performance with more granular metrics
@@ -472,10 +740,12 @@ def tokens_decoder_sync(syn_token_gen, output_file=None):
             # Signal that producer has started processing
             producer_started_event.set()
             
-            async for audio_chunk in tokens_decoder(async_token_gen()):
+            async for audio_chunk in tokens_decoder(async_token_gen(), codes):
                 # Process each audio chunk from the decoder
                 if audio_chunk:
-                    audio_queue.put(audio_chunk)
+                    if not put_chunk(audio_chunk):
+                        print("Audio consumer stopped - cancelling token processing")
+                        break
                     chunk_count += 1
                     
                     # Log performance periodically
@@ -489,88 +759,132 @@ def tokens_decoder_sync(syn_token_gen, output_file=None):
                         last_log_time = current_time
                         # Reset chunk counter for next interval
                         chunk_count = 0
+        except GenerationError as e:
+            print(f"Error in token processing: {str(e)}")
+            producer_errors.append(e)
         except Exception as e:
             print(f"Error in token processing: {str(e)}")
             import traceback
             traceback.print_exc()
+            producer_errors.append(e)
         finally:
             # Always signal completion, even if there was an error
             print("Producer completed - setting done event")
             producer_done_event.set()
             # Add sentinel to queue to signal end of stream
-            audio_queue.put(None)
+            put_chunk(None)
 
     def run_async():
         """Run the async producer in its own thread"""
-        asyncio.run(async_producer())
+        with priority_context(priority), profile_context(profile), perf_context(monitor):
+            asyncio.run(async_producer())
 
     # Use a separate thread with higher priority for producer
     thread = threading.Thread(target=run_async, name="TokenProcessor")
     thread.daemon = True  # Allow thread to be terminated when main thread exits
     thread.start()
+    producer = memory_monitor.watch_producer(thread, audio_queue)
     
     # Wait for producer to actually start before proceeding
     # This avoids race conditions where we might try to read from an empty queue
     # before the producer has had a chance to add anything
     producer_started_event.wait(timeout=5.0)
     
-    # Optimized I/O approach for all systems
-    # This approach is simpler and more reliable than separate code paths
-    write_buffer = bytearray()
-    buffer_max_size = 1024 * 1024  # 1MB max buffer size (adjustable)
-    
     # Keep track of the last time we checked for completion
     last_check_time = time.time()
     check_interval = 1.0  # Check producer status every second
+    completed = False
     
-    # Process audio chunks until we're done
-    while True:
-        try:
-            # Get the next audio chunk with a short timeout
-            # This allows us to periodically check status and handle other events
-            audio = audio_queue.get(timeout=0.1)
-            
-            # None marker indicates end of stream
-            if audio is None:
-                print("Received end-of-stream marker")
-                break
-            
-            # Store the audio segment for return value
-            audio_segments.append(audio)
-            
-            # Write to file if needed
-            if wav_file:
-                write_buffer.extend(audio)
-                
-                # Flush buffer if it's large enough
-                if len(write_buffer) >= buffer_max_size:
-                    wav_file.writeframes(write_buffer)
-                    write_buffer = bytearray()  # Reset buffer
-        
-        except queue.Empty:
-            # No data available right now
-            current_time = time.time()
-            
-            # Periodically check if producer is done
-            if current_time - last_check_time > check_interval:
-                last_check_time = current_time
+    try:
+        # Process audio chunks until we're done
+        while True:
+            try:
+                # Get the next audio chunk with a short timeout
+                # This allows us to periodically check status and handle other events
+                audio = audio_queue.get(timeout=0.1)
                 
-                # If producer is done and queue is empty, we're finished
-                if producer_done_event.is_set() and audio_queue.empty():
-                    print("Producer done and queue empty - finishing consumer")
+                # None marker indicates end of stream
+                if audio is None:
+                    print("Received end-of-stream marker")
                     break
                 
-                # Flush buffer periodically even if not full
-                if wav_file and len(write_buffer) > 0:
-                    wav_file.writeframes(write_buffer)
-                    write_buffer = bytearray()  # Reset buffer
+                yield audio
+            
+            except queue.Empty:
+                # No data available right now
+                current_time = time.time()
+                
+                # Periodically check if producer is done
+                if current_time - last_check_time > check_interval:
+                    last_check_time = current_time
+                    
+                    # If producer is done and queue is empty, we're finished
+                    if producer_done_event.is_set() and audio_queue.empty():
+                        print("Producer done and queue empty - finishing consumer")
+                        break
+        completed = True
+    finally:
+        # Tell the producer to stop if we're exiting early
+        stop_event.set()
+        if not completed:
+            memory_monitor.release_producer(producer)
     
     # Extra safety check - ensure thread is done
-    if thread.is_alive():
+    if completed and thread.is_alive():
         print("Waiting for token processor thread to complete...")
         thread.join(timeout=10.0)
         if thread.is_alive():
             print("WARNING: Token processor thread did not complete within timeout")
+    memory_monitor.release_producer(producer)
+    
+    # Surface backend failures to the caller instead of ending the stream silently
+    if completed and producer_errors:
+        raise producer_errors[0]
+
+def tokens_decoder_sync(syn_token_gen, output_file=None, tracked=None):
+    """
+    Optimized synchronous wrapper with parallel processing and efficient file I/O.
+    
+    With tracked (a stream from realtime_monitor.track()), the decoded audio counts
+    towards that stream's realtime factor.
+    """
+    monitor = current_perf_monitor()
+    start_time = monitor.start_time if monitor else time.time()
+    audio_segments = []
+    
+    # If output_file is provided, prepare WAV file with buffered I/O
+    wav_file = None
+    if output_file:
+        # Create directory if it doesn't exist
+        os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+        wav_file = wave.open(output_file, "wb")
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(SAMPLE_RATE)
+    
+    # Optimized I/O approach for all systems
+    # This approach is simpler and more reliable than separate code paths
+    write_buffer = bytearray()
+    buffer_max_size = 1024 * 1024  # 1MB max buffer size (adjustable)
+    
+    def decoded():
+        for chunk in tokens_decoder_stream(syn_token_gen):
+            if tracked is not None:
+                tracked.add(chunk)
+            yield chunk
+    
+    for audio in resample_chunks(decoded(), SNAC_SAMPLE_RATE, SAMPLE_RATE):
+        # Store the audio segment for return value
+        audio_segments.append(audio)
+        
+        # Write to file if needed
+        if wav_file:
+            write_buffer.extend(audio)
+            
+            # Flush buffer if it's large enough
+            if len(write_buffer) >= buffer_max_size:
+                wav_file.writeframes(write_buffer)
+                write_buffer = bytearray()  # Reset buffer
     
     # Final flush of any remaining data
     if wav_file and len(write_buffer) > 0:
@@ -586,8 +900,8 @@ def tokens_decoder_sync(syn_token_gen, output_file=None):
     # Calculate and print detailed performance metrics
     if audio_segments:
         total_bytes = sum(len(segment) for segment in audio_segments)
-        duration = total_bytes / (2 * SAMPLE_RATE)  # 2 bytes per sample at 24kHz
-        total_time = time.time() - perf_monitor.start_time
+        duration = total_bytes / (2 * SAMPLE_RATE)  # 2 bytes per sample
+        total_time = time.time() - start_time
         realtime_factor = duration / total_time if total_time > 0 else 0
         
         print(f"Generated {len(audio_segments)} audio segments")
@@ -614,6 +928,8 @@ def stream_audio(audio_buffer):
         audio_float = audio_data.astype(np.float32) / 32767.0
         
         # Play the audio with proper device selection and error handling
+        # (imported here: servers have no use for an audio device, and may not have one)
+        import sounddevice as sd
         sd.play(audio_float, SAMPLE_RATE)
         sd.wait()
     except Exception as e:
@@ -669,47 +985,72 @@ def split_text_into_sentences(text):
     
     return combined_sentences
 
-def generate_speech_from_api(prompt, voice=DEFAULT_VOICE, output_file=None, temperature=TEMPERATURE, 
-                     top_p=TOP_P, max_tokens=MAX_TOKENS, repetition_penalty=None, 
-                     use_batching=True, max_batch_chars=1000):
-    """Generate speech from text using Orpheus model with performance optimizations."""
-    print(f"Starting speech generation for '{prompt[:50]}{'...' if len(prompt) > 50 else ''}'")
-    print(f"Using voice: {voice}, GPU acceleration: {'Yes (High-end)' if HIGH_END_GPU else 'Yes' if torch.cuda.is_available() else 'No'}")
+class StreamingSentenceSplitter:
+    """
+    Incrementally split streamed text (e.g. LLM output tokens) into speakable units.
     
-    # Reset performance monitor
-    global perf_monitor
-    perf_monitor = PerformanceMonitor()
+    Uses the same sentence-end heuristic as split_text_into_sentences: a sentence ends
+    at whitespace following '.', '!' or '?'. Sentences shorter than min_chars are merged
+    with the next one, and runs longer than max_chars without a sentence end are cut at
+    the last clause break so generation can start before the sentence is finished.
+    """
+    def __init__(self, min_chars=20, max_chars=300):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.clear()
     
-    start_time = time.time()
+    def clear(self):
+        """Discard all buffered text."""
+        self._buffer = ""    # Text not yet assigned to a complete sentence
+        self._pending = ""   # Complete sentences held back because they are too short
+        self._scan_pos = 0   # Position in _buffer already scanned for sentence ends
     
-    # For shorter text, use the standard non-batched approach
-    if not use_batching or len(prompt) < max_batch_chars:
-        # Note: we ignore any provided repetition_penalty and always use the hardcoded value
-        # This ensures consistent quality regardless of what might be passed in
-        result = tokens_decoder_sync(
-            generate_tokens_from_api(
-                prompt=prompt, 
-                voice=voice,
-                temperature=temperature,
-                top_p=top_p,
-                max_tokens=max_tokens,
-                repetition_penalty=REPETITION_PENALTY  # Always use hardcoded value
-            ),
-            output_file=output_file
-        )
+    def _add_sentence(self, sentence, units):
+        self._pending = f"{self._pending} {sentence}".strip()
+        if len(self._pending) >= self.min_chars:
+            units.append(self._pending)
+            self._pending = ""
+    
+    def push(self, text):
+        """Add a text fragment and return any units that are now complete."""
+        units = []
+        self._buffer += text
         
-        # Report final performance metrics
-        end_time = time.time()
-        total_time = end_time - start_time
-        print(f"Total speech generation completed in {total_time:.2f} seconds")
+        i = self._scan_pos
+        while i < len(self._buffer):
+            char = self._buffer[i]
+            if (char in (' ', '\n', '\t') and i >= 3 and self._buffer[i-1] in ('.', '!', '?')
+                    and self._buffer[i-2] not in ('.', ' ')):
+                self._add_sentence(self._buffer[:i+1].strip(), units)
+                self._buffer = self._buffer[i+1:]
+                i = 0
+                continue
+            i += 1
+        self._scan_pos = len(self._buffer)
         
-        return result
-    
-    # For longer text, use sentence-based batching
-    print(f"Using sentence-based batching for text with {len(prompt)} characters")
+        # Long run without a sentence end: cut at the last clause break (or word break)
+        while len(self._buffer) > self.max_chars:
+            cut = max(self._buffer.rfind(sep, 0, self.max_chars) for sep in (", ", "; ", ": "))
+            if cut <= 0:
+                cut = self._buffer.rfind(" ", 0, self.max_chars)
+            cut = cut + 1 if cut > 0 else self.max_chars
+            units.append(f"{self._pending} {self._buffer[:cut].strip()}".strip())
+            self._pending = ""
+            self._buffer = self._buffer[cut:]
+            self._scan_pos = len(self._buffer)
+        
+        return units
     
+    def flush(self):
+        """Return all remaining text as a final unit (if any) and reset the splitter."""
+        remaining = f"{self._pending} {self._buffer}".strip()
+        self.clear()
+        return [remaining] if remaining else []
+
+def split_text_into_batches(text, max_batch_chars=1000):
+    """Split text into sentence-aligned batches of at most max_batch_chars characters."""
     # Split the text into sentences
-    sentences = split_text_into_sentences(prompt)
+    sentences = split_text_into_sentences(text)
     print(f"Split text into {len(sentences)} segments")
     
     # Create batches by combining sentences up to max_batch_chars
@@ -732,47 +1073,437 @@ def generate_speech_from_api(prompt, voice=DEFAULT_VOICE, output_file=None, temp
         batches.append(current_batch)
     
     print(f"Created {len(batches)} batches for processing")
+    return batches
+
+def split_first_phrase(text, max_chars=None, min_chars=12) -> Tuple[str, str]:
+    """
+    Split text into its first sentence (or, if that is longer than max_chars, its first
+    clause) and the rest. Returns (text, "") when either piece would be shorter than
+    min_chars, as very short prompts generate poorly.
+    """
+    max_chars = FAST_START_CHARS if max_chars is None else max_chars
+    sentences = split_text_into_sentences(text)
+    if len(sentences) > 1:
+        head, rest = sentences[0], " ".join(sentences[1:])
+    else:
+        head, rest = text.strip(), ""
     
-    # Process each batch and collect audio segments
-    all_audio_segments = []
-    batch_temp_files = []
+    if len(head) > max_chars:
+        # Cut at the last clause boundary that keeps the first piece within max_chars
+        cut = max((head.rfind(mark, min_chars, max_chars) for mark in (", ", "; ", ": ", " - ")), default=-1)
+        if cut != -1:
+            head, rest = head[:cut + 1], (head[cut + 2:] + " " + rest).strip()
     
-    for i, batch in enumerate(batches):
-        print(f"Processing batch {i+1}/{len(batches)} ({len(batch)} characters)")
+    if len(head) < min_chars or len(rest) < min_chars:
+        return text, ""
+    return head, rest
+
+class PrefetchedStream:
+    """
+    Runs a PCM chunk stream on its own thread from the moment it is created and
+    buffers its chunks until they are read, so it makes progress while the caller
+    is still busy with an earlier stream. close() stops it if it is not needed.
+    """
+    def __init__(self, chunks):
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        priority = current_priority()
+        profile = current_profile()
+        monitor = current_perf_monitor()
         
-        # Create a temporary file for this batch if an output file is requested
-        temp_output_file = None
-        if output_file:
-            temp_output_file = f"outputs/temp_batch_{i}_{int(time.time())}.wav"
-            batch_temp_files.append(temp_output_file)
-        
-        # Generate speech for this batch
-        batch_segments = tokens_decoder_sync(
-            generate_tokens_from_api(
-                prompt=batch,
-                voice=voice,
-                temperature=temperature,
-                top_p=top_p,
-                max_tokens=max_tokens,
-                repetition_penalty=REPETITION_PENALTY
-            ),
-            output_file=temp_output_file
-        )
+        def run():
+            with priority_context(priority), profile_context(profile), perf_context(monitor):
+                try:
+                    for chunk in chunks:
+                        if self._stop.is_set():
+                            break
+                        self._queue.put(chunk)
+                    self._queue.put(None)
+                except Exception as e:
+                    self._queue.put(e)
+                finally:
+                    chunks.close()
         
-        # Add to our collection
-        all_audio_segments.extend(batch_segments)
+        self._thread = threading.Thread(target=run, name="PrefetchedStream", daemon=True)
+        self._thread.start()
+    
+    def __iter__(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self.close()
+    
+    def close(self):
+        self._stop.set()
+
+def crossfade_chunks(segments, crossfade_ms=50) -> Generator[bytes, None, None]:
+    """
+    Join a sequence of PCM chunk streams into one stream, crossfading each boundary.
+    
+    Only the last crossfade window of each segment is held back, so audio keeps
+    flowing while later segments are still being generated.
+    """
+    crossfade_samples = int(SNAC_SAMPLE_RATE * crossfade_ms / 1000)
+    fade_out = np.linspace(1.0, 0.0, crossfade_samples)
+    fade_in = np.linspace(0.0, 1.0, crossfade_samples)
+    
+    # Held-back end of the audio so far, waiting to be blended with the next segment
+    tail = None
+    # Audio shorter than the crossfade window, prepended to the next segment as-is
+    carry = np.array([], dtype=np.int16)
     
-    # If an output file was requested, stitch together the temporary files
-    if output_file and batch_temp_files:
-        # Stitch together WAV files
-        stitch_wav_files(batch_temp_files, output_file)
+    for i, segment in enumerate(segments):
+        pending = carry
         
-        # Clean up temporary files
-        for temp_file in batch_temp_files:
+        for chunk in segment:
+            pending = np.concatenate([pending, np.frombuffer(chunk, dtype=np.int16)])
+            
+            # Blend the previous tail with the start of this segment once enough audio arrived
+            if tail is not None and len(pending) >= crossfade_samples:
+                crossfade_region = (tail * fade_out + pending[:crossfade_samples] * fade_in).astype(np.int16)
+                pending = np.concatenate([crossfade_region, pending[crossfade_samples:]])
+                tail = None
+            
+            # Emit everything except the window that may be blended with the next segment
+            if tail is None and len(pending) > crossfade_samples:
+                yield pending[:-crossfade_samples].tobytes()
+                pending = pending[-crossfade_samples:]
+        
+        if tail is not None:
+            # Segment too short for crossfade, just append
+            print(f"Segment {i} too short for crossfade, concatenating directly")
+            pending = np.concatenate([tail, pending])
+            tail = None
+        
+        if len(pending) >= crossfade_samples:
+            if len(pending) > crossfade_samples:
+                yield pending[:-crossfade_samples].tobytes()
+            tail = pending[-crossfade_samples:]
+            carry = np.array([], dtype=np.int16)
+        else:
+            carry = pending
+    
+    if tail is not None:
+        yield tail.tobytes()
+    elif len(carry) > 0:
+        yield carry.tobytes()
+
+def _batch_audio_streams(batches, voice, temperature, top_p, max_tokens, config=None, recorder=None, key=(0,),
+                         checkpoint=False):
+    """Lazily start generation for each batch as the previous one finishes."""
+    for i, batch in enumerate(batches):
+        print(f"Processing batch {i+1}/{len(batches)} ({len(batch)} characters)")
+        yield _phrase_audio(batch, voice, temperature, top_p, max_tokens, config, recorder, key + (i,), checkpoint)
+
+def _phrase_audio(text, voice, temperature, top_p, max_tokens, config, recorder=None, key=(0,), checkpoint=False):
+    """
+    PCM chunk stream for one generation, recording its codes under key. With checkpoint,
+    a stored segment for the same text and parameters is replayed instead of generated,
+    and a newly generated segment is stored once it completes.
+    """
+    codes = recorder.codes(key) if recorder else None
+    if checkpoint:
+        segment = checkpoint_store.segment_key(
+            text, voice,
+            temperature=config.temperature if temperature is None else temperature,
+            top_p=config.top_p if top_p is None else top_p,
+            max_tokens=config.max_tokens if max_tokens is None else max_tokens,
+            repetition_penalty=REPETITION_PENALTY,
+            model=config.model_name,
+        )
+        stored = checkpoint_store.load(segment)
+        if stored is not None:
+            pcm, stored_codes = stored
+            print(f"Checkpoint: reusing {len(pcm) / (2 * SNAC_SAMPLE_RATE):.2f}s of audio for '{text[:40]}{'...' if len(text) > 40 else ''}'")
+            if codes is not None:
+                codes.extend(stored_codes)
+            return checkpoint_store.replay(pcm)
+        codes = [] if codes is None else codes
+    audio = tokens_decoder_stream(
+        generate_tokens_from_api(
+            prompt=text,
+            voice=voice,
+            temperature=temperature,
+            top_p=top_p,
+            max_tokens=max_tokens,
+            repetition_penalty=REPETITION_PENALTY,
+            config=config
+        ),
+        codes=codes
+    )
+    return checkpoint_store.checkpointed(segment, audio, codes) if checkpoint else audio
+
+def _spoken_chunks(prompt, voice, temperature, top_p, max_tokens, use_batching, max_batch_chars,
+                   crossfade_ms, config, fast_start=None, recorder=None, key=(0,),
+                   checkpoint=False) -> Generator[bytes, None, None]:
+    """
+    PCM chunks for text without pauses, batching long texts (see stream_speech_from_api).
+    With a recorder, each generation's codes are recorded under key plus its position;
+    with checkpoint, each generation is checkpointed (see _phrase_audio).
+    """
+    fast_start = FAST_START if fast_start is None else fast_start
+    if fast_start and (not use_batching or len(prompt) < max_batch_chars):
+        head, rest = split_first_phrase(prompt)
+        if rest:
+            print(f"Fast start: generating the first {len(head)} of {len(prompt)} characters on their own")
+            head_audio = _phrase_audio(head, voice, temperature, top_p, max_tokens, config, recorder, key + (0,), checkpoint)
+            rest_audio = None
+            
+            def start_rest():
+                nonlocal rest_audio
+                if rest_audio is None:
+                    rest_audio = PrefetchedStream(_phrase_audio(rest, voice, temperature, top_p, max_tokens, config,
+                                                                recorder, key + (1,), checkpoint))
+                return rest_audio
+            
+            def head_chunks():
+                # The rest is requested once the head's first chunk is out, and then generates
+                # concurrently with it. Requesting it earlier would let it take the LLM slot
+                # first on a single-slot server (or with ORPHEUS_LLM_CONCURRENCY=1)
+                try:
+                    for chunk in head_audio:
+                        start_rest()
+                        yield chunk
+                finally:
+                    head_audio.close()
+            
+            def rest_chunks():
+                yield from start_rest()
+            
             try:
-                os.remove(temp_file)
-            except Exception as e:
-                print(f"Warning: Could not remove temporary file {temp_file}: {e}")
+                yield from crossfade_chunks([head_chunks(), rest_chunks()], crossfade_ms=crossfade_ms)
+            finally:
+                if rest_audio is not None:
+                    rest_audio.close()
+            return
+    
+    if not use_batching or len(prompt) < max_batch_chars:
+        yield from _phrase_audio(prompt, voice, temperature, top_p, max_tokens, config, recorder, key + (0,), checkpoint)
+        return
+    
+    print(f"Using sentence-based batching for text with {len(prompt)} characters")
+    batches = split_text_into_batches(prompt, max_batch_chars)
+    yield from crossfade_chunks(
+        _batch_audio_streams(batches, voice, temperature, top_p, max_tokens, config, recorder, key, checkpoint),
+        crossfade_ms=crossfade_ms
+    )
+
+def silence(seconds) -> bytes:
+    """Exactly seconds of 16-bit mono PCM silence, rounded to the nearest sample."""
+    return bytes(2 * round(seconds * SNAC_SAMPLE_RATE))
+
+def _speech_chunks(prompt, voice, temperature, top_p, max_tokens, use_batching, max_batch_chars,
+                   crossfade_ms, config, fast_start=None, recorder=None, trim_silence=False,
+                   checkpoint=False) -> Generator[bytes, None, None]:
+    """
+    PCM chunks for a whole prompt. Pause markup is rendered as silence between the
+    spoken segments, which are generated up to PAUSE_PREFETCH segments ahead. With
+    trim_silence, each spoken segment's leading and trailing silence is trimmed, so
+    the pauses keep their exact length.
+    """
+    segments = split_pauses(prompt) if PAUSE_MARKUP else [prompt]
+    if not segments:
+        # Only markup without speech or pauses: nothing to synthesize
+        return
+    if len(segments) == 1 and isinstance(segments[0], str):
+        audio = _spoken_chunks(segments[0], voice, temperature, top_p, max_tokens, use_batching,
+                               max_batch_chars, crossfade_ms, config, fast_start, recorder, checkpoint=checkpoint)
+        yield from trim_chunks(audio, SNAC_SAMPLE_RATE) if trim_silence else audio
+        return
+    
+    pause_stats.record(segments)
+    spoken = [segment for segment in segments if isinstance(segment, str)]
+    print(f"Pause markup: {len(spoken)} spoken segments, {len(segments) - len(spoken)} pauses")
+    
+    # Position of each spoken segment among all segments, which orders its recorded codes
+    positions = [position for position, segment in enumerate(segments) if isinstance(segment, str)]
+    
+    def spoken_audio(index):
+        audio = _spoken_chunks(spoken[index], voice, temperature, top_p, max_tokens, use_batching,
+                               max_batch_chars, crossfade_ms, config, fast_start if index == 0 else False,
+                               recorder, (positions[index],), checkpoint)
+        return trim_chunks(audio, SNAC_SAMPLE_RATE) if trim_silence else audio
+    
+    # The first segment is generated by the caller; the next ones start on their own threads
+    streams = {}
+    next_index = 0
+    try:
+        for position, segment in enumerate(segments):
+            if not isinstance(segment, str):
+                pause = silence(segment)
+                if recorder:
+                    recorder.silence((position,), len(pause) // 2)
+                yield pause
+                continue
+            index = next_index
+            next_index += 1
+            for ahead in range(index + 1, min(index + 1 + PAUSE_PREFETCH, len(spoken))):
+                if ahead not in streams:
+                    streams[ahead] = PrefetchedStream(spoken_audio(ahead))
+            yield from streams.pop(index) if index in streams else spoken_audio(index)
+    finally:
+        for stream in streams.values():
+            stream.close()
+
+def stream_speech_from_api(prompt, voice=DEFAULT_VOICE, temperature=None, top_p=None, 
+                           max_tokens=None, use_batching=True, max_batch_chars=1000, 
+                           crossfade_ms=50, config=None, fast_start=None, archive=None,
+                           sample_rate=None, trim_silence=None, checkpoint=None,
+                           profile=None) -> Generator[bytes, None, None]:
+    """
+    Generate speech and yield 16-bit mono PCM chunks as soon as they are decoded.
+    
+    Long texts are batched exactly like generate_speech_from_api, with each batch
+    boundary crossfaded on the fly. Pause markup (break tags, ellipses, paragraph
+    gaps) becomes exact-length silence instead of prompt text. With fast_start
+    (default ORPHEUS_FAST_START), a shorter text's first sentence or clause is
+    generated on its own while the rest is generated concurrently. The stream
+    counts towards the in-flight streams and realtime factor reported by /capacity.
+    
+    With trim_silence (default ORPHEUS_TRIM_SILENCE), leading and trailing silence
+    is trimmed as it streams, holding back at most ORPHEUS_TRIM_LOOKAHEAD_MS of quiet
+    audio. The audio is resampled to sample_rate (default ORPHEUS_SAMPLE_RATE) as it streams.
+    With checkpoint (default ORPHEUS_CHECKPOINTS), every completed generation is stored,
+    and a re-run of the same text resumes at the first segment that is not stored yet.
+    With archive (a file name), the audio codes are written to that token archive
+    once the whole stream has been generated. With profile (a request ID), the
+    generation is profiled and the profile written under that name (see profiling.py).
+    """
+    with profiler.capture(profile), memory_monitor.track(), perf_context(PerformanceMonitor()):
+        yield from _stream_speech(prompt, voice, temperature, top_p, max_tokens, use_batching, max_batch_chars,
+                                  crossfade_ms, config, fast_start, archive, sample_rate, trim_silence, checkpoint)
+
+def _stream_speech(prompt, voice, temperature, top_p, max_tokens, use_batching, max_batch_chars,
+                   crossfade_ms, config, fast_start, archive, sample_rate, trim_silence, checkpoint):
+    # Every batch of this request uses the same configuration snapshot
+    config = config or get_runtime_config()
+    recorder = TokenRecorder() if archive else None
+    trim_silence = TRIM_SILENCE if trim_silence is None else trim_silence
+    checkpoint = CHECKPOINTS if checkpoint is None else checkpoint
+    sample_rate = sample_rate or SAMPLE_RATE
+    resampler = StreamingResampler(SNAC_SAMPLE_RATE, sample_rate) if sample_rate != SNAC_SAMPLE_RATE else None
+    audio_bytes = 0
+    
+    with realtime_monitor.track() as tracked:
+        for chunk in _speech_chunks(prompt, voice, temperature, top_p, max_tokens, use_batching,
+                                    max_batch_chars, crossfade_ms, config, fast_start, recorder, trim_silence,
+                                    checkpoint):
+            tracked.add(chunk)
+            audio_bytes += len(chunk)
+            if resampler:
+                chunk = resampler.process(chunk)
+            if chunk:
+                yield chunk
+    if resampler:
+        tail = resampler.flush()
+        if tail:
+            yield tail
+    
+    if recorder:
+        data = encode_archive(
+            recorder.parts(),
+            sample_rate=SNAC_SAMPLE_RATE,
+            crossfade_ms=crossfade_ms,
+            trim_silence=trim_silence,
+            voice=voice,
+            text=prompt,
+            temperature=config.temperature if temperature is None else temperature,
+            top_p=config.top_p if top_p is None else top_p,
+            repetition_penalty=REPETITION_PENALTY,
+            model=config.model_name,
+            backend=config.backend,
+        )
+        seconds = audio_bytes / (2 * SNAC_SAMPLE_RATE)
+        archive_store.save(archive, data, seconds)
+        print(f"Saved token archive {archive} ({len(data)} bytes for {seconds:.2f}s of audio)")
+
+def generate_speech_from_api(prompt, voice=DEFAULT_VOICE, output_file=None, temperature=None, 
+                     top_p=None, max_tokens=None, repetition_penalty=None, 
+                     use_batching=True, max_batch_chars=1000, config=None, fast_start=None,
+                     trim_silence=None, checkpoint=None, profile=None):
+    """
+    Generate speech from text using Orpheus model with performance optimizations.
+    
+    Like stream_speech_from_api, the generation counts towards /capacity, its memory
+    peaks are tracked and, with profile (a request ID), it is profiled.
+    """
+    with profiler.capture(profile), memory_monitor.track(), perf_context(PerformanceMonitor()):
+        return _generate_speech(prompt, voice, output_file, temperature, top_p, max_tokens, use_batching,
+                                max_batch_chars, config, fast_start, trim_silence, checkpoint)
+
+def _generate_speech(prompt, voice, output_file, temperature, top_p, max_tokens, use_batching,
+                     max_batch_chars, config, fast_start, trim_silence, checkpoint):
+    config = config or get_runtime_config()
+    fast_start = FAST_START if fast_start is None else fast_start
+    trim_silence = TRIM_SILENCE if trim_silence is None else trim_silence
+    checkpoint = CHECKPOINTS if checkpoint is None else checkpoint
+    print(f"Starting speech generation for '{prompt[:50]}{'...' if len(prompt) > 50 else ''}'")
+    hardware = hardware_info()
+    print(f"Using voice: {voice}, GPU acceleration: {'Yes (High-end)' if hardware['high_end_gpu'] else 'Yes' if hardware['device'] == 'cuda' else 'No'}")
+    
+    start_time = time.time()
+    
+    # For shorter text, use the standard non-batched approach
+    # (pause markup, the fast start, silence trimming and checkpoints go through the stream path)
+    if PAUSE_MARKUP:
+        segments = split_pauses(prompt)
+        if not segments:
+            print("Nothing to synthesize: the text is only markup")
+            return []
+        paused = len(segments) > 1 or not isinstance(segments[0], str)
+        if not paused:
+            prompt = segments[0]
+    else:
+        paused = False
+    if ((not use_batching or len(prompt) < max_batch_chars) and not paused and not trim_silence
+            and not checkpoint and not (fast_start and split_first_phrase(prompt)[1])):
+        # Note: we ignore any provided repetition_penalty and always use the hardcoded value
+        # This ensures consistent quality regardless of what might be passed in
+        with realtime_monitor.track() as tracked:
+            result = tokens_decoder_sync(
+                generate_tokens_from_api(
+                    prompt=prompt, 
+                    voice=voice,
+                    temperature=temperature,
+                    top_p=top_p,
+                    max_tokens=max_tokens,
+                    repetition_penalty=REPETITION_PENALTY,  # Always use hardcoded value
+                    config=config
+                ),
+                output_file=output_file,
+                tracked=tracked
+            )
+        
+        # Report final performance metrics
+        end_time = time.time()
+        total_time = end_time - start_time
+        print(f"Total speech generation completed in {total_time:.2f} seconds")
+        
+        return result
+    
+    # For longer text (and pauses, the fast start, trimming or checkpoints), use the stream path with in-memory crossfade stitching
+    # (without stream_speech_from_api's wrappers, which this request is already inside)
+    all_audio_segments = list(_stream_speech(
+        prompt, voice, temperature, top_p, max_tokens, use_batching, max_batch_chars,
+        crossfade_ms=50, config=config, fast_start=fast_start, archive=None, sample_rate=None,
+        trim_silence=trim_silence, checkpoint=checkpoint
+    ))
+    
+    # If an output file was requested, write the stitched audio in one go
+    if output_file:
+        os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+        with wave.open(output_file, "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(SAMPLE_RATE)
+            wav_file.writeframes(b"".join(all_audio_segments))
+        print(f"Successfully stitched audio to {output_file} with crossfading")
     
     # Report final performance metrics
     end_time = time.time()
@@ -781,7 +1512,7 @@ def generate_speech_from_api(prompt, voice=DEFAULT_VOICE, output_file=None, temp
     # Calculate combined duration
     if all_audio_segments:
         total_bytes = sum(len(segment) for segment in all_audio_segments)
-        duration = total_bytes / (2 * SAMPLE_RATE)  # 2 bytes per sample at 24kHz
+        duration = total_bytes / (2 * SAMPLE_RATE)  # 2 bytes per sample
         print(f"Generated {len(all_audio_segments)} audio segments")
         print(f"Generated {duration:.2f} seconds of audio in {total_time:.2f} seconds")
         print(f"Realtime factor: {duration/total_time:.2f}x")
@@ -803,12 +1534,8 @@ def stitch_wav_files(input_files, output_file, crossfade_ms=50):
         shutil.copy(input_files[0], output_file)
         return
     
-    # Convert crossfade_ms to samples
-    crossfade_samples = int(SAMPLE_RATE * crossfade_ms / 1000)
-    print(f"Using {crossfade_samples} samples for crossfade at {SAMPLE_RATE}Hz")
-    
-    # Build the final audio in memory with crossfades
-    final_audio = np.array([], dtype=np.int16)
+    # Read each file as a single-chunk segment
+    segments = []
     first_params = None
     
     for i, input_file in enumerate(input_files):
@@ -819,31 +1546,7 @@ def stitch_wav_files(input_files, output_file, crossfade_ms=50):
                 elif wav.getparams() != first_params:
                     print(f"Warning: WAV file {input_file} has different parameters")
                     
-                frames = wav.readframes(wav.getnframes())
-                audio = np.frombuffer(frames, dtype=np.int16)
-                
-                if i == 0:
-                    # First segment - use as is
-                    final_audio = audio
-                else:
-                    # Apply crossfade with previous segment
-                    if len(final_audio) >= crossfade_samples and len(audio) >= crossfade_samples:
-                        # Create crossfade weights
-                        fade_out = np.linspace(1.0, 0.0, crossfade_samples)
-                        fade_in = np.linspace(0.0, 1.0, crossfade_samples)
-                        
-                        # Apply crossfade
-                        crossfade_region = (final_audio[-crossfade_samples:] * fade_out + 
-                                           audio[:crossfade_samples] * fade_in).astype(np.int16)
-                        
-                        # Combine: original without last crossfade_samples + crossfade + new without first crossfade_samples
-                        final_audio = np.concatenate([final_audio[:-crossfade_samples], 
-                                                    crossfade_region, 
-                                                    audio[crossfade_samples:]])
-                    else:
-                        # One segment too short for crossfade, just append
-                        print(f"Segment {i} too short for crossfade, concatenating directly")
-                        final_audio = np.concatenate([final_audio, audio])
+                segments.append([wav.readframes(wav.getnframes())])
         except Exception as e:
             print(f"Error processing file {input_file}: {e}")
             if i == 0:
@@ -856,7 +1559,7 @@ def stitch_wav_files(input_files, output_file, crossfade_ms=50):
                 raise ValueError("No valid WAV files were processed")
                 
             output_wav.setparams(first_params)
-            output_wav.writeframes(final_audio.tobytes())
+            output_wav.writeframes(b"".join(crossfade_chunks(segments, crossfade_ms)))
         
         print(f"Successfully stitched audio to {output_file} with crossfading")
     except Exception as e:
@@ -875,8 +1578,11 @@ def list_available_voices():
     print("<laugh>, <chuckle>, <sigh>, <cough>, <sniffle>, <groan>, <yawn>, <gasp>")
 
 def main():
+    import argparse
+    
     # Parse command line arguments
-    parser = argparse.ArgumentParser(description="Orpheus Text-to-Speech using Orpheus-FASTAPI")
+    parser = argparse.ArgumentParser(description="Orpheus Text-to-Speech using Orpheus-FASTAPI",
+                                     epilog="To render many texts in one run, use: python -m tts_engine.batch MANIFEST OUTPUT_DIR")
     parser.add_argument("--text", type=str, help="Text to convert to speech")
     parser.add_argument("--voice", type=str, default=DEFAULT_VOICE, help=f"Voice to use (default: {DEFAULT_VOICE})")
     parser.add_argument("--output", type=str, help="Output WAV file path")
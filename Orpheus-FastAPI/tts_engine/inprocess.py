@@ -0,0 +1,210 @@
+import os
+import time
+import queue
+import threading
+import importlib.util
+from typing import Any, Dict, Generator
+
+# llama-cpp-python runs the GGUF model for ORPHEUS_BACKEND=inprocess. It is
+# optional and imported by the engine thread when it loads the model.
+LLAMA_CPP_AVAILABLE = importlib.util.find_spec("llama_cpp") is not None
+
+class _Request:
+    """One generation (or, with prompt None, a model load) waiting for the engine thread."""
+    __slots__ = ("model_path", "prompt", "max_tokens", "temperature", "top_p", "repetition_penalty", "tokens", "cancelled")
+
+    def __init__(self, model_path, prompt=None, max_tokens=0, temperature=0.6, top_p=0.9,
+                 repetition_penalty=1.1, queue_size=1):
+        self.model_path = model_path
+        self.prompt = prompt
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.top_p = top_p
+        self.repetition_penalty = repetition_penalty
+        self.tokens = queue.Queue(maxsize=queue_size)
+        self.cancelled = threading.Event()
+
+class InProcessEngine:
+    """
+    Orpheus GGUF model run inside this process with llama-cpp-python.
+
+    One dedicated thread owns the model and serves requests in arrival order. It
+    hands each request's token IDs over a bounded queue, so a slow consumer pauses
+    generation instead of buffering it, and tokens never cross a socket or get
+    detokenized. llama-cpp-python reuses the KV cache for the prefix a prompt
+    shares with the previous one, like llama.cpp's cache_prompt.
+    """
+    def __init__(self, queue_size: int = 256, gpu_layers: int = -1, context: int = 8192):
+        self.queue_size = queue_size
+        self.gpu_layers = gpu_layers
+        self.context = context
+        self._requests = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._llm = None
+        self.model_path = None
+        self.load_seconds = None
+        self.load_error = None
+        self._loading = None
+        self._failed_path = None
+        self.generations = 0
+        self.tokens = 0
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="InProcessLLM", daemon=True)
+                self._thread.start()
+
+    def preload(self, model_path: str) -> None:
+        """Start loading model_path on the engine thread without waiting for it."""
+        if model_path in (self.model_path, self._loading):
+            return
+        self._loading = model_path
+        self._start()
+        self._requests.put(_Request(model_path))
+
+    def generate(self, prompt: str, model_path: str, max_tokens: int, temperature: float, top_p: float,
+                 repetition_penalty: float) -> Generator[int, None, None]:
+        """
+        Yield the vocabulary IDs generated for prompt, ending at the end-of-sequence token
+        or after max_tokens. Closing the generator stops the generation.
+        """
+        request = _Request(model_path, prompt, max_tokens, temperature, top_p, repetition_penalty, self.queue_size)
+        self._start()
+        self._requests.put(request)
+        try:
+            while True:
+                item = request.tokens.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            request.cancelled.set()
+
+    def _run(self) -> None:
+        while True:
+            request = self._requests.get()
+            if request.cancelled.is_set():
+                continue
+            try:
+                llm = self._model(request.model_path)
+                if request.prompt is not None:
+                    self._generate(llm, request)
+                item = None
+            except Exception as e:
+                print(f"In-process engine error: {e}")
+                item = e
+            if request.prompt is not None:
+                self._put(request, item)
+
+    def _model(self, model_path: str):
+        """The loaded model, loading model_path first if it is not the current one."""
+        if self._llm is not None and self.model_path == model_path:
+            return self._llm
+        try:
+            return self._load(model_path)
+        except Exception as e:
+            self.load_error, self._failed_path = str(e), model_path
+            raise
+        finally:
+            self._loading = None
+
+    def _load(self, model_path: str):
+        if not LLAMA_CPP_AVAILABLE:
+            raise RuntimeError("llama-cpp-python is not installed (pip install llama-cpp-python)")
+        if not os.path.isfile(model_path):
+            raise RuntimeError(f"Model file not found: {model_path}")
+        from llama_cpp import Llama
+        print(f"Loading {model_path} in-process ({'all' if self.gpu_layers < 0 else self.gpu_layers} GPU layers, {self.context} context)")
+        start = time.time()
+        self._llm = None
+        self.model_path = None
+        try:
+            llm = Llama(model_path=model_path, n_gpu_layers=self.gpu_layers, n_ctx=self.context, verbose=False)
+        except Exception as e:
+            raise RuntimeError(f"Could not load {model_path}: {e}")
+        self.load_seconds = round(time.time() - start, 3)
+        self.load_error = self._failed_path = None
+        self._llm, self.model_path = llm, model_path
+        print(f"Loaded {model_path} in {self.load_seconds:.2f}s")
+        return llm
+
+    def _generate(self, llm, request: _Request) -> None:
+        prompt_tokens = llm.tokenize(request.prompt.encode("utf-8"), add_bos=True, special=True)
+        max_tokens = min(request.max_tokens, llm.n_ctx() - len(prompt_tokens))
+        eos = llm.token_eos()
+        self.generations += 1
+        count = 0
+        for token in llm.generate(prompt_tokens, top_p=request.top_p, temp=request.temperature,
+                                  repeat_penalty=request.repetition_penalty, reset=True):
+            if token == eos or count >= max_tokens:
+                break
+            if not self._put(request, token):
+                break
+            count += 1
+        self.tokens += count
+
+    def _put(self, request: _Request, item) -> bool:
+        """Hand item to the consumer, giving up if it has stopped reading."""
+        while not request.cancelled.is_set():
+            try:
+                request.tokens.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def status(self, model_path: str):
+        """(ready, detail) for model_path, starting to load it if it is not loaded."""
+        if self.model_path == model_path:
+            return True, f"{model_path} loaded in-process"
+        if self._failed_path == model_path:
+            return False, self.load_error
+        self.preload(model_path)
+        return False, f"loading {model_path}"
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model_path": self.model_path,
+            "load_seconds": self.load_seconds,
+            "load_error": self.load_error,
+            "waiting": self._requests.qsize(),
+            "generations": self.generations,
+            "tokens": self.tokens,
+        }
+
+def model_path(model_name: str) -> str:
+    """Path of the GGUF file for ORPHEUS_MODEL_NAME: a path, or a file name in ORPHEUS_MODEL_DIR."""
+    if os.path.isfile(model_name):
+        return model_name
+    return os.path.join(MODEL_DIR, model_name)
+
+# Directory holding the GGUF models (the same models/ directory docker compose mounts)
+MODEL_DIR = os.environ.get("ORPHEUS_MODEL_DIR", "models")
+
+# Model layers offloaded to the GPU, -1 for all of them
+try:
+    LLM_GPU_LAYERS = int(os.environ.get("ORPHEUS_LLM_GPU_LAYERS", "-1"))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_LLM_GPU_LAYERS value, using -1 (all layers) as fallback")
+    LLM_GPU_LAYERS = -1
+
+# Context size; prompt plus generated tokens must fit, so it also caps max_tokens
+try:
+    LLM_CONTEXT = int(os.environ.get("ORPHEUS_LLM_CONTEXT", "8192"))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_LLM_CONTEXT value, using 8192 as fallback")
+    LLM_CONTEXT = 8192
+
+# Generated tokens buffered ahead of the consumer before generation pauses
+try:
+    LLM_TOKEN_QUEUE = max(1, int(os.environ.get("ORPHEUS_LLM_TOKEN_QUEUE", "256")))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_LLM_TOKEN_QUEUE value, using 256 as fallback")
+    LLM_TOKEN_QUEUE = 256
+
+# Shared engine; the model is loaded on first use (or by the startup warm-up)
+inprocess_engine = InProcessEngine(LLM_TOKEN_QUEUE, LLM_GPU_LAYERS, LLM_CONTEXT)
@@ -0,0 +1,380 @@
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+import zipfile
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional
+
+from .inference import stream_speech_from_api, GenerationError, SAMPLE_RATE, DEFAULT_VOICE, IS_RELOADER
+from .executor import generation_executor, QueueFullError, QueueTimeoutError
+from .output_store import pcm_to_wav
+from .scheduler import BULK, normalize_priority
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    priority TEXT NOT NULL,
+    item_count INTEGER NOT NULL,
+    cancelled INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS items (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    voice TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    claimed_by INTEGER,
+    started_at REAL,
+    finished_at REAL,
+    audio_seconds REAL,
+    error TEXT,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS items_status ON items (status);
+"""
+
+# Item states: pending -> running -> done | failed, or pending -> cancelled
+ITEM_STATES = ("pending", "running", "done", "failed", "cancelled")
+
+# Job IDs are uuid4 hex strings; they come from URLs and name directories, so nothing else is accepted
+_JOB_ID = re.compile(r"^[0-9a-f]{32}$")
+
+class JobQueue:
+    """
+    Persistent queue of bulk synthesis jobs.
+
+    A job is a list of (text, voice) items. Items are stored in SQLite and processed
+    one at a time by a pool of job worker threads, which submit them to the shared
+    generation executor (bulk priority by default) and write each result to
+    {directory}/{job_id}/{index}.wav. Progress survives restarts at item granularity:
+    items that were running in a process that no longer exists go back to pending.
+    Items are checkpointed per segment, so a retried or resumed item only generates
+    the batches its earlier attempt did not finish. The database may be shared by
+    several server processes.
+    """
+    def __init__(self, directory: str, workers: int, max_attempts: int = 3):
+        self.directory = directory
+        self.db_path = os.path.join(directory, "jobs.db")
+        self.workers = max(0, workers)
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._threads = []
+        self._started = False
+
+    def start(self) -> None:
+        """
+        Create the database, resume interrupted items and start the job workers.
+
+        Called by the server at startup rather than on import, so other processes
+        that import the package (such as decode services) never run jobs.
+        """
+        if self._started:
+            return
+        self._started = True
+        os.makedirs(self.directory, exist_ok=True)
+        self._conn().executescript(_SCHEMA)
+        resumed = self._recover()
+        if resumed and not IS_RELOADER:
+            print(f"Resuming {resumed} interrupted job item(s)")
+
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"JobWorker-{i}")
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _conn(self) -> sqlite3.Connection:
+        """Per-thread connection in autocommit mode (transactions are explicit)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _recover(self) -> int:
+        """Return items claimed by processes that no longer exist to the pending state."""
+        import psutil
+
+        conn = self._conn()
+        pids = [row[0] for row in conn.execute("SELECT DISTINCT claimed_by FROM items WHERE status = 'running'")]
+        dead = [pid for pid in pids if pid is None or pid == os.getpid() or not psutil.pid_exists(pid)]
+        resumed = 0
+        for pid in dead:
+            cursor = conn.execute(
+                "UPDATE items SET status = 'pending', claimed_by = NULL, attempts = MAX(attempts - 1, 0) "
+                "WHERE status = 'running' AND claimed_by IS ?",
+                (pid,)
+            )
+            resumed += cursor.rowcount
+        return resumed
+
+    @staticmethod
+    def valid_id(job_id: str) -> bool:
+        """Whether job_id has the form of the IDs this queue generates."""
+        return bool(_JOB_ID.match(job_id))
+
+    def item_dir(self, job_id: str) -> str:
+        """Directory of a job's audio files; raises ValueError for anything but a job ID."""
+        if not self.valid_id(job_id):
+            raise ValueError(f"Invalid job ID: {job_id!r}")
+        root = os.path.realpath(self.directory)
+        path = os.path.realpath(os.path.join(root, job_id))
+        if os.path.dirname(path) != root:
+            raise ValueError(f"Invalid job ID: {job_id!r}")
+        return path
+
+    def item_path(self, job_id: str, index: int) -> str:
+        return os.path.join(self.item_dir(job_id), f"{index:04d}.wav")
+
+    def create_job(self, items: List[Dict[str, str]], voice: str = DEFAULT_VOICE, priority: Optional[str] = BULK) -> Dict[str, Any]:
+        """Persist a new job and wake the workers. Each item is {"text": ..., "voice": optional}."""
+        priority = normalize_priority(priority)
+        job_id = uuid.uuid4().hex
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO jobs (id, created_at, priority, item_count) VALUES (?, ?, ?, ?)",
+                (job_id, time.time(), priority, len(items))
+            )
+            conn.executemany(
+                "INSERT INTO items (job_id, idx, text, voice) VALUES (?, ?, ?, ?)",
+                [(job_id, i, item["text"], item.get("voice") or voice) for i, item in enumerate(items)]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._wakeup.set()
+        return self.get_job(job_id)
+
+    def get_job(self, job_id: str, include_items: bool = False) -> Optional[Dict[str, Any]]:
+        """Status, progress and throughput of a job (None if it does not exist)."""
+        if not self.valid_id(job_id):
+            return None
+        conn = self._conn()
+        job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if job is None:
+            return None
+        counts = {state: 0 for state in ITEM_STATES}
+        for row in conn.execute("SELECT status, COUNT(*) FROM items WHERE job_id = ? GROUP BY status", (job_id,)):
+            counts[row[0]] = row[1]
+        totals = conn.execute(
+            "SELECT MIN(started_at), MAX(finished_at), COALESCE(SUM(audio_seconds), 0) FROM items WHERE job_id = ?",
+            (job_id,)
+        ).fetchone()
+        started_at, finished_at, audio_seconds = totals
+
+        unfinished = counts["pending"] + counts["running"]
+        if job["cancelled"]:
+            status = "cancelled"
+        elif unfinished == 0:
+            status = "failed" if counts["failed"] == job["item_count"] else "completed"
+        elif started_at is None:
+            status = "queued"
+        else:
+            status = "running"
+
+        # Wall time runs from the first item starting until the last one finished (or now)
+        wall_seconds = 0.0
+        if started_at is not None:
+            end = finished_at if unfinished == 0 and finished_at else time.time()
+            wall_seconds = max(0.0, end - started_at)
+
+        result = {
+            "id": job_id,
+            "status": status,
+            "priority": job["priority"],
+            "created_at": job["created_at"],
+            "items": job["item_count"],
+            "progress": {state: counts[state] for state in ("pending", "running", "done", "failed", "cancelled")},
+            "audio_seconds": round(audio_seconds, 2),
+            "wall_seconds": round(wall_seconds, 2),
+            "audio_minutes_per_wall_minute": round(audio_seconds / wall_seconds, 2) if wall_seconds else 0.0,
+        }
+        if include_items:
+            result["item_details"] = [
+                {
+                    "index": row["idx"],
+                    "text": row["text"],
+                    "voice": row["voice"],
+                    "status": row["status"],
+                    "attempts": row["attempts"],
+                    "audio_seconds": row["audio_seconds"],
+                    "error": row["error"],
+                    "url": f"/v1/jobs/{job_id}/items/{row['idx']}" if row["status"] == "done" else None,
+                }
+                for row in conn.execute("SELECT * FROM items WHERE job_id = ? ORDER BY idx", (job_id,))
+            ]
+        return result
+
+    def list_jobs(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent jobs first."""
+        rows = self._conn().execute("SELECT id FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self.get_job(row[0]) for row in rows]
+
+    def cancel_job(self, job_id: str) -> bool:
+        """Stop scheduling the job's pending items (running items still finish)."""
+        if not self.valid_id(job_id):
+            return False
+        conn = self._conn()
+        cursor = conn.execute("UPDATE jobs SET cancelled = 1 WHERE id = ?", (job_id,))
+        conn.execute("UPDATE items SET status = 'cancelled' WHERE job_id = ? AND status = 'pending'", (job_id,))
+        return cursor.rowcount > 0
+
+    def delete_job(self, job_id: str) -> bool:
+        """Cancel a job and remove it and its audio files."""
+        if not self.valid_id(job_id):
+            return False
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            conn.execute("DELETE FROM items WHERE job_id = ?", (job_id,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if cursor.rowcount == 0:
+            return False
+        shutil.rmtree(self.item_dir(job_id), ignore_errors=True)
+        return True
+
+    def build_archive(self, job_id: str) -> Optional[str]:
+        """Write the finished items and a manifest to a temporary zip file and return its path."""
+        job = self.get_job(job_id, include_items=True)
+        if job is None:
+            return None
+        fd, path = tempfile.mkstemp(suffix=".zip")
+        with os.fdopen(fd, "wb") as f, zipfile.ZipFile(f, "w", zipfile.ZIP_STORED) as archive:
+            manifest = []
+            for item in job["item_details"]:
+                entry = {key: item[key] for key in ("index", "text", "voice", "status", "audio_seconds", "error")}
+                if item["status"] == "done":
+                    entry["file"] = f"{item['index']:04d}.wav"
+                    archive.write(self.item_path(job_id, item["index"]), entry["file"])
+                manifest.append(entry)
+            archive.writestr("manifest.json", json.dumps(manifest, indent=2, ensure_ascii=False))
+        return path
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        """Atomically take the oldest pending item (safe across processes sharing the database)."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT items.job_id, items.idx, items.text, items.voice, items.attempts, jobs.priority "
+                "FROM items JOIN jobs ON jobs.id = items.job_id "
+                "WHERE items.status = 'pending' ORDER BY jobs.created_at, items.idx LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE items SET status = 'running', claimed_by = ?, attempts = attempts + 1, "
+                    "started_at = COALESCE(started_at, ?) WHERE job_id = ? AND idx = ?",
+                    (os.getpid(), time.time(), row["job_id"], row["idx"])
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return row
+
+    def _generate(self, job_id: str, index: int, text: str, voice: str) -> float:
+        """Generate one item on a generation thread and write its WAV file; returns audio seconds."""
+        audio_segments = list(stream_speech_from_api(
+            prompt=text,
+            voice=voice,
+            use_batching=len(text) > 1000,
+            max_batch_chars=1000,
+            checkpoint=True
+        ))
+        audio_bytes = sum(len(segment) for segment in audio_segments)
+        if not audio_bytes:
+            raise GenerationError("No audio was generated")
+        path = self.item_path(job_id, index)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            f.write(pcm_to_wav(audio_segments))
+        os.replace(path + ".tmp", path)
+        return audio_bytes / 2 / SAMPLE_RATE
+
+    def _process(self, item: sqlite3.Row) -> None:
+        job_id, index = item["job_id"], item["idx"]
+        while True:
+            try:
+                future = generation_executor.submit(
+                    self._generate, job_id, index, item["text"], item["voice"], priority=item["priority"]
+                )
+                audio_seconds = future.result()
+                break
+            except (QueueFullError, QueueTimeoutError) as e:
+                # The server is busy; the item keeps its claim and waits its turn
+                time.sleep(e.retry_after)
+            except Exception as e:
+                print(f"Job {job_id} item {index} failed (attempt {item['attempts'] + 1}/{self.max_attempts}): {e}")
+                status = "failed" if item["attempts"] + 1 >= self.max_attempts else "pending"
+                self._conn().execute(
+                    "UPDATE items SET status = ?, claimed_by = NULL, error = ?, finished_at = ? WHERE job_id = ? AND idx = ?",
+                    (status, str(e), time.time() if status == "failed" else None, job_id, index)
+                )
+                return
+
+        cursor = self._conn().execute(
+            "UPDATE items SET status = 'done', claimed_by = NULL, error = NULL, finished_at = ?, audio_seconds = ? "
+            "WHERE job_id = ? AND idx = ?",
+            (time.time(), audio_seconds, job_id, index)
+        )
+        if cursor.rowcount == 0:
+            # The job was deleted while this item was generating
+            shutil.rmtree(self.item_dir(job_id), ignore_errors=True)
+
+    def _worker(self) -> None:
+        """Job worker loop: claim pending items until there are none, then wait for more."""
+        while True:
+            try:
+                item = self._claim()
+            except sqlite3.Error as e:
+                print(f"Error claiming job item: {e}")
+                item = None
+            if item is None:
+                # Also poll, since jobs may be submitted through another server process
+                self._wakeup.wait(timeout=1.0)
+                self._wakeup.clear()
+                continue
+            try:
+                self._process(item)
+            except sqlite3.Error as e:
+                print(f"Error updating job item {item['job_id']}/{item['idx']}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Item counts by state across all jobs."""
+        counts = {state: 0 for state in ITEM_STATES}
+        for row in self._conn().execute("SELECT status, COUNT(*) FROM items GROUP BY status"):
+            counts[row[0]] = row[1]
+        jobs = self._conn().execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+        return {"workers": self.workers, "jobs": jobs, "items": counts}
+
+# Job queue settings from environment variables
+JOB_DIR = os.environ.get("ORPHEUS_JOB_DIR", "jobs")
+
+try:
+    JOB_WORKERS = int(os.environ.get("ORPHEUS_JOB_WORKERS", "2"))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_JOB_WORKERS value, using 2 as fallback")
+    JOB_WORKERS = 2
+
+if not IS_RELOADER:
+    print(f"Job queue: {JOB_WORKERS} worker(s), storing jobs in {JOB_DIR}/")
+
+# Shared job queue used by the FastAPI endpoints
+job_queue = JobQueue(JOB_DIR, JOB_WORKERS)
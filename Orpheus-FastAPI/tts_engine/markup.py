@@ -0,0 +1,152 @@
+import os
+import re
+import threading
+from typing import Any, Dict, List, Union
+
+# <break/>, <break time="500ms"/>, <break time="1.5s"/> or <break strength="strong"/>
+_BREAK_TAG = re.compile(r"<break\b([^>]*?)/?>", re.IGNORECASE)
+_BREAK_TIME = re.compile(r"""time\s*=\s*["']?\s*(\d+(?:\.\d+)?)\s*(ms|s)?\s*["']?""", re.IGNORECASE)
+_BREAK_STRENGTH = re.compile(r"""strength\s*=\s*["']?([a-z-]+)""", re.IGNORECASE)
+# An ellipsis that ends a phrase ("Well... I think"), not one inside a word or number
+_ELLIPSIS = re.compile(r"(?:\.{3,}|…)(?=\s|$)")
+# A blank line between paragraphs
+_PARAGRAPH = re.compile(r"\n[ \t]*\n\s*")
+
+_PAUSE = re.compile("|".join(f"(?P<{name}>{pattern.pattern})" for name, pattern in
+                             (("tag", _BREAK_TAG), ("ellipsis", _ELLIPSIS), ("paragraph", _PARAGRAPH))),
+                    re.IGNORECASE)
+
+# SSML break strengths, in milliseconds
+BREAK_STRENGTH_MS = {"none": 0, "x-weak": 100, "weak": 250, "medium": 500, "strong": 750, "x-strong": 1000}
+
+# Longest pause a single marker can insert
+MAX_PAUSE_MS = 10000
+
+# Spoken text, or a pause of this many seconds
+Segment = Union[str, float]
+
+def _break_ms(attributes: str) -> float:
+    time_match = _BREAK_TIME.search(attributes)
+    if time_match:
+        value = float(time_match.group(1))
+        return value * 1000 if (time_match.group(2) or "ms").lower() == "s" else value
+    strength_match = _BREAK_STRENGTH.search(attributes)
+    if strength_match:
+        return BREAK_STRENGTH_MS.get(strength_match.group(1).lower(), BREAK_MS)
+    return BREAK_MS
+
+def split_pauses(text: str) -> List[Segment]:
+    """
+    Split text at pause markup into spoken strings and pause lengths in seconds.
+
+    Break tags, phrase-ending ellipses and blank lines between paragraphs become
+    pauses; adjacent pauses are added up and text without any speech is dropped.
+    A marker whose pause is set to 0 ms is not a pause: an ellipsis stays in the
+    text, a break tag or paragraph gap becomes a space. Text without any pause
+    comes back as a single string, with such markers already rewritten, and text
+    with neither speech nor pauses as [].
+    """
+    segments: List[Segment] = []
+    position = 0
+
+    def add_text(piece: str) -> None:
+        if not any(char.isalnum() for char in piece):
+            return
+        if segments and isinstance(segments[-1], str):
+            segments[-1] = f"{segments[-1]} {piece.strip()}"
+        else:
+            segments.append(piece.strip())
+
+    def add_pause(ms: float) -> None:
+        seconds = min(ms, MAX_PAUSE_MS) / 1000
+        if segments and not isinstance(segments[-1], str):
+            segments[-1] = min(segments[-1] + seconds, MAX_PAUSE_MS / 1000)
+        else:
+            segments.append(seconds)
+
+    pending = ""
+    for match in _PAUSE.finditer(text):
+        pending += text[position:match.start()]
+        position = match.end()
+        if match.group("tag") is not None:
+            ms = _break_ms(match.group(2) or "")
+        elif match.group("ellipsis") is not None:
+            ms = ELLIPSIS_PAUSE_MS
+        else:
+            ms = PARAGRAPH_PAUSE_MS
+        if ms <= 0:
+            # Not a pause: keep ellipses as text, turn tags and paragraph gaps into a space
+            pending += match.group(0) if match.group("ellipsis") is not None else " "
+            continue
+        add_text(pending)
+        pending = ""
+        add_pause(ms)
+    rest = pending + text[position:]
+    if not segments:
+        # No pause was added, so rest is the whole text with its 0 ms markers rewritten
+        return [rest] if any(char.isalnum() for char in rest) else []
+    add_text(rest)
+    return segments
+
+def has_speech(text: str) -> bool:
+    """Whether text has anything to synthesize: words, or with pause markup on, a pause."""
+    # Blank lines alone would count as a paragraph pause
+    if not text.strip():
+        return False
+    return bool(split_pauses(text)) if PAUSE_MARKUP else True
+
+class PauseStats:
+    """Counts of texts with pause markup and the silence inserted for them."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.texts = 0
+        self.pauses = 0
+        self.silence_seconds = 0.0
+
+    def record(self, segments: List[Segment]) -> None:
+        pauses = [segment for segment in segments if not isinstance(segment, str)]
+        with self._lock:
+            self.texts += 1
+            self.pauses += len(pauses)
+            self.silence_seconds += sum(pauses)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": PAUSE_MARKUP,
+                "texts": self.texts,
+                "pauses": self.pauses,
+                "silence_seconds": round(self.silence_seconds, 2),
+            }
+
+# Render pause markup as inserted silence instead of sending it to the LLM
+PAUSE_MARKUP = os.environ.get("ORPHEUS_PAUSE_MARKUP", "true").lower() not in ("0", "false", "no", "off")
+
+# Pause lengths in milliseconds; 0 leaves that marker in the text
+try:
+    BREAK_MS = float(os.environ.get("ORPHEUS_BREAK_MS", "500"))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_BREAK_MS value, using 500 as fallback")
+    BREAK_MS = 500.0
+
+try:
+    ELLIPSIS_PAUSE_MS = float(os.environ.get("ORPHEUS_ELLIPSIS_PAUSE_MS", "400"))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_ELLIPSIS_PAUSE_MS value, using 400 as fallback")
+    ELLIPSIS_PAUSE_MS = 400.0
+
+try:
+    PARAGRAPH_PAUSE_MS = float(os.environ.get("ORPHEUS_PARAGRAPH_PAUSE_MS", "700"))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_PARAGRAPH_PAUSE_MS value, using 700 as fallback")
+    PARAGRAPH_PAUSE_MS = 700.0
+
+# Spoken segments generated ahead of the one being played
+try:
+    PAUSE_PREFETCH = max(0, int(os.environ.get("ORPHEUS_PAUSE_PREFETCH", "2")))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_PAUSE_PREFETCH value, using 2 as fallback")
+    PAUSE_PREFETCH = 2
+
+# Pause counts reported by /stats
+pause_stats = PauseStats()
@@ -0,0 +1,338 @@
+"""
+Memory diagnostics for finding what keeps growing in a long-running server.
+
+- Live counts of token processor threads and their audio queues, including
+  producers still running after their consumer gave up on them (orphans)
+- Sizes of the process-wide caches and the process RSS
+- With ORPHEUS_MEMORY_DIAGNOSTICS, the peak Python (tracemalloc) and tensor
+  (CUDA) allocation and RSS growth of each generation, and tracemalloc snapshots
+  that can be diffed to see which lines allocated the memory that stayed
+"""
+
+import os
+import gc
+import time
+import threading
+import tracemalloc
+import contextlib
+import collections
+from typing import Any, Dict, Iterator, Optional
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+# Snapshots kept for diffing at most (each holds every traced allocation)
+_MAX_SNAPSHOTS = 8
+
+# Seconds a producer may outlive its consumer before it counts as orphaned (the consumer waits as long)
+_ORPHAN_GRACE = 10.0
+
+def rss_bytes() -> Optional[int]:
+    """Resident set size of this process, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _cuda_torch():
+    """torch, once SNAC is loaded on a CUDA device in this process (tensor memory is not tracked otherwise)."""
+    # Imported here to avoid circular imports
+    from . import speechpipe
+    if speechpipe.model is None or speechpipe.snac_device != "cuda":
+        return None
+    return speechpipe.torch
+
+def _tensor_bytes() -> Optional[int]:
+    """Bytes currently allocated by torch on the GPU (None without CUDA or before SNAC is loaded)."""
+    torch = _cuda_torch()
+    return torch.cuda.memory_allocated() if torch is not None else None
+
+def _mb(value: Optional[float]) -> Optional[float]:
+    return round(value / (1024 * 1024), 1) if value is not None else None
+
+class _RequestUsage:
+    """Allocation baselines and peaks of one tracked generation."""
+    __slots__ = ("started_at", "python_base", "python_peak", "tensor_base", "tensor_peak",
+                 "rss_base", "rss_peak", "overlapping")
+
+    def __init__(self, python: Optional[int], tensor: Optional[int], rss: Optional[int], overlapping: int):
+        self.started_at = time.time()
+        self.python_base = self.python_peak = python
+        self.tensor_base = self.tensor_peak = tensor
+        self.rss_base = self.rss_peak = rss
+        self.overlapping = overlapping
+
+    def update(self, python: Optional[int], tensor: Optional[int], rss: Optional[int]) -> None:
+        if python is not None:
+            self.python_peak = python if self.python_peak is None else max(self.python_peak, python)
+        if tensor is not None:
+            self.tensor_peak = tensor if self.tensor_peak is None else max(self.tensor_peak, tensor)
+        if rss is not None:
+            self.rss_peak = rss if self.rss_peak is None else max(self.rss_peak, rss)
+
+    def summary(self, rss_end: Optional[int]) -> Dict[str, Any]:
+        def growth(base, value):
+            return value - base if base is not None and value is not None else None
+        return {
+            "seconds": round(time.time() - self.started_at, 2),
+            "python_peak_mb": _mb(growth(self.python_base, self.python_peak)),
+            "tensor_peak_mb": _mb(growth(self.tensor_base, self.tensor_peak)),
+            "rss_peak_mb": _mb(growth(self.rss_base, self.rss_peak)),
+            "rss_retained_mb": _mb(growth(self.rss_base, rss_end)),
+            "overlapping": self.overlapping,
+        }
+
+class MemoryMonitor:
+    """
+    Tracks token processor threads and queues, the memory peaks of generations and
+    tracemalloc snapshots.
+
+    Allocation peaks are process-wide, so a generation's peak includes whatever
+    ran at the same time; overlapping says how many other generations that was.
+    """
+    def __init__(self, sample_interval_ms: float, warn_mb: float, trace_frames: int, history_size: int = 50):
+        self.sample_interval = sample_interval_ms / 1000
+        self.warn_bytes = warn_mb * 1024 * 1024
+        self.trace_frames = trace_frames
+        self._lock = threading.Lock()
+        # handle -> [thread, audio queue, time its consumer let go of it or None, counted as orphan]
+        self._producers = {}
+        self.producers_started = 0
+        self.orphans_seen = 0
+        self._tracked = set()
+        self._history = collections.deque(maxlen=history_size)
+        self._sampler = None
+        self._warned = False
+        self._snapshots = collections.OrderedDict()
+        self._next_snapshot = 1
+
+    # Token processor threads and queues
+
+    def watch_producer(self, thread: threading.Thread, audio_queue) -> int:
+        """Count a token processor thread and its queue until both are gone; returns its handle."""
+        with self._lock:
+            handle = self.producers_started
+            self.producers_started += 1
+            self._producers[handle] = [thread, audio_queue, None, False]
+            return handle
+
+    def release_producer(self, handle: int) -> None:
+        """The consumer is done with a producer; if its thread keeps running, it becomes an orphan."""
+        with self._lock:
+            entry = self._producers.get(handle)
+            if entry is None:
+                return
+            if entry[0].is_alive():
+                entry[2] = time.time()
+            else:
+                del self._producers[handle]
+
+    def producers(self) -> Dict[str, Any]:
+        """Live token processor threads and queues; released producers whose thread ended are dropped."""
+        now = time.time()
+        orphans = []
+        with self._lock:
+            for handle, entry in list(self._producers.items()):
+                thread, _, released_at, counted = entry
+                if released_at is None:
+                    continue
+                if not thread.is_alive():
+                    del self._producers[handle]
+                elif now - released_at > _ORPHAN_GRACE:
+                    orphans.append(now - released_at)
+                    if not counted:
+                        entry[3] = True
+                        self.orphans_seen += 1
+            entries = list(self._producers.values())
+            queued = sum(entry[1].qsize() for entry in entries)
+        return {
+            "started": self.producers_started,
+            "alive": sum(1 for entry in entries if entry[0].is_alive()),
+            "queues": len(entries),
+            "queued_chunks": queued,
+            "orphaned": len(orphans),
+            "orphaned_total": self.orphans_seen,
+            "oldest_orphan_s": round(max(orphans), 1) if orphans else None,
+        }
+
+    # Per-request peaks
+
+    def _read(self, reset: bool = True):
+        """Python and tensor peaks since the last reset (resetting them, if reset) and the RSS."""
+        python = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None
+        if python is not None and reset:
+            tracemalloc.reset_peak()
+        tensor = None
+        torch = _cuda_torch()
+        if torch is not None:
+            tensor = torch.cuda.max_memory_allocated()
+            if reset:
+                torch.cuda.reset_peak_memory_stats()
+        return python, tensor, rss_bytes()
+
+    def _sample(self) -> None:
+        """Update the peaks of the tracked generations until none is left."""
+        while True:
+            time.sleep(self.sample_interval)
+            python, tensor, rss = self._read()
+            with self._lock:
+                if not self._tracked:
+                    self._sampler = None
+                    return
+                for usage in self._tracked:
+                    usage.update(python, tensor, rss)
+            if self.warn_bytes and rss and rss > self.warn_bytes and not self._warned:
+                print(f"WARNING: RSS is {_mb(rss)} MB, above ORPHEUS_MEMORY_WARN_MB ({_mb(self.warn_bytes)} MB)")
+                self._warned = True
+
+    @contextlib.contextmanager
+    def track(self) -> Iterator[Optional[_RequestUsage]]:
+        """Record the memory peaks of the enclosed generation (no-op unless ORPHEUS_MEMORY_DIAGNOSTICS is set)."""
+        if not MEMORY_DIAGNOSTICS:
+            yield None
+            return
+        python = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        usage = _RequestUsage(python, _tensor_bytes(), rss_bytes(), 0)
+        with self._lock:
+            usage.overlapping = len(self._tracked)
+            for other in self._tracked:
+                other.overlapping += 1
+            self._tracked.add(usage)
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample, name="MemorySampler", daemon=True)
+                self._sampler.start()
+        try:
+            yield usage
+        finally:
+            # Peaks since the last sample; only the sampler resets them, as other generations rely on them
+            usage.update(*self._read(reset=False))
+            with self._lock:
+                self._tracked.discard(usage)
+            summary = usage.summary(rss_bytes())
+            with self._lock:
+                self._history.append(summary)
+            peaks = [f"+{summary[key]} MB {label}" for key, label in
+                     (("python_peak_mb", "Python"), ("tensor_peak_mb", "tensors"), ("rss_peak_mb", "RSS"))
+                     if summary[key] is not None]
+            print(f"Memory peak: {', '.join(peaks) or 'unknown'} ({summary['overlapping']} overlapping)")
+
+    # tracemalloc snapshots
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Take a tracemalloc snapshot (tracing starts with the first one) and return its ID."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.trace_frames)
+            print(f"Started tracemalloc with {self.trace_frames} frames per allocation")
+        snapshot = tracemalloc.take_snapshot()
+        with self._lock:
+            snapshot_id = self._next_snapshot
+            self._next_snapshot += 1
+            self._snapshots[snapshot_id] = (time.time(), snapshot)
+            while len(self._snapshots) > _MAX_SNAPSHOTS:
+                self._snapshots.popitem(last=False)
+        return {"snapshot": snapshot_id, "traced_mb": _mb(tracemalloc.get_traced_memory()[0])}
+
+    def diff(self, base: Optional[int] = None, against: Optional[int] = None, top: int = 20,
+             key_type: str = "lineno") -> Dict[str, Any]:
+        """
+        The top allocation sites by growth from snapshot base (default: the one
+        before against) to snapshot against (default: a new snapshot).
+        Raises KeyError for unknown snapshots and ValueError for an unknown key_type.
+        """
+        if key_type not in ("lineno", "filename", "traceback"):
+            raise ValueError(f"Unknown key_type '{key_type}'. Supported: lineno, filename, traceback")
+        if against is None:
+            against = self.snapshot()["snapshot"]
+        with self._lock:
+            ids = list(self._snapshots)
+            if against not in self._snapshots:
+                raise KeyError(against)
+            if base is None:
+                earlier = [snapshot_id for snapshot_id in ids if snapshot_id < against]
+                if not earlier:
+                    raise KeyError(against - 1)
+                base = earlier[-1]
+            if base not in self._snapshots:
+                raise KeyError(base)
+            base_time, base_snapshot = self._snapshots[base]
+            against_time, against_snapshot = self._snapshots[against]
+        stats = against_snapshot.compare_to(base_snapshot, key_type)
+        return {
+            "base": base,
+            "against": against,
+            "seconds": round(against_time - base_time, 1),
+            "growth_mb": _mb(sum(stat.size_diff for stat in stats)),
+            "top": [{
+                "site": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+                "size_diff_kb": round(stat.size_diff / 1024, 1),
+                "count_diff": stat.count_diff,
+                "size_kb": round(stat.size / 1024, 1),
+                "count": stat.count,
+            } for stat in stats[:max(1, top)]],
+        }
+
+    def stop_tracing(self) -> None:
+        """Stop tracemalloc (which slows every allocation) and drop the snapshots."""
+        with self._lock:
+            self._snapshots.clear()
+        tracemalloc.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        # Imported here to avoid circular imports
+        from .speechpipe import token_id_cache
+        from .resample import _polyphase_taps
+        threads = collections.Counter(thread.name.split("-")[0] for thread in threading.enumerate())
+        with self._lock:
+            history = list(self._history)
+            snapshots = list(self._snapshots)
+        peaks = [entry["python_peak_mb"] for entry in history if entry["python_peak_mb"] is not None]
+        rss_peaks = [entry["rss_peak_mb"] for entry in history if entry["rss_peak_mb"] is not None]
+        return {
+            "diagnostics": MEMORY_DIAGNOSTICS,
+            "rss_mb": _mb(rss_bytes()),
+            "tensor_mb": _mb(_tensor_bytes()),
+            "tracemalloc": {
+                "tracing": tracemalloc.is_tracing(),
+                "traced_mb": _mb(tracemalloc.get_traced_memory()[0]) if tracemalloc.is_tracing() else None,
+                "snapshots": snapshots,
+            },
+            "threads": dict(threads),
+            "producers": self.producers(),
+            "caches": {
+                "token_id_cache": len(token_id_cache),
+                "resample_filters": _polyphase_taps.cache_info().currsize,
+            },
+            "gc_objects": len(gc.get_objects()) if MEMORY_DIAGNOSTICS else None,
+            "requests": {
+                "tracked": len(history),
+                "python_peak_mb": max(peaks) if peaks else None,
+                "rss_peak_mb": max(rss_peaks) if rss_peaks else None,
+                "recent": history[-10:],
+            },
+        }
+
+# Record per-generation peaks and allow tracemalloc snapshots
+MEMORY_DIAGNOSTICS = os.environ.get("ORPHEUS_MEMORY_DIAGNOSTICS", "false").lower() in ("1", "true", "yes", "on")
+
+try:
+    MEMORY_SAMPLE_MS = max(1.0, float(os.environ.get("ORPHEUS_MEMORY_SAMPLE_MS", "50")))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_MEMORY_SAMPLE_MS value, using 50 as fallback")
+    MEMORY_SAMPLE_MS = 50.0
+
+# Log a warning once when the RSS exceeds this (0 disables)
+try:
+    MEMORY_WARN_MB = max(0.0, float(os.environ.get("ORPHEUS_MEMORY_WARN_MB", "0")))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_MEMORY_WARN_MB value, using 0 as fallback")
+    MEMORY_WARN_MB = 0.0
+
+# Stack frames recorded per allocation once tracemalloc runs (more frames, more overhead)
+try:
+    MEMORY_TRACE_FRAMES = max(1, int(os.environ.get("ORPHEUS_MEMORY_TRACE_FRAMES", "5")))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_MEMORY_TRACE_FRAMES value, using 5 as fallback")
+    MEMORY_TRACE_FRAMES = 5
+
+# Shared monitor
+memory_monitor = MemoryMonitor(MEMORY_SAMPLE_MS, MEMORY_WARN_MB, MEMORY_TRACE_FRAMES)
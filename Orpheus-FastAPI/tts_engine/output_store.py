@@ -0,0 +1,265 @@
+import os
+import io
+import re
+import time
+import uuid
+import wave
+import queue
+import shutil
+import threading
+import collections
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .inference import SAMPLE_RATE, IS_RELOADER
+from .executor import _summarize_ms
+
+# How generated audio is kept:
+# - persist:      written to disk before the response, evicted by TTL/size
+# - write_behind: served from memory while a background thread writes it to disk
+# - memory:       never written to disk, kept in memory until evicted by TTL/size
+OUTPUT_MODES = ("persist", "write_behind", "memory")
+
+# Only names produced by new_name() (or older timestamped files) may be served or evicted
+_SAFE_NAME = re.compile(r"^[A-Za-z0-9_\-]+\.wav$")
+
+def pcm_to_wav(audio_segments: List[bytes], sample_rate: int = SAMPLE_RATE) -> bytes:
+    """Wrap 16-bit mono PCM segments in a WAV container."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(b"".join(audio_segments))
+    return buffer.getvalue()
+
+class OutputStore:
+    """
+    Store for generated WAV files with collision-free names and bounded growth.
+
+    Files older than ttl seconds are removed, and the oldest files are removed
+    while the total size exceeds max_bytes (either limit is disabled with 0).
+    In memory mode the same limits apply to the in-memory entries.
+    """
+    def __init__(self, mode: str, directory: str, ttl: float, max_bytes: int, cleanup_interval: float = 60.0, history_size: int = 200):
+        self.mode = mode
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        # name -> (created_at, wav bytes) for memory entries and pending write-behind entries
+        self._memory = collections.OrderedDict()
+        # name -> (mtime, size) of files on disk, refreshed on every cleanup pass
+        self._disk = {}
+
+        self.saved = 0
+        self.writes = 0
+        self.write_errors = 0
+        self.evicted_files = 0
+        self.evicted_bytes = 0
+        self._write_times = collections.deque(maxlen=history_size)
+
+        if mode != "memory":
+            os.makedirs(directory, exist_ok=True)
+            self._scan()
+
+        self._write_queue = queue.Queue()
+        if mode == "write_behind":
+            writer = threading.Thread(target=self._writer, name="OutputWriter")
+            writer.daemon = True
+            writer.start()
+
+        self._cleanup_interval = cleanup_interval
+        cleaner = threading.Thread(target=self._cleaner, name="OutputCleanup")
+        cleaner.daemon = True
+        cleaner.start()
+
+    @staticmethod
+    def new_name(voice: str) -> str:
+        """Unique file name for one request's output."""
+        safe_voice = re.sub(r"[^A-Za-z0-9_\-]", "_", voice)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return f"{safe_voice}_{timestamp}_{uuid.uuid4().hex[:8]}.wav"
+
+    @staticmethod
+    def url_path(name: str) -> str:
+        """Path the file is served under (relative, as used by the web UI)."""
+        return f"outputs/{name}"
+
+    def save(self, name: str, audio_segments: List[bytes], sample_rate: int = SAMPLE_RATE) -> bytes:
+        """Store the audio under name and return the WAV bytes."""
+        data = pcm_to_wav(audio_segments, sample_rate)
+        with self._lock:
+            self.saved += 1
+        if self.mode == "persist":
+            self._write(name, data)
+        else:
+            with self._lock:
+                self._memory[name] = (time.time(), data)
+            if self.mode == "write_behind":
+                self._write_queue.put(name)
+            else:
+                self._evict_memory()
+        return data
+
+    def get(self, name: str) -> Optional[bytes]:
+        """Return in-memory WAV bytes for name, or None if it is not held in memory."""
+        with self._lock:
+            entry = self._memory.get(name)
+        return entry[1] if entry else None
+
+    def path(self, name: str) -> Optional[str]:
+        """Return the disk path of name if it is a valid, existing output file."""
+        if not _SAFE_NAME.match(name) or self.mode == "memory":
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+    def _write(self, name: str, data: bytes) -> None:
+        start = time.time()
+        path = os.path.join(self.directory, name)
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            with self._lock:
+                self.write_errors += 1
+            print(f"Error writing output file {path}: {e}")
+            return
+        with self._lock:
+            self.writes += 1
+            self._write_times.append(time.time() - start)
+            self._disk[name] = (time.time(), len(data))
+
+    def _writer(self) -> None:
+        """Write-behind thread: persist queued entries, then drop them from memory."""
+        while True:
+            name = self._write_queue.get()
+            with self._lock:
+                entry = self._memory.get(name)
+            if entry is not None:
+                self._write(name, entry[1])
+                with self._lock:
+                    self._memory.pop(name, None)
+
+    def _scan(self) -> None:
+        """Refresh the view of output files on disk."""
+        files = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.is_file() and _SAFE_NAME.match(entry.name):
+                        stat = entry.stat()
+                        files[entry.name] = (stat.st_mtime, stat.st_size)
+        except OSError as e:
+            print(f"Error scanning output directory {self.directory}: {e}")
+            return
+        with self._lock:
+            self._disk = files
+
+    def _evict_memory(self) -> None:
+        now = time.time()
+        with self._lock:
+            total = sum(len(data) for _, data in self._memory.values())
+            # Entries are in creation order, so the oldest are evicted first
+            for name in list(self._memory):
+                created_at, data = self._memory[name]
+                expired = self.ttl and now - created_at > self.ttl
+                oversize = self.max_bytes and total > self.max_bytes
+                if not (expired or oversize):
+                    break
+                del self._memory[name]
+                total -= len(data)
+                self.evicted_files += 1
+                self.evicted_bytes += len(data)
+
+    def cleanup(self) -> None:
+        """Remove expired outputs, then the oldest ones while over the size limit."""
+        if self.mode == "memory":
+            self._evict_memory()
+            return
+
+        self._scan()
+        now = time.time()
+        with self._lock:
+            files = sorted(self._disk.items(), key=lambda item: item[1][0])
+        total = sum(size for _, (_, size) in files)
+        for name, (mtime, size) in files:
+            expired = self.ttl and now - mtime > self.ttl
+            oversize = self.max_bytes and total > self.max_bytes
+            if not (expired or oversize):
+                continue
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Error removing output file {name}: {e}")
+                continue
+            total -= size
+            with self._lock:
+                self._disk.pop(name, None)
+                self.evicted_files += 1
+                self.evicted_bytes += size
+
+    def _cleaner(self) -> None:
+        while True:
+            try:
+                self.cleanup()
+            except Exception as e:
+                print(f"Error during output cleanup: {e}")
+            time.sleep(self._cleanup_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of disk and memory usage, writes and evictions."""
+        with self._lock:
+            result = {
+                "mode": self.mode,
+                "ttl": self.ttl,
+                "max_bytes": self.max_bytes,
+                "saved": self.saved,
+                "memory_files": len(self._memory),
+                "memory_bytes": sum(len(data) for _, data in self._memory.values()),
+                "pending_writes": self._write_queue.qsize(),
+                "disk_files": len(self._disk),
+                "disk_bytes": sum(size for _, size in self._disk.values()),
+                "writes": self.writes,
+                "write_errors": self.write_errors,
+                "write_ms": _summarize_ms(list(self._write_times)),
+                "evicted_files": self.evicted_files,
+                "evicted_bytes": self.evicted_bytes,
+            }
+        if self.mode != "memory":
+            try:
+                result["disk_free_bytes"] = shutil.disk_usage(self.directory).free
+            except OSError:
+                result["disk_free_bytes"] = None
+        return result
+
+# Output store settings from environment variables
+OUTPUT_MODE = os.environ.get("ORPHEUS_OUTPUT_MODE", "persist").lower()
+if OUTPUT_MODE not in OUTPUT_MODES:
+    print("WARNING: Invalid ORPHEUS_OUTPUT_MODE value, using persist as fallback")
+    OUTPUT_MODE = "persist"
+
+try:
+    OUTPUT_TTL = float(os.environ.get("ORPHEUS_OUTPUT_TTL", "86400"))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_OUTPUT_TTL value, using 86400 seconds as fallback")
+    OUTPUT_TTL = 86400.0
+
+try:
+    OUTPUT_MAX_MB = int(os.environ.get("ORPHEUS_OUTPUT_MAX_MB", "1024"))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_OUTPUT_MAX_MB value, using 1024 as fallback")
+    OUTPUT_MAX_MB = 1024
+
+if not IS_RELOADER:
+    print(f"Output store: {OUTPUT_MODE} mode, "
+          f"{'no TTL' if not OUTPUT_TTL else f'{OUTPUT_TTL:.0f}s TTL'}, "
+          f"{'no size limit' if not OUTPUT_MAX_MB else f'{OUTPUT_MAX_MB}MB limit'}")
+
+output_store = OutputStore(OUTPUT_MODE, "outputs", OUTPUT_TTL, OUTPUT_MAX_MB * 1024 * 1024)
@@ -0,0 +1,283 @@
+"""
+On-demand profiling of individual requests.
+
+A profiled request gets a sampling CPU profile of every thread working on it (the
+generation thread, its token processors and prefetched streams), written as
+collapsed stacks for flamegraph.pl or speedscope, and a torch.profiler trace of its
+SNAC decode calls, written as a Chrome trace (chrome://tracing or Perfetto). Both
+are named after the request ID:
+
+    profiles/<request_id>.folded
+    profiles/<request_id>.trace.json
+
+Nothing is profiled unless ORPHEUS_PROFILING is enabled and a request asks for it
+(the X-Profile header) or was armed through /admin/profile.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import threading
+import contextlib
+import collections
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Request IDs become file names, so client-supplied ones are restricted to these
+_SAFE_ID = re.compile(r"^[A-Za-z0-9_.\-]{1,64}$")
+_SAFE_NAME = re.compile(r"^[A-Za-z0-9_.\-]{1,64}\.(folded|trace\.json)$")
+
+# Decode calls traced per request at most (each traced call costs a profiler start and stop)
+_MAX_TRACED_DECODES = 500
+
+# torch.profiler can only run once per process at a time
+_torch_lock = threading.Lock()
+
+class RequestProfile:
+    """
+    Profile of one request: a sampler thread that records the stacks of the
+    request's threads every interval, and the torch traces of its decode calls.
+    """
+    def __init__(self, request_id: str, directory: str, interval: float):
+        self.request_id = request_id
+        self.directory = directory
+        self.interval = interval
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        # thread id -> number of profile_context() blocks it is in
+        self._threads = collections.Counter()
+        self._stacks = collections.Counter()
+        self._traces = []
+        self.samples = 0
+        self.decodes = 0
+        self.skipped_decodes = 0
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name=f"Profiler-{request_id}", daemon=True)
+        self._sampler.start()
+
+    def _enter(self) -> None:
+        with self._lock:
+            self._threads[threading.get_ident()] += 1
+
+    def _exit(self) -> None:
+        with self._lock:
+            ident = threading.get_ident()
+            self._threads[ident] -= 1
+            if self._threads[ident] <= 0:
+                del self._threads[ident]
+
+    def _sample(self) -> None:
+        names = {}
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                threads = list(self._threads)
+            if not threads:
+                continue
+            frames = sys._current_frames()
+            for ident in threads:
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                if ident not in names:
+                    thread = next((t for t in threading.enumerate() if t.ident == ident), None)
+                    names[ident] = thread.name if thread else str(ident)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names[ident])
+                self._stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+            del frames
+
+    def decode(self, decode: Callable[[Any], Any], codes: Any) -> Any:
+        """Run decode(codes) under torch.profiler, unless another profiled decode is running."""
+        # Imported here: torch is only loaded once the decoder is
+        import torch
+        if self.decodes >= _MAX_TRACED_DECODES or not _torch_lock.acquire(blocking=False):
+            self.skipped_decodes += 1
+            return decode(codes)
+        try:
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if torch.cuda.is_available():
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+            with torch.profiler.profile(activities=activities) as prof:
+                with torch.profiler.record_function("snac_decode"):
+                    result = decode(codes)
+            self._traces.append(prof)
+            self.decodes += 1
+            return result
+        finally:
+            _torch_lock.release()
+
+    def finish(self) -> List[str]:
+        """Stop sampling and write the profile files; returns their names."""
+        self._stop.set()
+        self._sampler.join(timeout=5.0)
+        written = []
+        os.makedirs(self.directory, exist_ok=True)
+        if self._stacks:
+            name = f"{self.request_id}.folded"
+            with open(os.path.join(self.directory, name), "w") as f:
+                for stack, count in sorted(self._stacks.items()):
+                    f.write(f"{stack} {count}\n")
+            written.append(name)
+        if self._traces:
+            name = f"{self.request_id}.trace.json"
+            self._write_trace(os.path.join(self.directory, name))
+            written.append(name)
+        self._traces = []
+        return written
+
+    def _write_trace(self, path: str) -> None:
+        """Merge the traces of every decode call into one Chrome trace."""
+        events = []
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            for prof in self._traces:
+                prof.export_chrome_trace(tmp_path)
+                with open(tmp_path) as f:
+                    events.extend(json.load(f).get("traceEvents", []))
+        finally:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms",
+                       "otherData": {"request_id": self.request_id, "decodes": self.decodes,
+                                     "skipped_decodes": self.skipped_decodes}}, f)
+
+# The profile of the request a thread is currently working on, if it is profiled
+_local = threading.local()
+
+def current_profile() -> Optional[RequestProfile]:
+    return getattr(_local, "profile", None)
+
+@contextlib.contextmanager
+def profile_context(profile: Optional[RequestProfile]) -> Iterator[None]:
+    """Run the enclosed code on behalf of a profiled request, sampling this thread (no-op for None)."""
+    if profile is None:
+        yield
+        return
+    previous = getattr(_local, "profile", None)
+    _local.profile = profile
+    profile._enter()
+    try:
+        yield
+    finally:
+        profile._exit()
+        _local.profile = previous
+
+class Profiler:
+    """Starts request profiles, arms upcoming requests for profiling and lists the written files."""
+    def __init__(self, directory: str, interval_ms: float):
+        self.directory = directory
+        self.interval = interval_ms / 1000
+        self._lock = threading.Lock()
+        self._armed = 0
+        self._active = {}
+        self.profiled = 0
+        self.errors = 0
+
+    @staticmethod
+    def request_id(requested: Optional[str] = None) -> str:
+        """The client's request ID if it is usable as a file name, otherwise a new one."""
+        if requested and _SAFE_ID.match(requested):
+            return requested
+        return uuid.uuid4().hex[:16]
+
+    def arm(self, count: int) -> int:
+        """Profile the next count requests; returns how many are armed."""
+        with self._lock:
+            self._armed = max(0, count)
+            return self._armed
+
+    def should_profile(self, requested: bool = False) -> bool:
+        """Whether a request is profiled: it asked to be, or it takes one of the armed slots."""
+        if not PROFILING:
+            return False
+        if requested:
+            return True
+        with self._lock:
+            if self._armed:
+                self._armed -= 1
+                return True
+        return False
+
+    @contextlib.contextmanager
+    def capture(self, request_id: Optional[str]) -> Iterator[Optional[RequestProfile]]:
+        """Profile the enclosed code (and the threads it hands work to) as request_id (no-op for None)."""
+        if request_id is None:
+            yield None
+            return
+        profile = RequestProfile(request_id, self.directory, self.interval)
+        with self._lock:
+            self._active[request_id] = profile
+        try:
+            with profile_context(profile):
+                yield profile
+        finally:
+            with self._lock:
+                self._active.pop(request_id, None)
+            try:
+                written = profile.finish()
+                print(f"Profile {request_id}: {profile.samples} samples, {profile.decodes} decodes traced "
+                      f"({profile.skipped_decodes} skipped), wrote {', '.join(written) or 'nothing'}")
+                with self._lock:
+                    self.profiled += 1
+            except Exception as e:
+                print(f"Error writing profile {request_id}: {e}")
+                with self._lock:
+                    self.errors += 1
+
+    def files(self) -> List[Dict[str, Any]]:
+        """The profile files written so far, newest first."""
+        files = []
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.is_file() and _SAFE_NAME.match(entry.name):
+                        stat = entry.stat()
+                        files.append({"name": entry.name, "bytes": stat.st_size, "created": stat.st_mtime})
+        except FileNotFoundError:
+            return []
+        return sorted(files, key=lambda item: item["created"], reverse=True)
+
+    def path(self, name: str) -> Optional[str]:
+        """Path of a profile file, or None if the name is not a profile file."""
+        if not _SAFE_NAME.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": PROFILING,
+                "directory": self.directory,
+                "interval_ms": self.interval * 1000,
+                "armed": self._armed,
+                "active": list(self._active),
+                "profiled": self.profiled,
+                "errors": self.errors,
+            }
+
+# Profiling is only possible with this set; without it profiling requests are ignored
+PROFILING = os.environ.get("ORPHEUS_PROFILING", "false").lower() in ("1", "true", "yes", "on")
+
+# Where profiles are written
+PROFILE_DIR = os.environ.get("ORPHEUS_PROFILE_DIR", "profiles")
+
+# Time between stack samples of a profiled request's threads
+try:
+    PROFILE_INTERVAL_MS = max(1.0, float(os.environ.get("ORPHEUS_PROFILE_INTERVAL_MS", "5")))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_PROFILE_INTERVAL_MS value, using 5 as fallback")
+    PROFILE_INTERVAL_MS = 5.0
+
+# Shared profiler
+profiler = Profiler(PROFILE_DIR, PROFILE_INTERVAL_MS)
@@ -0,0 +1,116 @@
+import functools
+from math import gcd
+from typing import Generator, Iterable, Tuple
+
+import numpy as np
+
+# Output rates a request may ask for (SNAC decodes at 24 kHz)
+SUPPORTED_SAMPLE_RATES = (8000, 11025, 12000, 16000, 22050, 24000, 32000, 44100, 48000)
+
+# Filter half-length in zero crossings of the sinc, and its Kaiser window shape:
+# about 80 dB of stopband attenuation with a transition band of ~6% of the lower Nyquist rate
+ZERO_CROSSINGS = 16
+KAISER_BETA = 8.0
+# Passband edge as a fraction of the lower Nyquist rate
+ROLLOFF = 0.94
+
+@functools.lru_cache(maxsize=None)
+def _polyphase_taps(up: int, down: int) -> Tuple[np.ndarray, int]:
+    """
+    Low-pass filter for resampling by up/down, split into its up polyphase branches.
+    Returns (taps, delay): taps[phase] is branch phase reversed, so it applies to an
+    input window in time order, and delay is the filter's delay at the upsampled rate.
+    """
+    cutoff = ROLLOFF * 0.5 / max(up, down)  # cycles per sample at the upsampled rate
+    delay = ZERO_CROSSINGS * max(up, down)
+    n = np.arange(-delay, delay + 1)
+    h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(len(n), KAISER_BETA)
+    # Unity gain for each branch: upsampling inserts up-1 zeros between samples
+    h *= up / h.sum()
+    taps_per_phase = -(-len(h) // up)
+    h = np.concatenate([h, np.zeros(taps_per_phase * up - len(h))])
+    # Branch p holds h[p], h[p + up], h[p + 2*up], ...
+    taps = h.reshape(taps_per_phase, up).T[:, ::-1]
+    return np.ascontiguousarray(taps), delay
+
+class StreamingResampler:
+    """
+    Polyphase FIR resampler for a stream of 16-bit mono PCM chunks.
+
+    Keeps the input history its filter needs between chunks, so the output does not
+    depend on how the input was split: chunk seams are inaudible, and the samples are
+    the same as resampling the whole stream at once. The filter's delay is compensated,
+    and flush() returns the tail, so the output lines up with the input and has
+    ceil(input samples * out_rate / in_rate) samples.
+    """
+    def __init__(self, in_rate: int, out_rate: int):
+        divisor = gcd(in_rate, out_rate)
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.up = out_rate // divisor
+        self.down = in_rate // divisor
+        self._taps, self._delay = _polyphase_taps(self.up, self.down)
+        self._width = self._taps.shape[1]
+        # Input samples from absolute index _start on, starting with silence before the stream
+        self._buffer = np.zeros(self._width - 1)
+        self._start = -(self._width - 1)
+        self._received = 0
+        self._produced = 0
+
+    def _run(self, available: int, limit: int = None) -> np.ndarray:
+        """Output samples that only need input before absolute index available (at most up to limit)."""
+        end = (available * self.up - 1 - self._delay) // self.down + 1
+        if limit is not None:
+            end = min(end, limit)
+        if end <= self._produced:
+            return np.zeros(0)
+        # Output n is centred on input position (n * down + delay) / up
+        position = np.arange(self._produced, end) * self.down + self._delay
+        newest, phase = np.divmod(position, self.up)
+        windows = np.lib.stride_tricks.sliding_window_view(self._buffer, self._width)
+        output = np.einsum("nk,nk->n", windows[newest - (self._width - 1) - self._start], self._taps[phase])
+        self._produced = end
+
+        # Drop input no later output needs
+        keep_from = (end * self.down + self._delay) // self.up - (self._width - 1)
+        if keep_from > self._start:
+            self._buffer = self._buffer[keep_from - self._start:]
+            self._start = keep_from
+        return output
+
+    @staticmethod
+    def _to_pcm(output: np.ndarray) -> bytes:
+        return np.clip(np.rint(output), -32768, 32767).astype(np.int16).tobytes()
+
+    def process(self, pcm: bytes) -> bytes:
+        """Resample one chunk; returns what can be produced so far (possibly nothing)."""
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        self._buffer = np.concatenate([self._buffer, samples])
+        self._received += len(samples)
+        return self._to_pcm(self._run(self._received))
+
+    def flush(self) -> bytes:
+        """Return the rest of the output, as if the stream were followed by silence."""
+        total = -(-self._received * self.up // self.down)
+        padding = self._delay // self.up + self._width
+        self._buffer = np.concatenate([self._buffer, np.zeros(padding)])
+        return self._to_pcm(self._run(self._received + padding, total))
+
+def resample_chunks(chunks: Iterable[bytes], in_rate: int, out_rate: int) -> Generator[bytes, None, None]:
+    """Resample a stream of PCM chunks; chunks pass through untouched when the rates match."""
+    try:
+        if in_rate == out_rate:
+            yield from chunks
+            return
+        resampler = StreamingResampler(in_rate, out_rate)
+        for chunk in chunks:
+            output = resampler.process(chunk)
+            if output:
+                yield output
+        tail = resampler.flush()
+        if tail:
+            yield tail
+    finally:
+        # Closing early releases the generation behind the chunks
+        if hasattr(chunks, "close"):
+            chunks.close()
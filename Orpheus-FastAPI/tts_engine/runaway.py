@@ -0,0 +1,175 @@
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .speechpipe import CUSTOM_TOKEN_BASE
+
+# Vocabulary IDs outside the custom tokens that have a text form in completions
+_SPECIAL_TOKEN_TEXT = {128009: "<|eot_id|>"}
+
+TRIGGER_REASONS = ("budget", "end_token", "loop", "silence")
+
+def token_budget(text: str) -> int:
+    """Tokens a generation for text may use: enough for slow, expressive speech, not for a runaway."""
+    budget = TOKEN_BUDGET_BASE + TOKENS_PER_CHAR * len(text)
+    # Whole frames of 7 audio tokens
+    return budget - budget % 7
+
+class RunawayGuard:
+    """
+    Watches one generation's tokens and decoded frames for signs that the model
+    has stopped speaking the text: an end token, a loop of repeating frames, or
+    a long run of silence.
+
+    Audio that may turn out to be part of a loop or a silence run is held back
+    and released once speech continues. When the guard trips, the held audio is
+    dropped (trimmed) and reason says why; the caller then stops reading tokens,
+    which cancels the upstream generation.
+    """
+    # Frames whose int16 RMS level is below this count as silence (about -54 dBFS)
+    SILENCE_RMS = 64
+    # Longest repeating pattern, in frames, that loop detection looks for
+    MAX_PERIOD = 24
+    # Consecutive repeating frames after which audio is held back as a possible loop
+    HOLD_FRAMES = 3
+
+    def __init__(self, end_token_ids: Iterable[int], sample_rate: int,
+                 loop_seconds: Optional[float] = None, silence_seconds: Optional[float] = None):
+        self.end_ids = set(end_token_ids)
+        self.end_texts = {_SPECIAL_TOKEN_TEXT.get(token_id, f"<custom_token_{token_id - CUSTOM_TOKEN_BASE}>")
+                          for token_id in self.end_ids}
+        self.sample_rate = sample_rate
+        self.loop_seconds = LOOP_SECONDS if loop_seconds is None else loop_seconds
+        self.silence_seconds = SILENCE_SECONDS if silence_seconds is None else silence_seconds
+        self.reason = None
+        self.trimmed_seconds = 0.0
+        self._coarse = []
+        self._runs = [0] * (self.MAX_PERIOD + 1)
+        self._held = []
+        self._held_silence = 0.0
+        self._held_loop = 0.0
+
+    def is_end_token(self, token) -> bool:
+        """Whether a streamed token (vocabulary ID or text) ends the speech."""
+        if type(token) is int:
+            return token in self.end_ids
+        return token.strip() in self.end_texts
+
+    def _loop_run(self, coarse: int) -> int:
+        """Length of the longest current run of frames repeating the frame period frames earlier."""
+        self._coarse.append(coarse)
+        if len(self._coarse) > self.MAX_PERIOD + 1:
+            del self._coarse[0]
+        longest = 0
+        for period in range(1, min(self.MAX_PERIOD, len(self._coarse) - 1) + 1):
+            if self._coarse[-1 - period] == coarse:
+                self._runs[period] += 1
+                longest = max(longest, self._runs[period])
+            else:
+                self._runs[period] = 0
+        return longest
+
+    def feed(self, frame: List[int], audio: bytes) -> List[bytes]:
+        """
+        Check one decoded frame (its 7 codes and its audio) and return the audio that
+        can be sent now. Returns nothing once the guard has tripped.
+        """
+        if self.reason:
+            return []
+        seconds = len(audio) / (2 * self.sample_rate)
+        samples = np.frombuffer(audio, dtype=np.int16).astype(np.float32)
+        silent = samples.size == 0 or float(np.sqrt(np.mean(samples * samples))) < self.SILENCE_RMS
+
+        # Silence has its own limit, so only audible frames count towards a loop.
+        # Loops are detected on the coarse (first) code of each frame.
+        if silent:
+            self._runs = [0] * (self.MAX_PERIOD + 1)
+            looping = 0
+        else:
+            looping = self._loop_run(frame[0])
+
+        if not silent and looping < self.HOLD_FRAMES:
+            released = self._held + [audio]
+            self._held = []
+            self._held_silence = self._held_loop = 0.0
+            return released
+
+        self._held.append(audio)
+        if silent:
+            self._held_silence += seconds
+        else:
+            self._held_loop += seconds
+        if self._held_silence >= self.silence_seconds:
+            self._trip("silence")
+        elif looping * seconds >= self.loop_seconds:
+            self._trip("loop")
+        return []
+
+    def _trip(self, reason: str) -> None:
+        self.reason = reason
+        self.trimmed_seconds = self._held_silence + self._held_loop
+        self._held = []
+
+    def stop(self, reason: str) -> None:
+        """Trip the guard for a reason found outside feed() (an end token)."""
+        if not self.reason:
+            self.reason = reason
+
+    def flush(self) -> List[bytes]:
+        """Audio still held back when the generation ended by itself (or at an end token)."""
+        held, self._held = self._held, []
+        return held
+
+class RunawayStats:
+    """Counts of generations stopped early by the runaway guard, by reason."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.triggers = {reason: 0 for reason in TRIGGER_REASONS}
+        self.trimmed_seconds = 0.0
+
+    def record(self, reason: str, trimmed_seconds: float = 0.0) -> None:
+        with self._lock:
+            self.triggers[reason] += 1
+            self.trimmed_seconds += trimmed_seconds
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": RUNAWAY_GUARD,
+                "triggers": dict(self.triggers),
+                "trimmed_seconds": round(self.trimmed_seconds, 2),
+            }
+
+# Stop runaway generations early (token budget, end tokens, loops, silence)
+RUNAWAY_GUARD = os.environ.get("ORPHEUS_RUNAWAY_GUARD", "true").lower() not in ("0", "false", "no", "off")
+
+# Per-request token budget: ORPHEUS_TOKEN_BUDGET_BASE + ORPHEUS_TOKENS_PER_CHAR per input character.
+# Speech takes about 6 tokens per character; the defaults leave twice that plus ~8 seconds.
+try:
+    TOKENS_PER_CHAR = int(os.environ.get("ORPHEUS_TOKENS_PER_CHAR", "12"))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_TOKENS_PER_CHAR value, using 12 as fallback")
+    TOKENS_PER_CHAR = 12
+
+try:
+    TOKEN_BUDGET_BASE = int(os.environ.get("ORPHEUS_TOKEN_BUDGET_BASE", "700"))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_TOKEN_BUDGET_BASE value, using 700 as fallback")
+    TOKEN_BUDGET_BASE = 700
+
+try:
+    LOOP_SECONDS = float(os.environ.get("ORPHEUS_LOOP_SECONDS", "3"))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_LOOP_SECONDS value, using 3 as fallback")
+    LOOP_SECONDS = 3.0
+
+try:
+    SILENCE_SECONDS = float(os.environ.get("ORPHEUS_SILENCE_SECONDS", "4"))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_SILENCE_SECONDS value, using 4 as fallback")
+    SILENCE_SECONDS = 4.0
+
+# Trigger counts reported by /stats
+runaway_stats = RunawayStats()
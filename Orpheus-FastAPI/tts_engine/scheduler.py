@@ -0,0 +1,216 @@
+import os
+import math
+import time
+import threading
+import contextlib
+import collections
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Priority classes. Interactive requests (short real-time utterances) are served
+# ahead of bulk work, and bulk work still gets a weighted share so it never starves.
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITY_CLASSES = (INTERACTIVE, BULK)
+
+def _percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values (0.0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)
+    return ordered[rank]
+
+def _summarize_ms(values: List[float]) -> Dict[str, float]:
+    """Summarize a list of durations in seconds as milliseconds."""
+    if not values:
+        return {"avg": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    return {
+        "avg": round(sum(values) / len(values) * 1000, 1),
+        "p50": round(_percentile(values, 50) * 1000, 1),
+        "p95": round(_percentile(values, 95) * 1000, 1),
+        "max": round(max(values) * 1000, 1),
+    }
+
+def parse_weights(value: str) -> Dict[str, float]:
+    """Parse "interactive=8,bulk=1" into a weight per priority class."""
+    weights = {}
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        name, weight = part.split("=", 1)
+        name = name.strip().lower()
+        if name not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority class '{name}'")
+        weights[name] = float(weight)
+        if weights[name] <= 0:
+            raise ValueError(f"Weight for '{name}' must be positive")
+    return weights
+
+try:
+    PRIORITY_WEIGHTS = {INTERACTIVE: 8.0, BULK: 1.0}
+    PRIORITY_WEIGHTS.update(parse_weights(os.environ.get("ORPHEUS_PRIORITY_WEIGHTS", "")))
+except ValueError:
+    print("WARNING: Invalid ORPHEUS_PRIORITY_WEIGHTS value, using interactive=8,bulk=1 as fallback")
+    PRIORITY_WEIGHTS = {INTERACTIVE: 8.0, BULK: 1.0}
+
+DEFAULT_PRIORITY = os.environ.get("ORPHEUS_DEFAULT_PRIORITY", INTERACTIVE).lower()
+if DEFAULT_PRIORITY not in PRIORITY_CLASSES:
+    print(f"WARNING: Invalid ORPHEUS_DEFAULT_PRIORITY value, using {INTERACTIVE} as fallback")
+    DEFAULT_PRIORITY = INTERACTIVE
+
+def normalize_priority(priority: Optional[str]) -> str:
+    """Map a client-supplied priority to a class, raising ValueError for unknown values."""
+    if priority is None or priority == "":
+        return DEFAULT_PRIORITY
+    priority = priority.strip().lower()
+    if priority not in PRIORITY_CLASSES:
+        raise ValueError(f"Unknown priority '{priority}'. Supported priorities: {', '.join(PRIORITY_CLASSES)}")
+    return priority
+
+# The priority of the request a thread is currently working on. Generation threads
+# set it so the LLM and decoder gates further down the call stack can see it.
+_local = threading.local()
+
+def current_priority() -> str:
+    return getattr(_local, "priority", DEFAULT_PRIORITY)
+
+@contextlib.contextmanager
+def priority_context(priority: str) -> Iterator[None]:
+    """Run the enclosed code on behalf of a request of the given priority."""
+    previous = getattr(_local, "priority", None)
+    _local.priority = priority
+    try:
+        yield
+    finally:
+        if previous is None:
+            del _local.priority
+        else:
+            _local.priority = previous
+
+class StrideScheduler:
+    """
+    Stride scheduling between priority classes.
+
+    Each class advances its pass by 1/weight whenever it is served, and the backlogged
+    class with the smallest pass goes next. Over time each class gets a share of
+    service proportional to its weight. A class that was idle joins at the current
+    virtual time, so it cannot bank credit while it had nothing to run.
+    Not thread-safe; callers hold their own lock.
+    """
+    def __init__(self, weights: Dict[str, float]):
+        self.weights = dict(weights)
+        self._pass = {name: 0.0 for name in self.weights}
+        self._vtime = 0.0
+
+    def activate(self, name: str) -> None:
+        """Call when a class goes from idle to backlogged."""
+        self._pass[name] = max(self._pass[name], self._vtime)
+
+    def pick(self, backlogged: Iterable[str]) -> Optional[str]:
+        """Choose the next class to serve among the backlogged ones and charge it."""
+        best = None
+        for name in backlogged:
+            if best is None or self._pass[name] < self._pass[best]:
+                best = name
+        if best is not None:
+            self._vtime = self._pass[best]
+            self._pass[best] += 1.0 / self.weights[best]
+        return best
+
+class _Ticket:
+    __slots__ = ("priority", "granted", "enqueued_at")
+
+    def __init__(self, priority):
+        self.priority = priority
+        self.granted = False
+        self.enqueued_at = time.time()
+
+class PriorityGate:
+    """
+    Counting semaphore that grants free slots by priority class with stride scheduling.
+
+    Used in front of shared resources (the LLM backend, the SNAC decoder) so that
+    interactive requests overtake queued bulk work while bulk work keeps a weighted
+    share. A capacity of 0 disables the gate.
+    """
+    def __init__(self, name: str, capacity: int, weights: Dict[str, float] = PRIORITY_WEIGHTS, history_size: int = 200):
+        self.name = name
+        self.capacity = max(0, capacity)
+        self._cond = threading.Condition()
+        self._scheduler = StrideScheduler(weights)
+        self._waiting = {name: collections.deque() for name in weights}
+        self._active = 0
+        self._acquired = {name: 0 for name in weights}
+        self._wait_times = {name: collections.deque(maxlen=history_size) for name in weights}
+
+    def _dispatch(self) -> None:
+        while self._active < self.capacity:
+            priority = self._scheduler.pick([name for name, queue in self._waiting.items() if queue])
+            if priority is None:
+                break
+            ticket = self._waiting[priority].popleft()
+            ticket.granted = True
+            self._active += 1
+            self._acquired[priority] += 1
+            self._wait_times[priority].append(time.time() - ticket.enqueued_at)
+        self._cond.notify_all()
+
+    def acquire(self, priority: str) -> None:
+        if not self.capacity:
+            return
+        ticket = _Ticket(priority)
+        with self._cond:
+            if not self._waiting[priority]:
+                self._scheduler.activate(priority)
+            self._waiting[priority].append(ticket)
+            self._dispatch()
+            while not ticket.granted:
+                self._cond.wait()
+
+    def release(self) -> None:
+        if not self.capacity:
+            return
+        with self._cond:
+            self._active -= 1
+            self._dispatch()
+
+    @contextlib.contextmanager
+    def slot(self, priority: Optional[str] = None) -> Iterator[None]:
+        """Hold one slot for the enclosed code (priority defaults to the current thread's)."""
+        self.acquire(priority or current_priority())
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "capacity": self.capacity,
+                "active": self._active,
+                "classes": {
+                    name: {
+                        "waiting": len(self._waiting[name]),
+                        "acquired": self._acquired[name],
+                        "wait_ms": _summarize_ms(list(self._wait_times[name])),
+                    }
+                    for name in self._waiting
+                },
+            }
+
+# Gate capacities (0 disables a gate)
+try:
+    LLM_CONCURRENCY = int(os.environ.get("ORPHEUS_LLM_CONCURRENCY", "0"))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_LLM_CONCURRENCY value, using 0 (disabled) as fallback")
+    LLM_CONCURRENCY = 0
+
+try:
+    DECODE_CONCURRENCY = int(os.environ.get("ORPHEUS_DECODE_CONCURRENCY", "0"))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_DECODE_CONCURRENCY value, using 0 (disabled) as fallback")
+    DECODE_CONCURRENCY = 0
+
+# Held for each LLM completion stream (one per text batch), and for each SNAC decode call
+llm_gate = PriorityGate("llm", LLM_CONCURRENCY)
+decode_gate = PriorityGate("decode", DECODE_CONCURRENCY)
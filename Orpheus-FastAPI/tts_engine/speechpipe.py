@@ -1,6 +1,4 @@
-from snac import SNAC
 import numpy as np
-import torch
 import asyncio
 import threading
 import queue
@@ -8,6 +6,9 @@ import time
 import os
 import sys
 
+from .decode_service import DecodeClient, authkey_from_env, parse_addresses
+from .profiling import current_profile, PROFILING
+
 # Helper to detect if running in Uvicorn's reloader (same as in inference.py)
 def is_reloader_process():
     """Check if the current process is a uvicorn reloader"""
@@ -17,45 +18,131 @@ def is_reloader_process():
 # Set a flag to avoid repeat messages
 IS_RELOADER = is_reloader_process()
 
-# Try to enable torch.compile if PyTorch 2.0+ is available
-TORCH_COMPILE_AVAILABLE = False
+# In multi-worker mode (see serve.py) the SNAC model lives in shared decode service
+# processes, and this process sends token windows to them instead of loading its own copy
+DECODE_SERVICE_ADDRESSES = parse_addresses(os.environ.get("ORPHEUS_DECODE_SERVICE", ""))
+
+# Seconds to wait for a decode service's answer before failing the generation
 try:
-    if hasattr(torch, 'compile'):
-        TORCH_COMPILE_AVAILABLE = True
-        if not IS_RELOADER:
-            print("PyTorch 2.0+ detected, torch.compile is available")
-except:
-    pass
+    DECODE_TIMEOUT = float(os.environ.get("ORPHEUS_DECODE_TIMEOUT", "30"))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_DECODE_TIMEOUT value, using 30 as fallback")
+    DECODE_TIMEOUT = 30.0
+
+decode_client = None
+if DECODE_SERVICE_ADDRESSES:
+    decode_client = DecodeClient(DECODE_SERVICE_ADDRESSES, authkey_from_env(), DECODE_TIMEOUT)
+    print(f"Using shared decode service at {', '.join(DECODE_SERVICE_ADDRESSES)}")
 
-# Try to enable CUDA graphs if available
+# torch and SNAC take seconds to import and load, so they are loaded on first use
+# (the server's startup warm-up) rather than at import, and never in processes
+# that forward decoding to a decode service
+torch = None
+model = None
+snac_device = "remote" if decode_client is not None else None
+cuda_stream = None
+TORCH_COMPILE_AVAILABLE = False
 CUDA_GRAPHS_AVAILABLE = False
-try:
-    if torch.cuda.is_available() and hasattr(torch.cuda, 'make_graphed_callables'):
-        CUDA_GRAPHS_AVAILABLE = True
-        if not IS_RELOADER:
-            print("CUDA graphs support is available")
-except:
-    pass
 
-model = SNAC.from_pretrained("hubertsiuzdak/snac_24khz").eval()
+_hardware = None
+_load_lock = threading.RLock()
 
-# Check if CUDA is available and set device accordingly
-snac_device = "cuda" if torch.cuda.is_available() else "mps" if torch.backends.mps.is_available() else "cpu"
-if not IS_RELOADER:
-    print(f"Using device: {snac_device}")
-model = model.to(snac_device)
+def _probe_hardware():
+    """Detect the SNAC device and whether the GPU counts as high-end, printing a summary (once per process)."""
+    global torch
+    import torch
+    import psutil
 
-# Disable torch.compile as it requires Triton which isn't installed
-# We'll use regular PyTorch optimization techniques instead
-if not IS_RELOADER:
-    print("Using standard PyTorch optimizations (torch.compile disabled)")
+    info = {"device": "cpu", "high_end_gpu": False}
+    if torch.cuda.is_available():
+        # Get GPU properties
+        props = torch.cuda.get_device_properties(0)
+        gpu_name = props.name
+        gpu_mem_gb = props.total_memory / (1024**3)
+        compute_capability = f"{props.major}.{props.minor}"
+        
+        # Consider high-end if: large VRAM (≥16GB) OR high compute capability (≥8.0) OR large VRAM (≥12GB) with good CC (≥7.0)
+        high_end = (gpu_mem_gb >= 16.0 or 
+                    props.major >= 8 or 
+                    (gpu_mem_gb >= 12.0 and props.major >= 7))
+        info = {"device": "cuda", "high_end_gpu": high_end, "name": gpu_name}
+        
+        print(f"🖥️ Hardware: {'High-end CUDA GPU' if high_end else 'CUDA GPU'} detected")
+        print(f"📊 Device: {gpu_name}")
+        print(f"📊 VRAM: {gpu_mem_gb:.2f} GB")
+        print(f"📊 Compute Capability: {compute_capability}")
+        print("🚀 Using high-performance optimizations" if high_end else "🚀 Using GPU-optimized settings")
+    else:
+        if torch.backends.mps.is_available():
+            info["device"] = "mps"
+        # Get CPU info
+        cpu_cores = psutil.cpu_count(logical=False)
+        cpu_threads = psutil.cpu_count(logical=True)
+        ram_gb = psutil.virtual_memory().total / (1024**3)
+        
+        print(f"🖥️ Hardware: CPU only (No CUDA GPU detected)")
+        print(f"📊 CPU: {cpu_cores} cores, {cpu_threads} threads")
+        print(f"📊 RAM: {ram_gb:.2f} GB")
+        print("⚙️ Using CPU-optimized settings")
+    return info
 
-# Prepare CUDA streams for parallel processing if available
-cuda_stream = None
-if snac_device == "cuda":
-    cuda_stream = torch.cuda.Stream()
-    if not IS_RELOADER:
-        print("Using CUDA stream for parallel processing")
+def hardware_info():
+    """
+    Hardware the decoder runs on: {"device": ..., "high_end_gpu": ...}.
+    
+    Probed once on first use. With a decode service, the service's hardware is
+    reported, so this process never imports torch.
+    """
+    global _hardware
+    with _load_lock:
+        if _hardware is None:
+            if decode_client is not None:
+                _hardware = decode_client.ping()["hardware"]
+            else:
+                _hardware = _probe_hardware()
+        return _hardware
+
+def load_model():
+    """Load SNAC onto the detected device if it is not loaded yet (no-op with a decode service)."""
+    global model, snac_device, cuda_stream, TORCH_COMPILE_AVAILABLE, CUDA_GRAPHS_AVAILABLE
+    if decode_client is not None or model is not None:
+        return
+    with _load_lock:
+        if model is not None:
+            return
+        snac_device = hardware_info()["device"]
+        from snac import SNAC
+
+        # Try to enable torch.compile if PyTorch 2.0+ is available
+        if hasattr(torch, 'compile'):
+            TORCH_COMPILE_AVAILABLE = True
+            if not IS_RELOADER:
+                print("PyTorch 2.0+ detected, torch.compile is available")
+
+        # Try to enable CUDA graphs if available
+        if torch.cuda.is_available() and hasattr(torch.cuda, 'make_graphed_callables'):
+            CUDA_GRAPHS_AVAILABLE = True
+            if not IS_RELOADER:
+                print("CUDA graphs support is available")
+
+        snac_model = SNAC.from_pretrained("hubertsiuzdak/snac_24khz").eval()
+        if not IS_RELOADER:
+            print(f"Using device: {snac_device}")
+        snac_model = snac_model.to(snac_device)
+
+        # Disable torch.compile as it requires Triton which isn't installed
+        # We'll use regular PyTorch optimization techniques instead
+        if not IS_RELOADER:
+            print("Using standard PyTorch optimizations (torch.compile disabled)")
+
+        # Prepare CUDA streams for parallel processing if available
+        if snac_device == "cuda":
+            cuda_stream = torch.cuda.Stream()
+            if not IS_RELOADER:
+                print("Using CUDA stream for parallel processing")
+
+        # Published last: convert_to_audio only checks model
+        model = snac_model
 
 
 def convert_to_audio(multiframe, count):
@@ -65,6 +152,12 @@ def convert_to_audio(multiframe, count):
     """
     if len(multiframe) < 7:
         return None
+    
+    # Hand the window to the shared decode service when this process has no model
+    if decode_client is not None:
+        return decode_client.convert_to_audio(multiframe, count)
+    if model is None:
+        load_model()
   
     num_frames = len(multiframe) // 7
     frame = multiframe[:num_frames*7]
@@ -111,8 +204,9 @@ def convert_to_audio(multiframe, count):
     stream_ctx = torch.cuda.stream(cuda_stream) if cuda_stream is not None else torch.no_grad()
     
     with stream_ctx, torch.inference_mode():
-        # Decode the audio
-        audio_hat = model.decode(codes)
+        # Decode the audio (traced with torch.profiler for profiled requests)
+        profile = current_profile() if PROFILING else None
+        audio_hat = profile.decode(model.decode, codes) if profile else model.decode(codes)
         
         # Extract the relevant slice and efficiently convert to bytes
         # Keep data on GPU as long as possible
@@ -133,9 +227,20 @@ def convert_to_audio(multiframe, count):
             
     return audio_bytes
 
+def warmup():
+    """Load SNAC and run one decode, so the first request pays for neither."""
+    if decode_client is not None:
+        decode_client.ping()
+        return
+    load_model()
+    convert_to_audio([0] * 28, 28)
+
 # Define the custom token prefix
 CUSTOM_TOKEN_PREFIX = "<custom_token_"
 
+# Vocabulary ID of <custom_token_0> in the Orpheus tokenizer (the Llama 3 vocabulary size)
+CUSTOM_TOKEN_BASE = 128256
+
 # Use a single global cache for token processing
 token_id_cache = {}
 MAX_CACHE_SIZE = 10000  # Increased cache size for better performance
@@ -152,6 +257,10 @@ def turn_token_into_id(token_string, index):
     Returns:
         int: Token ID if valid, None otherwise
     """
+    # Vocabulary IDs from a token-ID stream need no parsing
+    if type(token_string) is int:
+        return token_id_to_code(token_string, index)
+    
     # Check cache first (significant speedup for repeated tokens)
     cache_key = (token_string, index % 7)
     if cache_key in token_id_cache:
@@ -185,6 +294,19 @@ def turn_token_into_id(token_string, index):
     except (ValueError, IndexError):
         return None
 
+def token_id_to_code(token_id, index):
+    """
+    Convert a vocabulary ID streamed by the LLM server to an audio code, with the
+    same offsets as turn_token_into_id. Returns None for non-audio tokens.
+    """
+    if token_id < CUSTOM_TOKEN_BASE:
+        return None
+    return token_id - CUSTOM_TOKEN_BASE - 10 - ((index % 7) * 4096)
+
+def code_to_token_id(code, index):
+    """The vocabulary ID for an audio code at position index (the inverse of token_id_to_code)."""
+    return code + CUSTOM_TOKEN_BASE + 10 + ((index % 7) * 4096)
+
 async def tokens_decoder(token_gen):
     """Optimized token decoder with early first-chunk processing for lower latency"""
     buffer = []
@@ -291,6 +413,7 @@ async def tokens_decoder(token_gen):
 # ------------------ Synchronous Tokens Decoder Wrapper ------------------ #
 def tokens_decoder_sync(syn_token_gen):
     """Optimized synchronous decoder with larger queue and parallel processing"""
+    load_model()
     # Use a larger queue for RTX 4090 to maximize GPU utilization
     max_queue_size = 32 if snac_device == "cuda" else 8
     audio_queue = queue.Queue(maxsize=max_queue_size)
@@ -0,0 +1,180 @@
+import os
+import threading
+from typing import Any, Dict, Generator, Iterable
+
+import numpy as np
+
+# Length of the frames whose level decides between speech and silence
+FRAME_MS = 10
+
+class SilenceTrimmer:
+    """
+    Streaming trimmer for the leading and trailing silence of 16-bit mono PCM.
+
+    Audio is classified in FRAME_MS frames by RMS level. Until the first frame of
+    speech, only the last margin of silence is kept; once speech starts, quiet audio
+    is held back (at most lookahead at a time, the rest is sent on) until speech
+    resumes or the stream ends, when all but a margin of it is dropped. Pauses
+    longer than the lookahead inside the speech are kept in full.
+    """
+    def __init__(self, sample_rate: int, threshold_db: float = None, margin_ms: float = None,
+                 lookahead_ms: float = None):
+        threshold_db = TRIM_THRESHOLD_DB if threshold_db is None else threshold_db
+        margin_ms = TRIM_MARGIN_MS if margin_ms is None else margin_ms
+        lookahead_ms = TRIM_LOOKAHEAD_MS if lookahead_ms is None else lookahead_ms
+        self.sample_rate = sample_rate
+        self.frame = max(1, sample_rate * FRAME_MS // 1000)
+        # Compared against the mean square of each frame, to skip a square root per frame
+        self._threshold = (32768 * 10 ** (threshold_db / 20)) ** 2
+        self.margin = int(sample_rate * margin_ms / 1000)
+        self.lookahead = max(self.margin, int(sample_rate * lookahead_ms / 1000))
+        self.started = False
+        self.leading_samples = 0
+        self.trailing_samples = 0
+        # Samples not yet classified (less than a frame), and classified quiet samples held back
+        self._pending = np.zeros(0, dtype=np.int16)
+        self._held = np.zeros(0, dtype=np.int16)
+
+    @property
+    def leading_ms(self) -> float:
+        return self.leading_samples * 1000 / self.sample_rate
+
+    @property
+    def trailing_ms(self) -> float:
+        return self.trailing_samples * 1000 / self.sample_rate
+
+    def _loud(self, samples: np.ndarray) -> np.ndarray:
+        """Per-frame speech flags for samples, a whole number of frames long."""
+        frames = samples.reshape(-1, self.frame).astype(np.float32)
+        return np.einsum("ij,ij->i", frames, frames) / self.frame >= self._threshold
+
+    def _classify(self, samples: np.ndarray, loud: np.ndarray) -> bytes:
+        """Audio that can be sent now, given samples and the speech flag of each of their frames."""
+        output = []
+        if not self.started:
+            if not loud.any():
+                self._held = np.concatenate([self._held, samples])
+                excess = len(self._held) - self.margin
+                if excess > 0:
+                    self.leading_samples += excess
+                    self._held = self._held[excess:]
+                return b""
+            # Keep a margin of the silence before the first speech, so its onset is not clipped
+            first = int(np.argmax(loud)) * self.frame
+            lead = np.concatenate([self._held, samples[:first]])
+            kept = lead[max(0, len(lead) - self.margin):]
+            self.leading_samples += len(lead) - len(kept)
+            output.append(kept)
+            self._held = np.zeros(0, dtype=np.int16)
+            samples, loud = samples[first:], loud[first // self.frame:]
+            self.started = True
+
+        if loud.any():
+            # Everything up to the last speech frame is sent, with the quiet audio held before it
+            end = (len(loud) - int(np.argmax(loud[::-1]))) * self.frame
+            output.extend([self._held, samples[:end]])
+            self._held = samples[end:]
+        else:
+            self._held = np.concatenate([self._held, samples])
+        if len(self._held) > self.lookahead:
+            output.append(self._held[:-self.lookahead])
+            self._held = self._held[-self.lookahead:]
+        return b"".join(part.tobytes() for part in output)
+
+    def process(self, pcm: bytes) -> bytes:
+        """Trim one chunk; returns the audio that can be sent so far (possibly nothing)."""
+        samples = np.concatenate([self._pending, np.frombuffer(pcm, dtype=np.int16)])
+        whole = len(samples) - len(samples) % self.frame
+        self._pending = samples[whole:]
+        if not whole:
+            return b""
+        return self._classify(samples[:whole], self._loud(samples[:whole]))
+
+    def flush(self) -> bytes:
+        """Return the rest of the audio, without its trailing silence (a margin of it is kept)."""
+        output = b""
+        if len(self._pending):
+            # The last partial frame is classified on its own
+            samples = self._pending.astype(np.float32)
+            loud = np.array([float(np.dot(samples, samples)) / len(samples) >= self._threshold])
+            output = self._classify(self._pending, loud)
+            self._pending = np.zeros(0, dtype=np.int16)
+        if not self.started:
+            # No speech at all
+            self.leading_samples += len(self._held)
+            self._held = np.zeros(0, dtype=np.int16)
+            return output
+        kept = self._held[:self.margin]
+        self.trailing_samples += len(self._held) - len(kept)
+        self._held = np.zeros(0, dtype=np.int16)
+        return output + kept.tobytes()
+
+def trim_chunks(chunks: Iterable[bytes], sample_rate: int) -> Generator[bytes, None, None]:
+    """Trim the leading and trailing silence of a PCM chunk stream, recording it in trim_stats."""
+    trimmer = SilenceTrimmer(sample_rate)
+    try:
+        for chunk in chunks:
+            output = trimmer.process(chunk)
+            if output:
+                yield output
+        tail = trimmer.flush()
+        if tail:
+            yield tail
+        print(f"Silence trim: {trimmer.leading_ms:.0f}ms leading, {trimmer.trailing_ms:.0f}ms trailing")
+        trim_stats.record(trimmer.leading_ms, trimmer.trailing_ms)
+    finally:
+        # Closing early releases the generation behind the chunks
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+class TrimStats:
+    """Counts of trimmed streams and the silence trimmed from them."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.streams = 0
+        self.leading_ms = 0.0
+        self.trailing_ms = 0.0
+
+    def record(self, leading_ms: float, trailing_ms: float) -> None:
+        with self._lock:
+            self.streams += 1
+            self.leading_ms += leading_ms
+            self.trailing_ms += trailing_ms
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled_by_default": TRIM_SILENCE,
+                "streams": self.streams,
+                "leading_ms": round(self.leading_ms),
+                "trailing_ms": round(self.trailing_ms),
+                "avg_leading_ms": round(self.leading_ms / self.streams, 1) if self.streams else None,
+                "avg_trailing_ms": round(self.trailing_ms / self.streams, 1) if self.streams else None,
+            }
+
+# Trim leading and trailing silence of every generation unless a request says otherwise
+TRIM_SILENCE = os.environ.get("ORPHEUS_TRIM_SILENCE", "false").lower() in ("1", "true", "yes", "on")
+
+# Frames quieter than this (dBFS RMS) count as silence
+try:
+    TRIM_THRESHOLD_DB = float(os.environ.get("ORPHEUS_TRIM_THRESHOLD_DB", "-50"))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_TRIM_THRESHOLD_DB value, using -50 as fallback")
+    TRIM_THRESHOLD_DB = -50.0
+
+# Silence kept before the first and after the last speech, so onsets and decays are not clipped
+try:
+    TRIM_MARGIN_MS = max(0.0, float(os.environ.get("ORPHEUS_TRIM_MARGIN_MS", "40")))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_TRIM_MARGIN_MS value, using 40 as fallback")
+    TRIM_MARGIN_MS = 40.0
+
+# Most quiet audio held back after speech; also the most trailing silence that can be trimmed
+try:
+    TRIM_LOOKAHEAD_MS = max(0.0, float(os.environ.get("ORPHEUS_TRIM_LOOKAHEAD_MS", "600")))
+except (ValueError, TypeError):
+    print("WARNING: Invalid ORPHEUS_TRIM_LOOKAHEAD_MS value, using 600 as fallback")
+    TRIM_LOOKAHEAD_MS = 600.0
+
+# Trimmed silence reported by /stats
+trim_stats = TrimStats()